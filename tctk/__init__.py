@@ -10,6 +10,10 @@ type Subscription = tuple[ChatEvent, Callable[[EventData, ChannelSender], Awaita
 class BotFeature:
     # Names (as registered in feature_registry) of features this one depends on.
     requires: list[str] = []
+    # Run this feature's handlers on the blocking-handler thread pool (see tctk.isolation).
+    blocking: bool = False
+    # Seconds before a handler is cancelled; None uses Config.handler_timeout.
+    handler_timeout: float | None = None
 
     def on_start(self):
         pass
@@ -1,6 +1,7 @@
 
 from dataclasses import dataclass
 from enum import IntFlag, StrEnum, auto
+from functools import cache
 from string import ascii_lowercase, ascii_uppercase
 import unicodedata
 
@@ -120,6 +121,23 @@ _ALPHA_FORMAT_FALLBACK_NAMES: dict[AlphaFormat, dict[str, str]] = {
 }
 
 
+# Unicode has no italic digits; italic formats use the upright digits of the same weight.
+# Formats without mathematical digits (plain Script and Fraktur) leave digits unchanged.
+_DIGIT_FORMAT_NAME_PATTERNS: dict[AlphaFormat, str] = {
+    AlphaFormat(FontVariant.Script, bold=True): "MATHEMATICAL BOLD DIGIT {}",
+    AlphaFormat(FontVariant.Fraktur, bold=True): "MATHEMATICAL BOLD DIGIT {}",
+    AlphaFormat(FontVariant.DoubleStruck): "MATHEMATICAL DOUBLE-STRUCK DIGIT {}",
+    AlphaFormat(FontVariant.SansSerif): "MATHEMATICAL SANS-SERIF DIGIT {}",
+    AlphaFormat(FontVariant.SansSerif, bold=True): "MATHEMATICAL SANS-SERIF BOLD DIGIT {}",
+    AlphaFormat(FontVariant.SansSerif, italic=True): "MATHEMATICAL SANS-SERIF DIGIT {}",
+    AlphaFormat(FontVariant.SansSerif, bold=True, italic=True): "MATHEMATICAL SANS-SERIF BOLD DIGIT {}",
+    AlphaFormat(FontVariant.Monospace): "MATHEMATICAL MONOSPACE DIGIT {}",
+}
+
+_DIGIT_NAMES = ("ZERO", "ONE", "TWO", "THREE", "FOUR", "FIVE", "SIX", "SEVEN", "EIGHT", "NINE")
+
+
+@cache
 def _build_alpha_codepoint_map(alpha_format: AlphaFormat) -> dict[str, int]:
     uppercase_pattern, lowercase_pattern = _ALPHA_FORMAT_NAME_PATTERNS[alpha_format]
     fallback_names = _ALPHA_FORMAT_FALLBACK_NAMES.get(alpha_format, {})
@@ -136,14 +154,46 @@ def _build_alpha_codepoint_map(alpha_format: AlphaFormat) -> dict[str, int]:
     return codepoints
 
 
-ALPHA_FORMAT_CODEPOINTS: AlphaCodePointMap = {
-    alpha_format: _build_alpha_codepoint_map(alpha_format)
-    for alpha_format in _ALPHA_FORMAT_NAME_PATTERNS
-}
+@cache
+def _build_digit_codepoint_map(alpha_format: AlphaFormat) -> dict[str, int]:
+    pattern = _DIGIT_FORMAT_NAME_PATTERNS.get(alpha_format)
+    if pattern is None:
+        return {}
+    return {str(digit): ord(unicodedata.lookup(pattern.format(name))) for digit, name in enumerate(_DIGIT_NAMES)}
+
+
+@cache
+def _translation_table(alpha_format: AlphaFormat) -> list[str]:
+    # indexed by code point; str.translate leaves characters past the end (LookupError) unchanged,
+    # and a list lookup is about twice as fast as a dict one
+    table = [chr(i) for i in range(128)]
+    chars = _build_alpha_codepoint_map(alpha_format) | _build_digit_codepoint_map(alpha_format)
+    for c, codepoint in chars.items():
+        table[ord(c)] = chr(codepoint)
+    return table
+
+
+def __getattr__(name: str):
+    # built on first use, so importing this module does no unicodedata lookups
+    if name == "ALPHA_FORMAT_CODEPOINTS":
+        return {alpha_format: _build_alpha_codepoint_map(alpha_format)
+                for alpha_format in _ALPHA_FORMAT_NAME_PATTERNS}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 class AlphaFormatter:
-    def __init__(self, fmt: AlphaFormat):
-        self.fmt = fmt
-        self.codepoint_map = _build_alpha_codepoint_map(self.fmt)
+    """Rewrites ASCII letters and digits in one AlphaFormat. One instance per format."""
+    _instances: dict[AlphaFormat, "AlphaFormatter"] = {}
+
+    def __new__(cls, fmt: AlphaFormat):
+        instance = cls._instances.get(fmt)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.fmt = fmt
+            instance.codepoint_map = _build_alpha_codepoint_map(fmt)
+            instance.table = _translation_table(fmt)
+            cls._instances[fmt] = instance
+        return instance
+
     def __call__(self, msg):
-        return ''.join([chr(self.codepoint_map.get(c, ord(c))) for c in msg])
\ No newline at end of file
+        return msg.translate(self.table)
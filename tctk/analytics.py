@@ -0,0 +1,159 @@
+"""Queries over duel and raffle history in the Parquet store.
+
+Every query is built on lazy scans (see ``StoredRow.scan``) so time filters
+prune date partitions and only the referenced columns are read; results are
+collected with polars' streaming engine, keeping memory bounded however much
+history there is. Postgres tracker tables can be copied into the store
+incrementally with ``sync_from_postgres``.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import polars as pl
+
+from tctk.features.se.store import Duel, Raffle, UserRaffle, store_root
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when copying tracker tables out of Postgres.
+SYNC_BATCH_ROWS = 100_000
+
+
+@dataclass(frozen=True)
+class TimeRange:
+    since: date | None = None
+    until: date | None = None
+
+    def apply(self, lf: pl.LazyFrame, ts_col: str) -> pl.LazyFrame:
+        """Filter on the partition column first (prunes files), then on the timestamp."""
+        if self.since is not None:
+            lf = lf.filter(pl.col("date") >= self.since.isoformat())
+            lf = lf.filter(pl.col(ts_col) >= _epoch_ms(self.since))
+        if self.until is not None:
+            lf = lf.filter(pl.col("date") < self.until.isoformat())
+            lf = lf.filter(pl.col(ts_col) < _epoch_ms(self.until))
+        return lf
+
+
+def _epoch_ms(d: date) -> int:
+    return int(datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def collect(lf: pl.LazyFrame) -> pl.DataFrame:
+    return lf.collect(engine="streaming")
+
+
+def raffle_user_stats(user_raffle: pl.LazyFrame, window: TimeRange = TimeRange(),
+                      users: list[str] | None = None) -> pl.LazyFrame:
+    """Per-user raffle joins, wins and win rate."""
+    lf = window.apply(user_raffle, "raffle_start_time").select("username", "did_win", "date", "raffle_start_time")
+    lf = lf.with_columns(pl.col("username").str.to_lowercase())
+    if users:
+        lf = lf.filter(pl.col("username").is_in([u.lower() for u in users]))
+    return (
+        lf.group_by("username")
+        .agg(
+            joins=pl.len(),
+            wins=pl.col("did_win").sum(),
+        )
+        .with_columns(win_rate=pl.col("wins") / pl.col("joins"))
+        .sort(["joins", "username"], descending=[True, False])
+    )
+
+
+def duel_user_stats(duel: pl.LazyFrame, window: TimeRange = TimeRange(),
+                    users: list[str] | None = None) -> pl.LazyFrame:
+    """Per-user duel wins, losses and net coins."""
+    lf = window.apply(duel, "offer_time").select("initiator", "opponent", "amount", "offerer_win", "date", "offer_time")
+    sides = pl.concat([
+        lf.select(
+            username=pl.col("initiator").str.to_lowercase(),
+            won=pl.col("offerer_win"),
+            amount=pl.col("amount"),
+        ),
+        lf.select(
+            username=pl.col("opponent").str.to_lowercase(),
+            won=~pl.col("offerer_win"),
+            amount=pl.col("amount"),
+        ),
+    ])
+    if users:
+        sides = sides.filter(pl.col("username").is_in([u.lower() for u in users]))
+    return (
+        sides.group_by("username")
+        .agg(
+            duels=pl.len(),
+            wins=pl.col("won").sum(),
+            losses=(~pl.col("won")).sum(),
+            net_coins=pl.when(pl.col("won")).then(pl.col("amount")).otherwise(-pl.col("amount")).sum(),
+        )
+        .sort(["net_coins", "username"], descending=[True, False])
+    )
+
+
+def activity(frame: pl.LazyFrame, ts_col: str, user_col: str, every: str = "1d",
+             window: TimeRange = TimeRange()) -> pl.LazyFrame:
+    """Event and distinct-user counts per time bucket (``every`` is a polars duration, e.g. "1h", "1w")."""
+    lf = window.apply(frame, ts_col).select(ts_col, user_col, "date")
+    return (
+        lf.drop_nulls(ts_col)
+        .with_columns(bucket=pl.from_epoch(ts_col, time_unit="ms").dt.truncate(every))
+        .group_by("bucket")
+        .agg(
+            events=pl.len(),
+            users=pl.col(user_col).str.to_lowercase().n_unique(),
+        )
+        .sort("bucket")
+    )
+
+
+def raffle_activity(every: str = "1d", window: TimeRange = TimeRange(), root: Path | None = None) -> pl.LazyFrame:
+    return activity(UserRaffle.scan(root), "raffle_start_time", "username", every, window)
+
+
+def duel_activity(every: str = "1d", window: TimeRange = TimeRange(), root: Path | None = None) -> pl.LazyFrame:
+    return activity(Duel.scan(root), "offer_time", "initiator", every, window)
+
+
+_SYNC_QUERIES = {
+    Duel: "SELECT id, initiator, opponent, offer_time, amount, offerer_win FROM duel WHERE id > %s ORDER BY id",
+    Raffle: "SELECT id, start_time, duration, amount FROM raffle WHERE id > %s ORDER BY id",
+    UserRaffle: "SELECT id, username, raffle_start_time, did_win, join_time FROM user_raffle WHERE id > %s ORDER BY id",
+}
+
+
+def sync_from_postgres(conninfo: str, root: Path | None = None) -> dict[str, int]:
+    """Copy tracker rows not yet exported into the Parquet store.
+
+    The highest exported ``id`` per table is remembered in
+    ``<store>/postgres_sync.json``, so repeated syncs only fetch new rows.
+    """
+    import psycopg
+
+    root = root or store_root()
+    root.mkdir(parents=True, exist_ok=True)
+    marks_path = root.joinpath("postgres_sync.json")
+    marks: dict[str, int] = json.loads(marks_path.read_text()) if marks_path.exists() else {}
+    copied: dict[str, int] = {}
+
+    with psycopg.connect(conninfo) as conn:
+        for table, query in _SYNC_QUERIES.items():
+            name = table.__name__
+            mark = marks.get(name, 0)
+            copied[name] = 0
+            for batch in pl.read_database(
+                query, conn, iter_batches=True, batch_size=SYNC_BATCH_ROWS,
+                execute_options={"parameters": [mark]},
+            ):
+                if batch.height == 0:
+                    continue
+                mark = int(batch["id"].max())
+                table.write_frame(batch.drop("id"), root)
+                copied[name] += batch.height
+                marks[name] = mark
+                marks_path.write_text(json.dumps(marks))
+    logger.info(f"Synced from postgres: {copied}")
+    return copied
@@ -0,0 +1,4 @@
+"""Micro-benchmarks for per-message hot paths.
+
+Each module can be run directly, e.g. ``python -m tctk.bench.se_classifier``.
+"""
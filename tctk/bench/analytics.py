@@ -0,0 +1,98 @@
+"""Analytics queries over a synthetic history in the Parquet store.
+
+Generates ``--rows`` user_raffle rows (and a quarter as many duels) spread
+over ``--days`` of date partitions, then times each ``tctk.analytics`` query
+with and without a time window, reporting peak RSS alongside.
+
+    python -m tctk.bench.analytics [--rows 50000000] [--days 1095] [--root DIR]
+
+Generation is skipped when ``--root`` already holds a store.
+"""
+import argparse
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import polars as pl
+
+from tctk import analytics
+from tctk.features.se.store import Duel, UserRaffle
+
+DAY_MS = 86_400_000
+START = date(2022, 1, 1)
+USERS = 50_000
+# Rows generated and written per chunk, so generation itself stays in bounded memory.
+CHUNK_ROWS = 5_000_000
+
+
+def _pseudo(seed: int, n: int, offset: int) -> pl.Expr:
+    """Deterministic pseudo-random UInt64 column of length ``n``."""
+    return (pl.int_range(offset, offset + n, dtype=pl.UInt64) * (2 * seed + 1)).hash(seed)
+
+
+def _generate(rows: int, days: int, root: Path):
+    start_ms = analytics._epoch_ms(START)
+    for offset in range(0, rows, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, rows - offset)
+        frame = pl.select(
+            day=_pseudo(1, n, offset) % days,
+            user=_pseudo(2, n, offset) % USERS,
+            jitter=_pseudo(3, n, offset) % DAY_MS,
+            win=_pseudo(4, n, offset) % 20,
+        ).sort("day")
+        ts = pl.col("day").cast(pl.Int64) * DAY_MS + start_ms
+        UserRaffle.write_frame(frame.select(
+            username=pl.format("user{}", "user"),
+            raffle_start_time=ts,
+            did_win=pl.col("win") == 0,
+            join_time=ts + pl.col("jitter").cast(pl.Int64),
+        ), root)
+        duels = frame.gather_every(4)
+        Duel.write_frame(duels.select(
+            initiator=pl.format("user{}", "user"),
+            opponent=pl.format("user{}", (pl.col("user") + 1) % USERS),
+            offer_time=ts + pl.col("jitter").cast(pl.Int64),
+            amount=(pl.col("jitter") % 5000).cast(pl.Int64),
+            offerer_win=pl.col("win") < 10,
+        ), root)
+        print(f"generated {offset + n:,}/{rows:,} rows")
+    UserRaffle.compact(root)
+    Duel.compact(root)
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--root", type=Path)
+    args = parser.parse_args()
+
+    root = args.root or Path(tempfile.mkdtemp(prefix="tctk-analytics-"))
+    if not any(UserRaffle.table_dir(root).glob("date=*")):
+        start = time.perf_counter()
+        _generate(args.rows, args.days, root)
+        print(f"generated store in {root} in {time.perf_counter() - start:.1f}s")
+
+    last_month = analytics.TimeRange(START + timedelta(days=args.days - 30), START + timedelta(days=args.days))
+    queries = {
+        "raffle_user_stats": lambda w: analytics.raffle_user_stats(UserRaffle.scan(root), w),
+        "duel_user_stats": lambda w: analytics.duel_user_stats(Duel.scan(root), w),
+        "raffle_activity 1d": lambda w: analytics.raffle_activity("1d", w, root),
+        "duel_activity 1w": lambda w: analytics.duel_activity("1w", w, root),
+    }
+    for name, query in queries.items():
+        for label, window in (("all", analytics.TimeRange()), ("30d", last_month)):
+            start = time.perf_counter()
+            result = analytics.collect(query(window))
+            elapsed = time.perf_counter() - start
+            print(f"{name:>20} [{label:>3}]: {elapsed:>7.2f}s, {result.height:>7,} rows, peak RSS {_peak_rss_mb():,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
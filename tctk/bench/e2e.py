@@ -0,0 +1,129 @@
+"""End-to-end load test over the real Chat connection path.
+
+Starts a FakeTwitch, connects a ChatBot to it through twitchAPI's Chat (as
+``tctk run`` would, minus the network and the OAuth flow) with the given
+features, then plays scenarios at it: steady chatter, a raid burst, a
+1,000-viewer !join storm and a few duel offers. For each scenario it reports
+audience messages delivered to the bot and their delivery lag, the bot's
+messages accepted and rejected by the server (slow mode / rate limit) or
+dropped by its own scheduler, and how long the bot took to answer.
+
+    python -m tctk.bench.e2e [--features dueler raffle_join] [--slow 0] [--mod]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from twitchAPI.type import ChatEvent
+
+from tctk.bot import ChatBot
+from tctk.cli import start_features, subscribe_features
+from tctk.testing.fake_twitch import FakeTwitch
+from tctk.testing.load import Audience, response_latencies
+
+BOT = "loadbot"
+CHANNEL = "loadtest"
+
+
+@dataclass
+class Probe:
+    """Counts audience messages reaching the bot's handlers."""
+    delivered: int = 0
+    # seconds from the server stamping a message to the bot handling it
+    lags: list[float] = field(default_factory=list)
+
+    async def on_message(self, msg, sender):
+        self.delivered += 1
+        self.lags.append(time.time() - msg.sent_timestamp / 1000)
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}ms"
+
+
+def percentile(values: list[float], p: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(len(s) * p))]
+
+
+async def scenario(name: str, server: FakeTwitch, bot: ChatBot, probe: Probe, audience: Audience, run, settle: float):
+    sent_before, delivered_before, lags_before = audience.sent, probe.delivered, len(probe.lags)
+    received_before, stimuli_before = len(server.received), len(audience.stimuli)
+    stats = bot.sender.scheduler.stats
+    dropped_before = stats.expired + stats.overflowed + stats.failed
+
+    start = time.monotonic()
+    await run()
+    elapsed = time.monotonic() - start
+    await asyncio.sleep(settle)
+
+    sent = audience.sent - sent_before
+    delivered = probe.delivered - delivered_before
+    lags = probe.lags[lags_before:]
+    ours = [r for r in server.received[received_before:] if r.nick == BOT]
+    rejected = sum(not r.accepted for r in ours)
+    dropped = stats.expired + stats.overflowed + stats.failed - dropped_before
+    print(f"{name}: {sent} msgs in {elapsed:.1f}s ({sent / elapsed:,.0f}/s), "
+          f"{delivered} delivered ({1 - delivered / sent if sent else 0:.1%} lost)"
+          + (f", lag p50 {ms(statistics.median(lags))} p99 {ms(percentile(lags, 0.99))}" if lags else ""))
+    print(f"  bot: {len(ours) - rejected} sent, {rejected} rejected by server, {dropped} dropped by scheduler")
+    latencies = response_latencies(audience.stimuli[stimuli_before:], [r for r in ours if r.accepted])
+    if latencies:
+        answered = [l for l in latencies if l is not None]
+        print(f"  responses: {len(answered)}/{len(latencies)} answered"
+              + (f", latency mean {ms(statistics.fmean(answered))} max {ms(max(answered))}" if answered else ""))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--features", nargs="*", default=["dueler", "raffle_join"])
+    parser.add_argument("--slow", type=int, default=0, help="Slow mode of the channel, in seconds.")
+    parser.add_argument("--mod", action="store_true", help="Make the bot a moderator (higher rate limit).")
+    parser.add_argument("--rate", type=float, default=50.0, help="Chatter messages per second.")
+    parser.add_argument("--joiners", type=int, default=1000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with FakeTwitch() as server:
+        room = server.room(CHANNEL)
+        room.slow = args.slow
+        if args.mod:
+            room.mods.add(BOT)
+        channel_features = await start_features([CHANNEL], args.features, {})
+        probe = Probe()
+
+        async def subscribe(b):
+            subscribe_features(b, channel_features)
+
+        bot = await ChatBot.create(
+            CHANNEL, access_tokens_file=None,
+            subscriptions=[(ChatEvent.MESSAGE, probe.on_message)],
+            post_subscribe=subscribe,
+            connect=lambda: server.connect(BOT),
+        )
+        audience = Audience(server, CHANNEL)
+        await asyncio.sleep(0.5)
+
+        async def duels():
+            for _ in range(3):
+                audience.offer_duel(BOT, 100)
+                await asyncio.sleep(1)
+
+        await scenario("chatter", server, bot, probe, audience, lambda: audience.chatter(args.rate, 10), 1)
+        await scenario("raid", server, bot, probe, audience, lambda: audience.raid(300, 3), 1)
+        await scenario("join storm", server, bot, probe, audience, lambda: audience.join_storm(args.joiners, 10), 2)
+        await scenario("duels", server, bot, probe, audience, duels, 3)
+
+        for sender in bot.senders.values():
+            # the scheduler runs on Chat's own loop
+            if sender.scheduler._task is not None:
+                asyncio.run_coroutine_threadsafe(sender.scheduler.close(), sender.scheduler._task.get_loop()).result()
+        bot.chat.stop()
+        await bot.twitch.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
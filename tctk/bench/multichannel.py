@@ -0,0 +1,154 @@
+"""Cost of serving many channels from one process.
+
+Wires a ChatBot with N channels onto an in-process stand-in for the Chat
+connection, gives every channel its own feature set and feature manager (as
+``tctk run -c a -c b ...`` does), then pushes chat messages for random rooms
+through the same handler path Chat uses. Reports the memory each added
+channel costs, the Chat-level handlers registered and dispatch throughput.
+
+    python -m tctk.bench.multichannel [--channels 50] [--messages 200000]
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import random
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from twitchAPI.chat import ChatMessage
+from twitchAPI.type import ChatEvent
+
+from tctk.bot import ChatBot
+from tctk.config import Config
+from tctk.features.auto_resp_feature import AutoRespFeature
+from tctk.features.feature_manager import FeatureManagerFeature
+from tctk.features.se.duel.duel_bot import DuelBotFeature
+from tctk.features.se.raffle.raffle_features import RaffleJoinFeature, RaffleReportFeature
+
+FEATURES = {
+    "dueler": DuelBotFeature,
+    "auto_responder": AutoRespFeature,
+    "raffle_join": RaffleJoinFeature,
+    "raffle_report": RaffleReportFeature,
+}
+
+CHATTER = [
+    "hello chat", "LUL", "what did I miss", "PogChamp PogChamp", "gg", "KEKW that was close",
+    "anyone know the song?", "!points", "first time here", "monkaS",
+]
+
+
+class LoopbackChat:
+    """Just enough of twitchAPI's Chat for ChatBot, ChannelSender and features."""
+
+    def __init__(self, channels: list[str]):
+        self.username = "benchbot"
+        self.room_cache = {c: SimpleNamespace(name=c, slow=0) for c in channels}
+        self._event_handler: dict[ChatEvent, list] = {}
+        self.sent = 0
+
+    def register_event(self, event, handler):
+        self._event_handler.setdefault(event, []).append(handler)
+
+    def unregister_event(self, event, handler):
+        self._event_handler.get(event, []).remove(handler)
+        return True
+
+    def is_mod(self, room) -> bool:
+        return True
+
+    async def send_message(self, room, text):
+        self.sent += 1
+
+    def emit(self, event: ChatEvent, data):
+        # Chat schedules one task per registered handler
+        for handler in self._event_handler.get(event, []):
+            asyncio.ensure_future(handler(data))
+
+
+def build(channels: list[str]) -> tuple[ChatBot, LoopbackChat]:
+    chat = LoopbackChat(channels)
+    bot = ChatBot(channels, access_tokens_file=None)
+    bot.attach(chat)
+    for channel in channels:
+        active = {name: cls() for name, cls in FEATURES.items()}
+        manager = FeatureManagerFeature(feature_registry=FEATURES, active=active)
+        active["feature_manager"] = manager
+        sender = bot.senders[channel]
+        manager.attach(sender)
+        for name, feature in active.items():
+            manager.subscribe(name, feature, sender)
+    return bot, chat
+
+
+def message(chat: LoopbackChat, channel: str, nick: str, text: str, ts: int) -> ChatMessage:
+    return ChatMessage(chat, {
+        "tags": {"tmi-sent-ts": str(ts), "id": str(ts)},
+        "parameters": text,
+        "command": {"command": "PRIVMSG", "channel": f"#{channel}"},
+        "source": {"nick": nick},
+    })
+
+
+def footprint(count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build([f"chan{i}" for i in range(count)])
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+async def throughput(count: int, messages: int) -> float:
+    channels = [f"chan{i}" for i in range(count)]
+    bot, chat = build(channels)
+    authority = Config.get().raffle_authority_user
+    rng = random.Random(0)
+    batch = [
+        message(chat, rng.choice(channels), f"viewer{rng.randrange(5000)}", rng.choice(CHATTER), i)
+        for i in range(min(messages, 10_000))
+    ]
+    for channel in channels:
+        chat.emit(ChatEvent.MESSAGE, message(
+            chat, channel, authority,
+            "PogChamp a Multi-Raffle has begun for 500 EastCoin PogChamp it will end in 60 Seconds.", 0))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    for i in range(messages):
+        chat.emit(ChatEvent.MESSAGE, batch[i % len(batch)])
+        if i % 1000 == 999:
+            await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    for sender in bot.senders.values():
+        await sender.scheduler.close()
+    return messages / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    counts = sorted({1, 10, args.channels})
+    one = footprint(1)
+    for count in counts:
+        used = footprint(count)
+        bot, chat = build([f"chan{i}" for i in range(count)])
+        handlers = sum(len(h) for h in chat._event_handler.values())
+        rate = await throughput(count, args.messages)
+        per_extra = f"{(used - one) / (count - 1) / 1024:,.1f}" if count > 1 else "-"
+        print(f"{count:>4} channels: {used / 1024:>8,.0f} KiB total, {per_extra:>6} KiB per extra channel, "
+              f"1 connection, {handlers} Chat handlers, {rate:>10,.0f} msgs/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""Throughput of the StreamElements authority-message classifier.
+
+Compares classifying each recorded line once (shared by every feature through
+the per-message cache) against the previous approach of every feature running
+its own uncompiled regex scans.
+
+    python -m tctk.bench.se_classifier [--repeat N]
+"""
+import argparse
+import re
+import time
+from types import SimpleNamespace
+
+from tctk.features.se.classifier import Regex, classify
+
+RECORDED_LINES = [
+    '@aallldeeeez, @dookiebetts800 wants to duel you for 348 eastcoins, you can !accept or !deny within 2 minutes',
+    'dookiebetts800 won the Duel vs aallldeeeez PogChamp dookiebetts800 won 348 eastcoins FeelsGoodMan',
+    '@cenozoicmegafauna, are_mod denied your duel :(',
+    '@are_mod has 12345 eastcoins [Rank 12/3456]',
+    'are_mod gave 100 eastcoins to cenozoicmegafauna PogChamp',
+    'PogChamp a Multi-Raffle has begun for 5000 EastCoin PogChamp it will end in 60 Seconds. Enter by typing "!join" FeelsGoodMan',
+    'The Multi-Raffle has ended and dookiebetts800 won 5000 EastCoin each FeelsGoodMan',
+    'The Multi-Raffle has ended and aallldeeeez and are_mod won 2500 EastCoin each FeelsGoodMan',
+    'The Multi-Raffle has ended and user_one, user_two, user_three, and user_four won 1250 EastCoin each FeelsGoodMan',
+    '@someone, you already joined the raffle',
+    '@someone, there is no raffle running at the moment',
+]
+
+_raffle_close_re = re.compile(r'The Multi-Raffle has ended and (.+) won (\d+) EastCoin each')
+_raffle_open_re = re.compile("a Multi-Raffle has begun for ([0-9]+) EastCoin")
+_raffle_duration_re = re.compile("it will end in ([0-9]+) Seconds")
+
+# Features that used to scan every authority line independently.
+FEATURE_COUNT = 4
+
+
+def legacy_scans(text: str) -> int:
+    """Regex work one feature instance used to do per authority line."""
+    hits = 0
+    hits += re.match(Regex.duel_proposed, text) is not None
+    hits += re.match(Regex.duel_complete, text) is not None
+    hits += re.search(Regex.coins_response, text) is not None
+    hits += re.search(Regex.coins_given, text) is not None
+    hits += _raffle_close_re.search(text) is not None
+    if _raffle_open_re.search(text) is not None:
+        hits += _raffle_duration_re.search(text) is not None
+    return hits
+
+
+def bench_legacy(lines: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in lines:
+            for _ in range(FEATURE_COUNT):
+                legacy_scans(text)
+    return time.perf_counter() - start
+
+
+def bench_classifier(lines: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in lines:
+            msg = SimpleNamespace(text=text)
+            for _ in range(FEATURE_COUNT):
+                classify(msg)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20_000)
+    args = parser.parse_args()
+
+    total = len(RECORDED_LINES) * args.repeat
+    for name, bench in (("legacy", bench_legacy), ("classifier", bench_classifier)):
+        elapsed = bench(RECORDED_LINES, args.repeat)
+        print(f"{name:>10}: {total / elapsed:>12,.0f} lines/s ({elapsed * 1e6 / total:.2f} us/line, {FEATURE_COUNT} features)")
+
+
+if __name__ == "__main__":
+    main()
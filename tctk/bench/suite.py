@@ -0,0 +1,309 @@
+"""Micro-benchmarks of the per-message hot paths.
+
+Every benchmark calls one function on a fixed input, realistic (recorded
+authority lines, ordinary chat) or adversarial (500-winner raffle results,
+long messages, non-ASCII text). Results are written as JSON so two runs can
+be compared; ``compare`` reports benchmarks that got slower than a tolerance.
+
+    tctk bench [PATTERN ...] [--compare BASELINE.json]
+    python -m tctk.bench.suite [PATTERN ...]
+
+Messages are built once; cached per-message facts (classification, router
+facts) are dropped before every call so each call does the full work.
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import timeit
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from twitchAPI.chat import ChatMessage
+
+from tctk.config import Config
+
+# Seconds each repeat should take at least; the call count is calibrated to it.
+MIN_TIME = 0.05
+REPEAT = 5
+# Relative slowdown reported as a regression by compare.
+TOLERANCE = 0.10
+BENCH_CHANNEL = "bench"
+
+DUEL_OFFERER, DUEL_OFFEREE = "dookiebetts800", "aallldeeeez"
+LONG_CHAT = "a" * 20 + " ".join(["blah"] * 100)
+UNICODE_CHAT = "ｆｕｌｌｗｉｄｔｈ ᵗᶦⁿʸ ŝ̷̡t̴r̷a̴n̸g̷e̸ 👍🏽👍🏽 한국어 " * 4
+
+
+def bench_dir() -> Path:
+    return Config.data_dir().joinpath("bench")
+
+
+@dataclass
+class Bench:
+    name: str
+    fn: Callable[[], Any]
+
+
+@dataclass
+class Result:
+    # median and best nanoseconds per call over the repeats
+    median_ns: float
+    min_ns: float
+    number: int
+    repeat: int
+
+
+def message(nick: str, text: str) -> ChatMessage:
+    return ChatMessage(SimpleNamespace(room_cache={}, username="benchbot"), {
+        "tags": {"tmi-sent-ts": "0", "id": "0"},
+        "parameters": text,
+        "command": {"command": "PRIVMSG", "channel": f"#{BENCH_CHANNEL}"},
+        "source": {"nick": nick},
+    })
+
+
+def fresh(msg: ChatMessage) -> ChatMessage:
+    """``msg`` without the facts earlier handlers cached on it."""
+    msg.__dict__.pop("_se_event", None)
+    msg.__dict__.pop("_tctk_facts", None)
+    msg.__dict__.pop("_tctk_user", None)
+    msg.__dict__.pop("_tctk_raffle", None)
+    return msg
+
+
+def raffle_result(winners: int) -> str:
+    names = [f"winner_{i}" for i in range(winners)]
+    if winners == 1:
+        listed = names[0]
+    elif winners == 2:
+        listed = " and ".join(names)
+    else:
+        listed = ", ".join(names[:-1]) + ", and " + names[-1]
+    return f"The Multi-Raffle has ended and {listed} won {max(1, 5000 // winners)} EastCoin each FeelsGoodMan"
+
+
+class NullSender:
+    """Accepts sends without doing anything, so handlers run to completion inline."""
+    channel = BENCH_CHANNEL
+
+    async def submit_unique(self, *args, **kwargs):
+        return None
+
+    async def send_unique(self, *args, **kwargs):
+        return True
+
+
+def drive(coro) -> Any:
+    """Run a coroutine that never suspends, without an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("benchmarked coroutine suspended")
+
+
+def benches() -> list[Bench]:
+    from tctk.alpha_format import FontVariant
+    from tctk.features.auto_resp_feature import AutoRespFeature
+    from tctk.features.se.duel.duel import Duel, DuelOffer
+    from tctk.features.se.raffle.raffle_feature import Raffle, RaffleState, extract_winners, join_predicate
+    from tctk.features.se.raffle.raffle_features import RaffleGiveawayFeature, RaffleJoinFeature, RaffleReportFeature
+    from tctk.log_formatter import ColoredJsonFormatter, TctkLogger
+    from tctk.uniquifier import RECENT, Uniquifier
+
+    cfg = Config.get()
+    duel_authority = cfg.duel_authority_user
+    proposal = DuelOffer(offerer=DUEL_OFFERER, offeree=DUEL_OFFEREE, amount=348).proposal_message
+    result = Duel(offerer=DUEL_OFFERER, offeree=DUEL_OFFEREE, amount=348, offerer_win=True).complete_message
+    pending = DuelOffer(offerer=DUEL_OFFERER, offeree=DUEL_OFFEREE, amount=348)
+    # looks like a proposal until the very end
+    near_miss = proposal.replace("within 2 minutes", "within 2 minute") + " x" * 200
+
+    out: list[Bench] = []
+
+    def add(name: str, fn: Callable[[], Any]):
+        out.append(Bench(name, fn))
+
+    for label, msg in (("proposal", message(duel_authority, proposal)),
+                       ("other_authority_line", message(duel_authority, result)),
+                       ("near_miss", message(duel_authority, near_miss)),
+                       ("viewer", message("viewer", proposal))):
+        add(f"DuelOffer.from_proposal[{label}]", lambda msg=msg: DuelOffer.from_proposal(fresh(msg)))
+
+    for label, msg, p in (("result", message(duel_authority, result), None),
+                          ("result_pending", message(duel_authority, result), pending),
+                          ("proposal", message(duel_authority, proposal), None),
+                          ("long_chat", message(duel_authority, LONG_CHAT), None)):
+        add(f"Duel.from_result[{label}]", lambda msg=msg, p=p: Duel.from_result(fresh(msg), p))
+
+    for winners in (1, 2, 3, 10, 100, 500):
+        add(f"extract_winners[{winners}]", lambda text=raffle_result(winners): extract_winners(text))
+
+    for label, text in (("join", "!join"), ("join_in_sentence", "ok !join please"), ("chat", "hello chat"),
+                        ("joinx", "!joinx"), ("long_chat", LONG_CHAT), ("unicode", UNICODE_CHAT)):
+        add(f"join_predicate[{label}]", lambda msg=message("viewer", text): join_predicate(msg, BENCH_CHANNEL))
+
+    # a big raffle: closing it casefolds the winners once, not once per joiner
+    for joiners in (100, 10_000):
+        raffle = Raffle(0, 60, 5000)
+        for i in range(joiners):
+            raffle.join(f"Viewer{i}", i)
+        winners = [f"viewer{i}" for i in range(0, joiners, joiners // 4)]
+        add(f"Raffle.close[{joiners}]",
+            lambda raffle=raffle, winners=winners: (raffle.close(winners), raffle.losers(), raffle.entries()))
+
+    def join_all(names=[f"viewer{i}" for i in range(1000)]):
+        state = RaffleState(BENCH_CHANNEL)
+        state.start(Raffle(0, 60, 5000))
+        state.start(Raffle(0, 120, 5000))
+        for name in names:
+            state.join(name, 1)
+    add("RaffleState.join[1000x2]", join_all)
+
+    # a !join as every raffle feature sees it during a storm
+    raffle_features = [RaffleJoinFeature(), RaffleGiveawayFeature(), RaffleReportFeature()]
+    for label, text in (("join", "!join"), ("chat", "!joinx")):
+        def storm(msg=message("viewer", text), sender=NullSender()):
+            fresh(msg)
+            for feature in raffle_features:
+                drive(feature.on_message(msg, sender))
+        add(f"RaffleFeature.on_message[{label}x3]", storm)
+
+    auto_resp = AutoRespFeature()
+    sender = NullSender()
+    for label, text in (("chat", "hello chat"), ("con_word", "that was a Concert to remember"),
+                        ("nut", "nutButton nutButton"), ("long_chat", LONG_CHAT), ("unicode", UNICODE_CHAT)):
+        add(f"AutoRespFeature.on_message[{label}]",
+            lambda msg=message("viewer", text): drive(auto_resp.on_message(fresh(msg), sender)))
+
+    formatter = FontVariant.SansSerif.formatter(bold=True)
+    for label, text in (("short", "Raffle open!"), ("status", "Bot is up: 12 features, 3 channels " * 4),
+                        ("long", LONG_CHAT * 5), ("unicode", UNICODE_CHAT)):
+        add(f"AlphaFormatter[{label}]", lambda text=text: formatter(text))
+
+    uniquifier = Uniquifier()
+    # a full ring of recent messages, all due in the far future
+    for i in range(RECENT - 1):
+        uniquifier.sent(f"Raffle open! {i}", now=1e12)
+    uniquifier.sent("Raffle open!", now=1e12)
+    add("Uniquifier[fresh]", lambda: uniquifier("hello chat", now=1e12))
+    add("Uniquifier[repeat]", lambda: uniquifier("Raffle open!", now=1e12))
+
+    value = {"winners": ["a", "b"], "amount": 500}
+    for label, level in (("disabled", logging.INFO), ("enabled", logging.DEBUG)):
+        # not registered with the logging manager, so nothing else sees its records
+        logger = TctkLogger(f"tctk.bench.{label}", level)
+        logger.propagate = False
+        logger.addHandler(logging.NullHandler())
+        add(f"TctkLogger.variable[{label}]", lambda logger=logger: logger.variable(value))
+
+    json_formatter = ColoredJsonFormatter("%(name)s %(levelname)s %(message)s")
+    info = logging.LogRecord("tctk.bench", logging.INFO, __file__, 1, "Paying out %d coins", (500,), None)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        error = logging.LogRecord("tctk.bench", logging.ERROR, __file__, 1, "handler failed", (), sys.exc_info())
+    add("ColoredJsonFormatter.format[info]", lambda: json_formatter.format(info))
+    add("ColoredJsonFormatter.format[exception]", lambda: json_formatter.format(error))
+    return out
+
+
+@contextmanager
+def bench_state():
+    """Global state the benchmarks assume: an active raffle in BENCH_CHANNEL."""
+    from tctk.features.se.raffle.raffle_feature import Raffle, RaffleState
+    previous = RaffleState.channels.get(BENCH_CHANNEL)
+    state = RaffleState.channels[BENCH_CHANNEL] = RaffleState(BENCH_CHANNEL)
+    state.start(Raffle(0, 10**9, 500))
+    try:
+        yield
+    finally:
+        if previous is not None:
+            RaffleState.channels[BENCH_CHANNEL] = previous
+        else:
+            RaffleState.channels.pop(BENCH_CHANNEL, None)
+
+
+def selected(patterns: list[str]) -> list[Bench]:
+    found = benches()
+    if not patterns:
+        return found
+    return [b for b in found if any(fnmatch(b.name, p) or p in b.name for p in patterns)]
+
+
+def measure(bench: Bench, min_time: float = MIN_TIME, repeat: int = REPEAT) -> Result:
+    timer = timeit.Timer(bench.fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number * 1e9 for t in timer.repeat(repeat, number)]
+    return Result(statistics.median(times), min(times), number, repeat)
+
+
+def run(patterns: list[str] = (), min_time: float = MIN_TIME, repeat: int = REPEAT,
+        progress: Callable[[str, Result], None] | None = None) -> dict[str, Result]:
+    results = {}
+    with bench_state():
+        for bench in selected(list(patterns)):
+            results[bench.name] = measure(bench, min_time, repeat)
+            if progress is not None:
+                progress(bench.name, results[bench.name])
+    return results
+
+
+def save(results: dict[str, Result], path: Path | None = None) -> Path:
+    path = path or bench_dir().joinpath(f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "time": time.time()},
+        "results": {name: asdict(r) for name, r in results.items()},
+    }, indent=2))
+    return path
+
+
+def load(path: Path) -> dict[str, Result]:
+    return {name: Result(**r) for name, r in json.loads(Path(path).read_text())["results"].items()}
+
+
+def compare(current: dict[str, Result], baseline: dict[str, Result],
+            tolerance: float = TOLERANCE) -> list[tuple[str, float]]:
+    """(benchmark, current/baseline median) for every benchmark slower than ``tolerance``."""
+    slower = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None or not before.median_ns:
+            continue
+        ratio = result.median_ns / before.median_ns
+        if ratio > 1 + tolerance:
+            slower.append((name, ratio))
+    return slower
+
+
+def format_result(name: str, result: Result) -> str:
+    return f"{name:<45} {result.median_ns:>12,.0f} ns  (min {result.min_ns:,.0f}, {result.number:,} calls x {result.repeat})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("patterns", nargs="*")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+    results = run(args.patterns, args.min_time, args.repeat, lambda n, r: print(format_result(n, r)))
+    print(f"Results written to {save(results, args.output)}")
+    if args.compare:
+        for name, ratio in compare(results, load(args.compare)):
+            print(f"SLOWER {name}: {ratio:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,27 +2,30 @@ from enum import Enum, StrEnum, auto
 import logging
 from pathlib import Path
 from typing import Callable, Awaitable, Any, TypeVar, Optional
-import time
 
 from twitchAPI.twitch import Twitch
 from twitchAPI.chat import Chat, ChatEvent, ChatCommand, ChatMessage, EventData
 from twitchAPI.oauth import UserAuthenticationStorageHelper, UserAuthenticator
 from twitchAPI.type import AuthScope
-from .config import App, Config
+from .config import App, Config, ConfigWatcher
+from .outbound import MOD_RATE, QUEUE_SIZE, USER_RATE, OutboundScheduler, Overflow, Priority, TokenBucket
+from .isolation import isolate
+from .loopmon import LoopMonitor
+from .rooms import RoomDispatcher
+from .uniquifier import Uniquifier
 import asyncio
-import emoji
-from secrets import choice
 
 U = TypeVar('U', bound=Enum)
 
-def rand_emoji():
-    return choice([*emoji.EMOJI_DATA.keys()])
-
 async def show_user_auth_url(url: str):
     print(f"\n>>> Navigate to {url} to authorize twitch <<<\n", flush=True)
 
 # Define the required scopes
-async def get_chat(access_tokens_file: str = Config.get().bot_access_tokens_file, app: App = Config.get().app, scopes: list[AuthScope] = Config.get().scopes) -> tuple[Twitch, Chat]:
+async def get_chat(access_tokens_file: str | None = None, app: App | None = None, scopes: list[AuthScope] | None = None) -> tuple[Twitch, Chat]:
+    cfg = Config.get()
+    access_tokens_file = access_tokens_file or cfg.bot_access_tokens_file
+    app = app or cfg.app
+    scopes = scopes or list(cfg.scopes)
     # Set up twitch API instance and add user authentication
     twitch = await Twitch(app.id, app.secret)
 
@@ -50,72 +53,100 @@ async def get_chat(access_tokens_file: str = Config.get().bot_access_tokens_file
 logger = Config.logger(__name__)
 
 class ChannelSender(Chat):
-    def __init__(self, chat: Chat, channel: str):
+    """Sends to one channel through an OutboundScheduler, which enforces slow
+    mode and the account's rate limit and orders queued messages by priority."""
+
+    def __init__(self, chat: Chat, channel: str, bucket: TokenBucket | None = None,
+                 queue_size: int = QUEUE_SIZE, overflow: Overflow = Overflow.BLOCK,
+                 rooms: RoomDispatcher | None = None):
         self.chat = chat
         self.channel = channel
-        self._last_send_time: float = 0.0
-        self._slow_lock = asyncio.Lock()
+        self.rooms = rooms
+        # what was recently sent here, so send_unique only changes messages Twitch would reject as duplicates
+        self.uniquifier = Uniquifier()
+        self.scheduler = OutboundScheduler(self._send_now, self._get_slow_delay, self._get_rate_limit, bucket,
+                                           queue_size, overflow)
 
     @property
     def room(self):
         return None if self.channel not in self.chat.room_cache else self.chat.room_cache[self.channel]
 
+    @property
+    def _last_send_time(self) -> float:
+        return self.scheduler.last_send_time
+
+    @_last_send_time.setter
+    def _last_send_time(self, value: float):
+        self.scheduler.last_send_time = value
+
     def __getattr__(self, name: str) -> Any:
         # forward any unknown attribute/method access to the wrapped Chat
         return getattr(self.chat, name)
 
+    def register_event(self, event: ChatEvent, handler: Callable[[Any], Awaitable[Any]]):
+        """Register a Chat event handler that only sees this channel's events."""
+        if self.rooms is None:
+            self.chat.register_event(event, handler)
+        else:
+            self.rooms.register(self.channel, event, handler)
+
+    def unregister_event(self, event: ChatEvent, handler: Callable[[Any], Awaitable[Any]]) -> bool:
+        if self.rooms is None:
+            return self.chat.unregister_event(event, handler)
+        return self.rooms.unregister(self.channel, event, handler)
+
     def _get_slow_delay(self) -> int:
         return self.room.slow if self.room else 0
 
-    async def _wait_for_slow_mode(self):
-        slow = self._get_slow_delay()
-        logger.debug(f"slow: {slow}")
-        if slow > 0:
-            elapsed = time.monotonic() - self._last_send_time
-            logger.variable(elapsed)
-            if elapsed < slow:
-                await asyncio.sleep(slow - elapsed)
-
-    async def _delayed_send(self, text: str, delay: float = None):
-        if delay is not None:
-            await asyncio.sleep(delay)
-        if self.chat is not None:
-            async with self._slow_lock:
-                await self._wait_for_slow_mode()
-                await self.chat.send_message(self.channel, text)
-                self._last_send_time = time.monotonic()
-
-    async def send_message(self, text: str, delay: float = None):
-        await asyncio.create_task(self._delayed_send(text, delay))
-
-    async def send_unique(self, text: str, delay: float = None):
-        await asyncio.create_task(self._delayed_send(f"{text} {rand_emoji()}", delay))
-
-    async def send(self, text: str, delay: Optional[float] = None):
-        await self.send_message(text, delay)
-
-    async def send_result(self, gen_msg: Callable[[], str]) -> None:
-        """Wait for slow mode, then send only if guard() still holds."""
-        time_since_last_send_time = time.monotonic() - self._last_send_time
-        logger.variable(time_since_last_send_time)
-        logger.variable(self._slow_lock)
-        async with self._slow_lock:
-            logger.debug("in lock")
-            await self._wait_for_slow_mode()
-            msg = gen_msg()
-            logger.variable(msg)
-            await self.chat.send_message(self.channel, f'{msg} {rand_emoji()}')
-            self._last_send_time = time.monotonic()
-
-    async def send_guarded(self, text: str, guard: Callable[[], bool]) -> bool:
-        """Wait for slow mode, then send only if guard() still holds."""
-        async with self._slow_lock:
-            await self._wait_for_slow_mode()
-            if not guard():
-                return False
-            await self.chat.send_message(self.channel, text)
-            self._last_send_time = time.monotonic()
-            return True
+    def _get_rate_limit(self) -> int:
+        return MOD_RATE if self.chat.is_mod(self.channel) else USER_RATE
+
+    async def _send_now(self, text: str):
+        await self.chat.send_message(self.channel, text)
+        self.uniquifier.sent(text)
+
+    async def submit(self, text: str, delay: float = None, priority: Priority = Priority.NORMAL,
+                     ttl: float | None = None) -> asyncio.Future[bool]:
+        """Queue ``text`` without waiting for it to be sent.
+
+        The returned future resolves to True once sent, or False if dropped.
+        """
+        return await self.scheduler.submit(lambda: text, priority, ttl, delay)
+
+    async def submit_unique(self, text: str, delay: float = None, priority: Priority = Priority.NORMAL,
+                            ttl: float | None = None) -> asyncio.Future[bool]:
+        """Like ``submit``, but suffixed when sending it as is would repeat a recent message."""
+        return await self.scheduler.submit(lambda: self.uniquifier(text), priority, ttl, delay)
+
+    async def send_message(self, text: str, delay: float = None, priority: Priority = Priority.NORMAL,
+                           ttl: float | None = None) -> bool:
+        """Queue ``text`` and wait until it is sent (True) or dropped (False).
+
+        Cancelling the wait (e.g. a handler timing out) does not unqueue the message.
+        """
+        if self.chat is None:
+            return False
+        return await asyncio.shield(await self.submit(text, delay, priority, ttl))
+
+    async def send_unique(self, text: str, delay: float = None, priority: Priority = Priority.NORMAL,
+                          ttl: float | None = None) -> bool:
+        if self.chat is None:
+            return False
+        return await asyncio.shield(await self.submit_unique(text, delay, priority, ttl))
+
+    async def send(self, text: str, delay: Optional[float] = None, priority: Priority = Priority.NORMAL,
+                   ttl: float | None = None) -> bool:
+        return await self.send_message(text, delay, priority, ttl)
+
+    async def send_result(self, gen_msg: Callable[[], str], priority: Priority = Priority.NORMAL,
+                          ttl: float | None = None) -> bool:
+        """Queue a message whose text is generated by gen_msg() when it is actually sent (and made unique then)."""
+        return await asyncio.shield(await self.scheduler.submit(lambda: self.uniquifier(gen_msg()), priority, ttl))
+
+    async def send_guarded(self, text: str, guard: Callable[[], bool], priority: Priority = Priority.NORMAL,
+                           ttl: float | None = None) -> bool:
+        """Queue text, then send it only if guard() still holds when its turn comes."""
+        return await asyncio.shield(await self.scheduler.submit(lambda: text if guard() else None, priority, ttl))
 
 # Define your Client ID, Client Secret, bot username, and channel name
 class EventEmitter[U, T]:
@@ -123,54 +154,91 @@ class EventEmitter[U, T]:
         pass
 
 class ChatBot(EventEmitter[ChatEvent, EventData]):
-    def __init__(self, channel: str, access_tokens_file: Path):
-        self.channel = channel
+    """One Twitch connection joined to one or more channels.
+
+    Each channel gets its own ChannelSender; they share the connection, the
+    account's rate-limit bucket and a RoomDispatcher that delivers every
+    event only to the channel it happened in.
+    """
+
+    def __init__(self, channels: str | list[str], access_tokens_file: Path):
+        self.channels = [channels] if isinstance(channels, str) else list(channels)
         self.access_tokens_file = access_tokens_file
         self.chat = None
-        self.sender = None
+        self.rooms: RoomDispatcher | None = None
+        self.senders: dict[str, ChannelSender] = {}
+
+    @property
+    def channel(self) -> str:
+        return self.channels[0]
+
+    @property
+    def sender(self) -> ChannelSender | None:
+        """The first channel's sender."""
+        return self.senders.get(self.channel)
 
     @classmethod
-    async def create(cls, channel, access_tokens_file: str = Config.get().bot_access_tokens_file, subscriptions: list[tuple] = None, post_subscribe: Callable[['ChatBot'], Awaitable[Any]] | None = None):
+    async def create(cls, channel: str | list[str], access_tokens_file: str | None = None, subscriptions: list[tuple] = None, post_subscribe: Callable[['ChatBot'], Awaitable[Any]] | None = None,
+                     connect: Callable[[], Awaitable[tuple[Twitch, Chat]]] = get_chat):
+        Config.configure_logging()
         self = cls(channel, access_tokens_file)
-        await self.init(subscriptions or [], post_subscribe=post_subscribe)
+        await self.init(subscriptions or [], post_subscribe=post_subscribe, connect=connect)
         return self
 
     def subscribe(self, t: ChatEvent, cb: Callable[[EventData, ChannelSender], Awaitable[Any]]) -> None:
-        async def handler(*args):
-            arg_list = list(args)
-            if not self.sender:
-                self.sender = ChannelSender(self.chat, self.channel)
-            arg_list.append(self.sender)
-            await cb(*arg_list)
-        self.chat.register_event(t, handler)
+        """Subscribe cb to t in every channel; it is called with that channel's sender."""
+        guarded = isolate(getattr(cb, "__qualname__", "subscription"), getattr(cb, "__self__", None), cb)
+        for sender in self.senders.values():
+            async def handler(*args, sender=sender):
+                await guarded(*args, sender)
+            sender.register_event(t, handler)
+
+    def attach(self, chat: Chat):
+        self.chat = chat
+        self.rooms = RoomDispatcher(chat)
+        bucket = TokenBucket()
+        self.senders = {
+            channel: ChannelSender(chat, channel, bucket, rooms=self.rooms)
+            for channel in self.channels
+        }
 
     # Main function to run the bot
-    async def init(self, subscriptions: list[tuple] = None, post_subscribe: Callable[['ChatBot'], Awaitable[Any]] | None = None):
-        twitch, chat = await get_chat()
-        self.chat = chat
+    async def init(self, subscriptions: list[tuple] = None, post_subscribe: Callable[['ChatBot'], Awaitable[Any]] | None = None,
+                   connect: Callable[[], Awaitable[tuple[Twitch, Chat]]] = get_chat):
+        """Connect (through ``connect``, e.g. a FakeTwitch's), subscribe and join the channels."""
+        twitch, chat = await connect()
         self.twitch = twitch
+        self.attach(chat)
 
         for event_type, handler in (subscriptions or []):
             self.subscribe(event_type, handler)
 
-        self.sender = ChannelSender(self.chat, self.channel)
-
         if post_subscribe is not None:
             await post_subscribe(self)
 
-        # Connect and join the channel
+        # Connect and join the channels
         chat.start()
 
-        await chat.join_room(self.channel)
+        await chat.join_room(self.channels)
 
     async def run(self, before_stop: list[Callable[[], Awaitable[Any]]] | None = None):
         print('Bot is running. Press ENTER to stop.')
         loop = asyncio.get_running_loop()
+        monitor = LoopMonitor(threshold=Config.get().loop_stall_threshold,
+                              report_interval=Config.get().loop_lag_report_interval)
+        monitor.start()
+        watcher = ConfigWatcher()
+        watcher.start()
         try:
             await loop.run_in_executor(None, input)
         finally:
             for cb in (before_stop or []):
                 await cb()
+            watcher.stop()
+            await monitor.stop()
+            monitor.report()
+            for sender in self.senders.values():
+                await sender.scheduler.close()
             # Stop the bot and close the connection
             self.chat.stop()
-            await self.twitch.close()
\ No newline at end of file
+            await self.twitch.close()
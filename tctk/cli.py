@@ -1,41 +1,29 @@
 from inspect import iscoroutinefunction
-from typing import Type, Any
+from pathlib import Path
+from typing import Any
 
 import asyncclick as click
 
-from tctk.features.auto_resp_feature import AutoRespFeature
 from tctk.config import Config
-from tctk.features.se.raffle.raffle_features import RaffleGiveawayFeature, RaffleJoinFeature, RaffleReportFeature
-from tctk.features.status_notification import StatusNotificationFeature
 
 from . import BotFeature, Subscription
 from .bot import ChatBot
 from sys import modules
 import dataclasses
 
-from .features.se.duel.duel_bot import DuelBotFeature
-from .features.feature_manager import FeatureManagerFeature
-from .features.se.raffle.raffle_feature import RaffleFeature
-from .features.se.streamelements_tracker import StreamElementsTrackerFeature
+from .features.registry import FeatureRegistry
 
 logger = Config.logger(__name__)
 
-feature_registry: dict[str, Type[BotFeature]] = {
-    "dueler": DuelBotFeature,
-    "auto_responder": AutoRespFeature,
-    "raffle_join": RaffleJoinFeature,
-    "raffle_giveaway": RaffleGiveawayFeature,
-    "raffle_report": RaffleReportFeature,
-    "status_notification": StatusNotificationFeature,
-    "streamelements_tracker": StreamElementsTrackerFeature,
-}
+# Feature modules are imported when a feature is selected (see tctk.features.registry).
+feature_registry = FeatureRegistry()
 
 default_features = ["streamelements_tracker"]
 
 # Variant C: custom validation callback (useful for complex rules)
 def _validate_features(ctx, param, value):
     # value is a tuple when using nargs or multiple
-    invalid = [v for v in value if v not in feature_registry.keys()]
+    invalid = [v for v in value if v not in feature_registry]
     if invalid:
         raise click.BadParameter(f"Invalid feature(s): {', '.join(invalid)}.  Possible values: [{', '.join(feature_registry.keys())}]")
     return list(value)
@@ -46,74 +34,232 @@ def _validate_features(ctx, param, value):
 #   * Feature event subscriptions are retrieved
 #   * ChatBot is instantiated, passing the subscriptions
 #       * ChatBot class is instantiated
-#       * ChatBot subscribes the features to its events
+#       * ChatBot subscribes the features to its events (MESSAGE handlers
+#         go through the feature manager's MessageRouter)
 #   * ChatBot is started
 #   * ChatBot joins channel (emitting the JOINED event)
 
-@click.command()
-@click.option("--channel", "-c", "channel", default=Config.get().channel)
+class DefaultGroup(click.Group):
+    """A group that falls back to ``default_command`` when the first argument
+    is not a subcommand, so ``tctk auto_responder`` keeps meaning ``tctk run auto_responder``."""
+
+    def __init__(self, *args, default_command: str = "run", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if not args or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup)
+def cli():
+    Config.configure_logging()
+
+
+def expand_deps(names) -> list[str]:
+    seen: dict[str, None] = {}
+    def visit(n):
+        if n in seen:
+            return
+        for dep in getattr(feature_registry[n], "requires", []) or []:
+            visit(dep)
+        seen[n] = None
+    for n in names:
+        visit(n)
+    return list(seen.keys())
+
+
+# channel -> (its feature manager, its active features); nothing is shared
+# between channels except what features share deliberately (e.g. the tracker writer)
+type ChannelFeatures = dict[str, tuple["FeatureManagerFeature", dict[str, BotFeature]]]
+
+
+async def start_features(channels, features: list[str], feature_args: dict[str, dict[str, Any]],
+                         instrument=None) -> ChannelFeatures:
+    """Instantiate and start ``features`` (dependencies included) with a feature manager in each channel."""
+    from .features.feature_manager import FeatureManagerFeature
+    channel_features: ChannelFeatures = {}
+    for channel in dict.fromkeys(channels):
+        active: dict[str, BotFeature] = {}
+        for feature in expand_deps(features):
+            if feature in feature_args:
+                active[feature] = feature_registry[feature](**feature_args[feature])
+            else:
+                active[feature] = feature_registry[feature]()
+
+        manager = FeatureManagerFeature(
+            feature_registry=feature_registry,
+            active=active,
+            feature_args=feature_args,
+            instrument=instrument,
+        )
+        active["feature_manager"] = manager
+        channel_features[channel] = (manager, active)
+
+        for feature in active.values():
+            if iscoroutinefunction(feature.on_start):
+                await feature.on_start()
+            else:
+                feature.on_start()
+    return channel_features
+
+
+def subscribe_features(bot: ChatBot, channel_features: ChannelFeatures):
+    for channel, (manager, active) in channel_features.items():
+        sender = bot.senders[channel]
+        manager.attach(sender)
+        for name, feature in active.items():
+            manager.subscribe(name, feature, sender)
+
+
+async def stop_features(bot: ChatBot, channel_features: ChannelFeatures):
+    for channel, (_, active) in channel_features.items():
+        for feature in active.values():
+            if iscoroutinefunction(feature.on_exit):
+                await feature.on_exit(bot.senders[channel])
+            else:
+                feature.on_exit(bot.senders[channel])
+
+
+@cli.command()
+@click.option("--channel", "-c", "channels", multiple=True, default=lambda: [Config.get().channel],
+              help="Channel to join (repeatable); every channel runs its own FEATURES.")
 @click.option("--updates")
+@click.option("--record", type=click.Path(dir_okay=False, path_type=Path),
+              help="Also write every chat event to this log, for tctk replay.")
+@click.option("--startup-profile", is_flag=True,
+              help="Report how long startup with FEATURES takes and which imports dominate, then exit.")
 @click.argument("features", nargs=-1, callback=_validate_features)
-async def cli(channel, updates, features):
-    def expand_deps(names):
-        seen: dict[str, None] = {}
-        def visit(n):
-            if n in seen:
-                return
-            for dep in getattr(feature_registry[n], "requires", []) or []:
-                visit(dep)
-            seen[n] = None
-        for n in names:
-            visit(n)
-        return list(seen.keys())
-
-    features = expand_deps(dict.fromkeys(default_features + list(features)))
-    feature_args: dict[str, dict[str, Any]] = {
-        "raffle_tracker": {"raffle_bot_username": Config.get().raffle_authority_user}
-    }
+async def run(channels, updates, record, startup_profile, features):
+    """Connect to chat and run FEATURES (plus the defaults) in each channel."""
+    if startup_profile:
+        from tctk import startup
+        click.echo(startup.format_profile(startup.profile(expand_deps(default_features + list(features)))))
+        return
+    feature_args: dict[str, dict[str, Any]] = {}
     if updates is not None:
         feature_args['status_notification'] = { "updates_message": updates }
 
-    active: dict[str, BotFeature] = {}
-    for feature in features:
-        if feature in feature_args:
-            active[feature] = feature_registry[feature](**feature_args[feature])
-        else:
-            active[feature] = feature_registry[feature]()
-
-    manager = FeatureManagerFeature(
-        feature_registry=feature_registry,
-        active=active,
-        feature_args=feature_args,
-    )
-    active["feature_manager"] = manager
-
-    for feature in active.values():
-        if iscoroutinefunction(feature.on_start):
-            await feature.on_start()
-        else:
-            feature.on_start()
+    from .replay import ChatRecorder
+    channel_features = await start_features(channels, default_features + list(features), feature_args)
+    recorder: ChatRecorder | None = None
 
     async def register_initial_features(b):
-        for name, feature in active.items():
-            handlers: list[tuple[Any, Any]] = []
-            for event_type, cb in feature.get_subscriptions():
-                wrapper = manager._wrap_subscription(cb, b.sender)
-                b.chat.register_event(event_type, wrapper)
-                handlers.append((event_type, wrapper))
-            manager.record_initial_handlers(name, handlers)
+        nonlocal recorder
+        if record is not None:
+            recorder = ChatRecorder(record, b.chat.username)
+            for sender in b.senders.values():
+                recorder.attach(sender)
+        subscribe_features(b, channel_features)
 
     bot = await ChatBot.create(
-        channel=channel,
+        channel=list(channel_features),
         subscriptions=[],
         post_subscribe=register_initial_features,
     )
 
-    async def stop_features():
-        for feature in active.values():
-            if iscoroutinefunction(feature.on_exit):
-                await feature.on_exit(bot.sender)
-            else:
-                feature.on_exit(bot.sender)
+    async def stop():
+        await stop_features(bot, channel_features)
+        if recorder is not None:
+            recorder.close()
+
+    await bot.run(before_stop=[stop])
+
+
+@cli.command()
+@click.argument("log", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("features", nargs=-1, callback=_validate_features)
+@click.option("--speed", default="max", show_default=True,
+              help="1 replays at the recorded pace, N at N times that pace, max as fast as possible.")
+@click.option("--drain", type=float, default=5.0, show_default=True,
+              help="Seconds to wait for handlers still running after the last event.")
+@click.option("--show-sent/--no-show-sent", default=True, show_default=True,
+              help="Print the messages that would have been sent.")
+async def replay(log, features, speed, drain, show_sent):
+    """Feed a chat log written by ``run --record`` through FEATURES, without connecting.
+
+    Unlike run, the default features are only started when named. Whatever
+    the features write goes to a temporary data directory, and tracked duels
+    and raffles never reach Postgres.
+    """
+    if speed != "max":
+        try:
+            speed = float(speed)
+        except ValueError:
+            raise click.BadParameter(f"expected a number or max, got {speed}", param_hint="--speed")
+    from .replay import replay as replay_log
+    channel_features: ChannelFeatures = {}
+
+    async def setup(bot, timings):
+        channel_features.update(await start_features(bot.channels, list(features), {}, instrument=timings))
+        subscribe_features(bot, channel_features)
+        return [manager for manager, _ in channel_features.values()]
+
+    async def teardown(bot):
+        await stop_features(bot, channel_features)
+
+    report = await replay_log(log, setup, speed=None if speed == "max" else speed, drain=drain,
+                              teardown=teardown)
+    if show_sent:
+        for sent in report.sent:
+            click.echo(f"[{sent.t:9.3f}s] #{sent.channel}: {sent.text}")
+    click.echo(str(report))
+
+
+@cli.command()
+@click.argument("report", type=click.Choice(["raffles", "duels", "activity"]))
+@click.option("--since", type=click.DateTime(["%Y-%m-%d"]), help="First day included (UTC).")
+@click.option("--until", type=click.DateTime(["%Y-%m-%d"]), help="First day excluded (UTC).")
+@click.option("--user", "users", multiple=True, help="Only these users (repeatable).")
+@click.option("--every", default="1d", show_default=True, help="Bucket size for activity, e.g. 1h, 1d, 1w.")
+@click.option("--kind", type=click.Choice(["raffle", "duel"]), default="raffle", show_default=True,
+              help="Which history activity counts.")
+@click.option("--top", type=int, default=20, show_default=True, help="Rows to print.")
+@click.option("--sync-postgres", is_flag=True, help="Copy new tracker rows from Postgres into the store first.")
+def stats(report, since, until, users, every, kind, top, sync_postgres):
+    """Report raffle/duel history from the Parquet store."""
+    import polars as pl
+    from tctk import analytics
+    from tctk.features.se.store import Duel, UserRaffle
+
+    if sync_postgres:
+        analytics.sync_from_postgres(Config.get().rdbms_connection_string)
+
+    window = analytics.TimeRange(since.date() if since else None, until.date() if until else None)
+    if report == "raffles":
+        lf = analytics.raffle_user_stats(UserRaffle.scan(), window, list(users))
+    elif report == "duels":
+        lf = analytics.duel_user_stats(Duel.scan(), window, list(users))
+    elif kind == "raffle":
+        lf = analytics.raffle_activity(every, window)
+    else:
+        lf = analytics.duel_activity(every, window)
+
+    with pl.Config(tbl_rows=top):
+        click.echo(analytics.collect(lf.head(top)))
+
+
+@cli.command()
+@click.argument("patterns", nargs=-1)
+@click.option("--repeat", type=int, default=5, show_default=True, help="Timing repeats per benchmark.")
+@click.option("--min-time", type=float, default=0.05, show_default=True, help="Seconds per repeat, at least.")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path),
+              help="Results file (default: data_dir/bench/<time>.json).")
+@click.option("--compare", "baseline", type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help="Earlier results file to compare against; exits 1 on a regression.")
+@click.option("--tolerance", type=float, default=0.10, show_default=True,
+              help="Slowdown (relative median) reported as a regression.")
+def bench(patterns, repeat, min_time, output, baseline, tolerance):
+    """Micro-benchmark the per-message hot paths matching PATTERNS (default: all)."""
+    from tctk.bench import suite
 
-    await bot.run(before_stop=[stop_features])
+    results = suite.run(list(patterns), min_time, repeat, lambda n, r: click.echo(suite.format_result(n, r)))
+    click.echo(f"Results written to {suite.save(results, output)}")
+    if baseline is not None:
+        slower = suite.compare(results, suite.load(baseline), tolerance)
+        for name, ratio in slower:
+            click.echo(f"SLOWER {name}: {ratio:.2f}x")
+        if slower:
+            raise click.exceptions.Exit(1)
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from enum import StrEnum, auto
+from functools import cached_property
 import yaml
 from typing import ClassVar, Optional, Callable, Self
 import dataclasses
@@ -10,7 +11,11 @@ from string import ascii_lowercase, ascii_uppercase
 from twitchAPI.type import AuthScope
 import unicodedata
 import os
+import threading
 from tctk.log_formatter import TctkLogger
+from tctk.word_matcher import WordMatcher
+
+logger = logging.getLogger(__name__)
 
 PROJECT_DIR = Path(__file__).resolve().parent.parent
 
@@ -19,7 +24,15 @@ def conf_path() -> Path:
 
 def logging_conf_path() -> Path:
     return PROJECT_DIR.joinpath("logging.yaml")
-@dataclass
+
+def _stat(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+@dataclass(frozen=True)
 class App:
     id: str
     secret: str
@@ -50,12 +63,52 @@ class Command(StrEnum):
         l = [str(self), *[str(arg) for arg in args]]
         return " ".join(l)
 
-@dataclass
+@dataclass(frozen=True)
+class MaxDuel:
+    """max_duel_amt parsed: a fixed amount, or a share of the bot's coins but at least ``floor``."""
+    amount: int | None
+    fraction: float | None
+    floor: int = 0
+
+    @staticmethod
+    def parse(max_duel_amt: int | str, floor: int = 0) -> MaxDuel:
+        if isinstance(max_duel_amt, str) and max_duel_amt.endswith('%'):
+            return MaxDuel(None, float(max_duel_amt[:-1]) / 100, floor)
+        return MaxDuel(int(max_duel_amt), None, floor)
+
+    def resolve(self, current_coins: int | None) -> int | None:
+        """The largest duel to accept; None for a share of coins not known yet."""
+        if self.fraction is None:
+            return self.amount
+        if current_coins is None:
+            return None
+        return max(int(current_coins * self.fraction), self.floor)
+
+
+# Derived attribute -> the fields it is computed from. A new snapshot keeps
+# the previous snapshot's value while those fields are unchanged.
+_DERIVED: dict[str, tuple[str, ...]] = {
+    "duel_authority": ("duel_authority_user",),
+    "raffle_authority": ("raffle_authority_user",),
+    "config_user": ("bot_config_user",),
+    "authorities": ("duel_authority_user", "raffle_authority_user"),
+    "timeout_matcher": ("auto_timeout_words",),
+    "max_duel": ("max_duel_amt", "min_max_duel_amt_if_percent"),
+}
+
+
+@dataclass(frozen=True)
 class Config:
+    """One immutable snapshot of config.yaml.
+
+    ``Config.get()`` returns the current snapshot. Changes (``replace``, or
+    an edit picked up by a ConfigWatcher) swap in a new one, so a handler
+    holding a snapshot never sees it change halfway through.
+    """
     app: App
-    scopes: list[AuthScope]
+    scopes: tuple[AuthScope, ...]
     rdbms_connection_string: str
-    auto_timeout_words: str
+    auto_timeout_words: tuple[str, ...]
     raffle_authority_user: str
     duel_authority_user: str
     channel: str
@@ -63,8 +116,49 @@ class Config:
     min_max_duel_amt_if_percent: int
     bot_access_tokens_file: str
     bot_config_user: str
+    # Seconds a feature handler may run before it is cancelled (see tctk.isolation).
+    handler_timeout: float = 30.0
+    # Threads running handlers of features declared blocking.
+    blocking_workers: int = 4
+    # Loop stalls longer than this many seconds are sampled and logged (see tctk.loopmon).
+    loop_stall_threshold: float = 0.1
+    # Seconds between event-loop lag reports.
+    loop_lag_report_interval: float = 60.0
+    # Seconds between checks of config.yaml for edits (see ConfigWatcher).
+    reload_interval: float = 2.0
     conf: ClassVar[Optional[Config]] = None
     log_conf_loaded: ClassVar[bool] = False
+    # (st_mtime_ns, st_size) of config.yaml as last read or written
+    _file_stat: ClassVar[tuple[int, int] | None] = None
+    _write_lock: ClassVar[threading.Lock] = threading.Lock()
+    _listeners: ClassVar[list[Callable[[Config | None, Config], None]]] = []
+    # set while tctk replay runs, so nothing it writes lands in the real data_dir
+    data_dir_override: ClassVar[Path | None] = None
+
+    # casefolded names, compared against casefolded chat user names
+    @cached_property
+    def duel_authority(self) -> str:
+        return self.duel_authority_user.casefold()
+
+    @cached_property
+    def raffle_authority(self) -> str:
+        return self.raffle_authority_user.casefold()
+
+    @cached_property
+    def config_user(self) -> str:
+        return self.bot_config_user.casefold()
+
+    @cached_property
+    def authorities(self) -> frozenset[str]:
+        return frozenset(u.casefold() for u in (self.duel_authority_user, self.raffle_authority_user) if u)
+
+    @cached_property
+    def timeout_matcher(self) -> WordMatcher:
+        return WordMatcher(self.auto_timeout_words)
+
+    @cached_property
+    def max_duel(self) -> MaxDuel:
+        return MaxDuel.parse(self.max_duel_amt, self.min_max_duel_amt_if_percent)
 
     @staticmethod
     def build_type():
@@ -76,50 +170,159 @@ class Config:
 
     @staticmethod
     def data_dir():
+        if Config.data_dir_override is not None:
+            return Config.data_dir_override
         suff = {"production": "", "test": "/test", "staging": "/staging"}
         s = suff[Config.build_type()]
         return Path.home().joinpath(f"var/log/tctk{s}")
 
+    @staticmethod
+    def get() -> Self:
+        return Config.conf or Config.reload()
+
+    @staticmethod
+    def read(path: Path) -> Config:
+        with path.open() as f:
+            yaml_dict: dict = yaml.safe_load(f)
+        yaml_dict['app'] = App(**yaml_dict['app'])
+        yaml_dict['scopes'] = tuple(AuthScope(s) for s in yaml_dict['scopes'])
+        yaml_dict['auto_timeout_words'] = tuple(yaml_dict.get('auto_timeout_words') or ())
+        return Config(**yaml_dict)
+
+    @staticmethod
+    def reload() -> Config:
+        """Read config.yaml and swap it in."""
+        path = conf_path()
+        stat = _stat(path)
+        Config.swap(Config.read(path))
+        Config._file_stat = stat
+        return Config.conf
+
+    @staticmethod
+    def swap(new: Config):
+        """Make ``new`` the current snapshot, keeping derived values whose inputs did not change."""
+        old = Config.conf
+        if old is not None:
+            for name, inputs in _DERIVED.items():
+                if name in old.__dict__ and all(getattr(old, f) == getattr(new, f) for f in inputs):
+                    new.__dict__[name] = old.__dict__[name]
+        Config.conf = new
+        for listener in list(Config._listeners):
+            listener(old, new)
+
+    @staticmethod
+    def on_change(listener: Callable[[Config | None, Config], None]):
+        """Call ``listener(old, new)`` after every swap, on the thread doing the swap."""
+        Config._listeners.append(listener)
+
+    @staticmethod
+    def replace(**changes) -> Config:
+        """Swap in a copy of the current snapshot with ``changes``. Does not write config.yaml (see persist)."""
+        Config.swap(dataclasses.replace(Config.get(), **changes))
+        return Config.conf
+
+    @staticmethod
+    def _yaml_dict(conf: Config) -> dict:
+        d = dataclasses.asdict(conf)
+        d['scopes'] = [s.value for s in conf.scopes]
+        d['auto_timeout_words'] = list(conf.auto_timeout_words)
+        return d
+
     @staticmethod
     def backup():
-        Config.conf = Config.get()
-        d = dataclasses.asdict(Config.conf)
-        d['scopes'] = [s.value for s in Config.conf.scopes]
         with conf_path().with_suffix(".back").open('w') as f:
-            yaml.dump(d, f)
+            yaml.dump(Config._yaml_dict(Config.get()), f)
 
     @staticmethod
-    def persist_with(update: Callable[[Config], None]):
-        Config.conf = Config.get()
-        update(Config.conf)
-        d = dataclasses.asdict(Config.conf)
-        d['scopes'] = [s.value for s in Config.conf.scopes]
-        with conf_path().open('w') as f:
-            yaml.dump(d, f)
+    def persist():
+        """Write the current snapshot to config.yaml.
+
+        Blocking (run it through tctk.isolation.offload): the file is written
+        to a temporary file beside it and renamed over it, so a crash leaves
+        either the old or the new file. Concurrent calls write one at a time,
+        each writing the latest snapshot.
+        """
+        path = conf_path()
+        with Config._write_lock:
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            try:
+                with tmp.open('w') as f:
+                    yaml.dump(Config._yaml_dict(Config.get()), f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+            Config._file_stat = _stat(path)
 
     @staticmethod
-    def get() -> Self:
-        if Config.conf is None:
-            with conf_path().open() as f:
-                yaml_dict: dict = yaml.safe_load(f)
-                yaml_dict['app'] = App(**yaml_dict['app'])
-                Config.conf = Config(**yaml_dict)
-                Config.conf.scopes = [AuthScope(s) for s in Config.conf.scopes]
-        return Config.conf
+    def persist_with(**changes):
+        """``replace`` then ``persist``."""
+        Config.replace(**changes)
+        Config.persist()
 
     @staticmethod
     def logger(module: str, reload: bool = False) -> TctkLogger:
-        def configure_logging():
-            with logging_conf_path().open("r") as f:
-                config = yaml.safe_load(f.read())
-                log_dir = Config.data_dir()
-                log_dir.mkdir(parents=True, exist_ok=True)
-                file_cfg = config.get("handlers", {}).get("file_handler")
-                if file_cfg:
-                    file_cfg["filename"] = str(log_dir / file_cfg["filename"])
-                logging.config.dictConfig(config)
-        if reload or not Config.log_conf_loaded:
-            configure_logging()
-            Config.log_conf_loaded = True
-
-        return logging.getLogger(module)
\ No newline at end of file
+        # modules call this at import, so it must not read files or touch the disk
+        if reload:
+            Config.configure_logging(reload=True)
+        return logging.getLogger(module)
+
+    @staticmethod
+    def configure_logging(reload: bool = False):
+        """Apply logging.yaml, creating the log directory. Done once, when the CLI or a bot starts."""
+        if Config.log_conf_loaded and not reload:
+            return
+        with logging_conf_path().open("r") as f:
+            config = yaml.safe_load(f.read())
+            log_dir = Config.data_dir()
+            log_dir.mkdir(parents=True, exist_ok=True)
+            file_cfg = config.get("handlers", {}).get("file_handler")
+            if file_cfg:
+                file_cfg["filename"] = str(log_dir / file_cfg["filename"])
+            logging.config.dictConfig(config)
+        Config.log_conf_loaded = True
+
+
+class ConfigWatcher:
+    """Reloads config.yaml when it is edited, from a daemon thread that polls its mtime.
+
+    Writes by Config.persist are not reloads. A file that fails to parse is
+    logged and the current snapshot kept.
+    """
+
+    def __init__(self, interval: float | None = None):
+        self.interval = Config.get().reload_interval if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def check(self) -> bool:
+        """Reload if the file changed since it was last read or written. True if it was reloaded."""
+        stat = _stat(conf_path())
+        if stat is None or stat == Config._file_stat:
+            return False
+        try:
+            Config.reload()
+        except Exception:
+            # remember the broken file, so it is reported once rather than every interval
+            Config._file_stat = stat
+            logger.exception("config.yaml changed but could not be loaded; keeping the current config")
+            return False
+        logger.info("config.yaml reloaded")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        Config.get()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
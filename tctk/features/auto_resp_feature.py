@@ -3,11 +3,10 @@ import re
 from typing import Awaitable, Callable
 
 from twitchAPI.chat import ChatMessage
-from functools import reduce
 from tctk.bot import ChannelSender
 from tctk.config import Command, Config
+from tctk.outbound import Priority
 from tctk.features.message_bot import MessageBotFeature
-from functools import reduce
 
 WITHDRAW_PATTERN = re.compile(f"\b{Command.withdraw}\b(?P<amount>[0-9]+)")
 CON_WORD_PATTERN = re.compile(r"\bcon\w*", re.IGNORECASE)
@@ -22,29 +21,29 @@ def replace_con_words(text: str) -> str:
 async def nut(msg: ChatMessage, sender: ChannelSender):
     # Nut button 'functionality'
     if "nutButton" in msg.text:
-        await sender.send_unique("gachiHYPER l! uwotWater")
+        await sender.submit_unique("gachiHYPER l! uwotWater", priority=Priority.LOW)
 
 async def kon(msg: ChatMessage, sender: ChannelSender):
     # Go Hornets
     if CON_WORD_PATTERN.search(msg.text) is not None:
-        if reduce(lambda a, b: a or b, [bw in msg.text.lower() for bw in Config.get().auto_timeout_words]):
-            await sender.send_unique("Fricc")
+        if Config.get().timeout_matcher.search(msg.text) is not None:
+            await sender.submit_unique("Fricc", priority=Priority.LOW)
         else:
             text = msg.text.replace("Concern", "")
             match = CON_WORD_PATTERN.search(text)
             if match is not None:
                 response = replace_con_words(match.group())
                 response = f"bUrself {response} ? bUrself LETSGOOO"
-                await sender.send_unique(response)
+                await sender.submit_unique(response, priority=Priority.LOW)
 
 async def are_mod(msg: ChatMessage, sender: ChannelSender):
     # ARE MOD HandsUp is an awesome mod HandsUp HE REIGNS HandsUp
     if ARE_MOD_PATTERN.search(msg.text) is not None:
-        await sender.send_unique("HE REIGNS HandsUp")
+        await sender.submit_unique("HE REIGNS HandsUp", priority=Priority.LOW)
 
 async def batman(msg: ChatMessage, sender: ChannelSender):
     if "BatMan" in msg.text:
-        await sender.send_unique("BatMan I'm the REAL BATMAN ReallyMad BatMan")
+        await sender.submit_unique("BatMan I'm the REAL BATMAN ReallyMad BatMan", priority=Priority.LOW)
 
 decorators: list[Callable[[ChatMessage, ChannelSender], Awaitable[None]]] = [
     nut,
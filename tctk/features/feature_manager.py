@@ -1,17 +1,26 @@
 import logging
+from collections.abc import Mapping
 from inspect import iscoroutinefunction
-from typing import Any, Type
+from typing import Any, Callable, Type
 
 from twitchAPI.chat import ChatMessage
+from twitchAPI.type import ChatEvent
 
 from tctk import BotFeature, ChannelSender, Subscription
 from tctk.config import Config
 from tctk.features.message_bot import MessageBotFeature
+from tctk.features.message_router import MessageInterest, MessageRouter
+from tctk.features.profiling import ProfileSession, profiled, top_functions
+from tctk import loopmon
+from tctk.identity import identity_of
+from tctk.isolation import isolate
 
 logger = logging.getLogger(__name__)
 
 PROTECTED_FEATURES: set[str] = {"streamelements_tracker"}
 
+PROFILE_USAGE = "usage: !profile start [feature_name] | !profile stop"
+
 
 class FeatureManagerFeature(MessageBotFeature):
     """Provides chat commands to list, add, and remove features at runtime.
@@ -20,15 +29,21 @@ class FeatureManagerFeature(MessageBotFeature):
         !features                  - list active features
         !feature_add <name>        - instantiate, start, and subscribe a feature
         !feature_remove <name>     - unsubscribe and stop a feature
+        !profile start [name]      - profile one feature's handlers (default: all)
+        !profile stop              - stop, dump stats to data_dir/profiles, reply with the top functions
 
     Features in PROTECTED_FEATURES cannot be removed.
+
+    ChatEvent.MESSAGE handlers are not registered with Chat individually; they
+    are added to ``self.router``, which holds the only MESSAGE subscription.
     """
 
     def __init__(
         self,
-        feature_registry: dict[str, Type[BotFeature]],
+        feature_registry: Mapping[str, Type[BotFeature]],
         active: dict[str, BotFeature],
         feature_args: dict[str, dict[str, Any]] | None = None,
+        instrument: Callable[[str, Callable], Callable] | None = None,
     ):
         self.feature_registry = feature_registry
         # name -> (feature instance, [(event_type, wrapper_handler), ...])
@@ -36,12 +51,31 @@ class FeatureManagerFeature(MessageBotFeature):
             name: (inst, []) for name, inst in active.items()
         }
         self.feature_args = feature_args or {}
+        self.router = MessageRouter()
+        self.profile: ProfileSession | None = None
+        # wraps every handler before it is subscribed, e.g. to time it (see tctk.replay)
+        self.instrument = instrument
 
-    def record_initial_handlers(self, name: str, handlers: list[tuple[Any, Any]]):
-        """Called by cli after initial subscription to track handlers for later removal."""
-        if name in self.active:
-            inst, _ = self.active[name]
-            self.active[name] = (inst, handlers)
+    def attach(self, sender: ChannelSender):
+        """Register the router as the single MESSAGE handler on the sender's Chat."""
+        sender.register_event(ChatEvent.MESSAGE, self.router.subscription(sender))
+
+    def subscribe(self, name: str, feature: BotFeature, sender: ChannelSender):
+        """Subscribe an instantiated feature and track its handlers for later removal."""
+        handlers: list[tuple[Any, Any]] = []
+        for event_type, cb in feature.get_subscriptions():
+            loopmon.register(name, cb)
+            if self.instrument is not None:
+                cb = self.instrument(name, cb)
+            if event_type == ChatEvent.MESSAGE:
+                guarded = isolate(name, feature, cb)
+                self.router.add(name, guarded)
+                handlers.append((event_type, guarded))
+            else:
+                wrapper = self._wrap_subscription(isolate(name, feature, cb), sender)
+                sender.register_event(event_type, wrapper)
+                handlers.append((event_type, wrapper))
+        self.active[name] = (feature, handlers)
 
     def _instantiate(self, name: str) -> BotFeature:
         cls = self.feature_registry[name]
@@ -73,14 +107,7 @@ class FeatureManagerFeature(MessageBotFeature):
         else:
             feature.on_start()
 
-        chat = sender.chat
-        handlers: list[tuple[Any, Any]] = []
-        for event_type, cb in feature.get_subscriptions():
-            wrapper = self._wrap_subscription(cb, sender)
-            chat.register_event(event_type, wrapper)
-            handlers.append((event_type, wrapper))
-
-        self.active[name] = (feature, handlers)
+        self.subscribe(name, feature, sender)
         return f"added {name}"
 
     async def _add(self, name: str, sender: ChannelSender) -> str:
@@ -111,10 +138,12 @@ class FeatureManagerFeature(MessageBotFeature):
 
     async def _remove_one(self, name: str, sender: ChannelSender) -> str:
         feature, handlers = self.active.pop(name)
-        chat = sender.chat
         for event_type, wrapper in handlers:
+            if event_type == ChatEvent.MESSAGE:
+                self.router.remove(wrapper)
+                continue
             try:
-                chat.unregister_event(event_type, wrapper)
+                sender.unregister_event(event_type, wrapper)
             except Exception as e:
                 logger.warning(f"failed to unregister handler for {name}: {e}")
 
@@ -151,25 +180,72 @@ class FeatureManagerFeature(MessageBotFeature):
             results.append(await self._remove_one(n, sender))
         return "; ".join(results)
 
+    def _profile_handlers(self, session: ProfileSession, name: str, sender: ChannelSender):
+        _, handlers = self.active[name]
+        for i, (event_type, handler) in enumerate(handlers):
+            wrapper = profiled(handler, session.profiler)
+            if event_type == ChatEvent.MESSAGE:
+                # routes stay keyed by the original handler; only what they call changes
+                route = self.router.route_for(handler)
+                route.handler = wrapper
+
+                def restore(route=route, handler=handler):
+                    route.handler = handler
+            else:
+                sender.unregister_event(event_type, handler)
+                sender.register_event(event_type, wrapper)
+                handlers[i] = (event_type, wrapper)
+
+                def restore(handlers=handlers, i=i, event_type=event_type, handler=handler, wrapper=wrapper):
+                    if handlers[i] == (event_type, wrapper) and sender.unregister_event(event_type, wrapper):
+                        sender.register_event(event_type, handler)
+                        handlers[i] = (event_type, handler)
+            session.restores.append(restore)
+
+    def _profile_start(self, name: str | None, sender: ChannelSender) -> str:
+        if self.profile is not None:
+            return f"already profiling {self.profile.label}"
+        if name is not None and name not in self.active:
+            return f"{name} not active"
+        session = ProfileSession([name] if name else [])
+        for n in ([name] if name else [n for n in self.active if n != "feature_manager"]):
+            self._profile_handlers(session, n, sender)
+        self.profile = session
+        return f"profiling {session.label}"
+
+    def _profile_stop(self) -> str:
+        if self.profile is None:
+            return "not profiling"
+        session, self.profile = self.profile, None
+        stats = session.stop()
+        top = top_functions(stats) if stats is not None else []
+        if not top:
+            return f"{session.label}: no handler calls recorded"
+        path = session.dump(stats)
+        logger.info(f"Profile of {session.label} written to {path}")
+        return f"{session.label} top cumulative: " + "; ".join(f"{fn} {t * 1000:.1f}ms" for fn, t in top)
+
     def _list(self) -> str:
         if not self.active:
             return "no active features"
         names = sorted(self.active.keys())
         return "features: " + ", ".join(names)
 
+    def message_interest(self) -> MessageInterest:
+        return MessageInterest.of(authors=[Config.get().bot_config_user])
+
     async def on_message(self, msg: ChatMessage, sender: ChannelSender):
         text = msg.text.strip()
         if not text.startswith("!"):
             return
 
-        cfg = Config.get()
         parts = text.split()
         cmd = parts[0]
 
-        if cmd not in ("!features", "!feature_add", "!feature_remove"):
+        if cmd not in ("!features", "!feature_add", "!feature_remove", "!profile"):
             return
 
-        if msg.user.name.casefold() != cfg.bot_config_user.casefold():
+        if not identity_of(msg).is_config_user:
             return
 
         if cmd == "!features":
@@ -177,7 +253,16 @@ class FeatureManagerFeature(MessageBotFeature):
             return
 
         if len(parts) < 2:
-            await sender.send_message(f"usage: {cmd} <feature_name>")
+            await sender.send_message(PROFILE_USAGE if cmd == "!profile" else f"usage: {cmd} <feature_name>")
+            return
+
+        if cmd == "!profile":
+            if parts[1] == "start":
+                await sender.send_message(self._profile_start(parts[2] if len(parts) > 2 else None, sender))
+            elif parts[1] == "stop":
+                await sender.send_message(self._profile_stop())
+            else:
+                await sender.send_message(PROFILE_USAGE)
             return
 
         name = parts[1]
@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from typing import Callable, Awaitable, Any, Coroutine
 
 from tctk import BotFeature, ChannelSender
+from tctk.features.message_router import MessageInterest, routed
 from twitchAPI.chat import EventData, ChatMessage
 from twitchAPI.type import ChatEvent
 
@@ -11,7 +12,11 @@ class MessageBotFeature(BotFeature):
     async def on_message(self, msg, sender):
         pass
 
+    def message_interest(self) -> MessageInterest | None:
+        """Authors/commands this feature's on_message cares about; None means every message."""
+        return None
+
     def get_subscriptions(self) -> list[tuple[Any, Callable[[ChatMessage, ChannelSender], Coroutine[Any, Any, None]]]]:
         async def f(msg: ChatMessage, sender: ChannelSender):
             await self.on_message(msg, sender)
-        return [(ChatEvent.MESSAGE, f)]
\ No newline at end of file
+        return [(ChatEvent.MESSAGE, routed(f, self.message_interest(), self.message_interest))]
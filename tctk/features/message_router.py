@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Awaitable
+
+from twitchAPI.chat import ChatMessage
+
+from tctk.bot import ChannelSender
+from tctk.config import Config
+from tctk.identity import identity_of
+
+logger = logging.getLogger(__name__)
+
+type MessageHandler = Callable[[ChatMessage, ChannelSender], Awaitable[Any]]
+
+# Weight of the newest sample in a route's running cost estimate.
+COST_SMOOTHING = 0.2
+# Routes are re-sorted by cost after this many dispatches.
+RESORT_EVERY = 256
+
+
+@dataclass(frozen=True)
+class MessageInterest:
+    """Which chat messages a handler wants to see.
+
+    A message matches when its (casefolded) author is in ``authors`` or its
+    leading ``!`` token is in ``commands``.
+    """
+    authors: frozenset[str] = frozenset()
+    commands: frozenset[str] = frozenset()
+
+    @classmethod
+    def of(cls, authors=(), commands=()) -> MessageInterest:
+        return cls(
+            frozenset(a.casefold() for a in authors if a),
+            frozenset(c.casefold() for c in commands if c),
+        )
+
+
+def routed[F](cb: F, interest: MessageInterest | None,
+              refresh: Callable[[], MessageInterest | None] | None = None) -> F:
+    """Tag a MESSAGE callback with the messages it wants; None means every message.
+
+    ``refresh`` recomputes the interest when the config changes.
+    """
+    cb.interest = interest
+    cb.refresh_interest = refresh
+    return cb
+
+
+@dataclass(slots=True)
+class MessageFacts:
+    """Per-message facts computed once and shared by every handler."""
+    author: str
+    is_authority: bool
+    command: str | None
+
+    @staticmethod
+    def of(msg: ChatMessage, authorities: frozenset[str] = frozenset()) -> MessageFacts:
+        facts = getattr(msg, "_tctk_facts", None)
+        if facts is None:
+            author = identity_of(msg).key
+            text = msg.text
+            command = None
+            if text.startswith("!"):
+                command = text.split(maxsplit=1)[0].casefold()
+            facts = MessageFacts(author, author in authorities, command)
+            msg._tctk_facts = facts
+        return facts
+
+
+@dataclass(eq=False)
+class MessageRoute:
+    name: str
+    handler: MessageHandler
+    interest: MessageInterest | None
+    # recomputes ``interest`` after a config change
+    refresh: Callable[[], MessageInterest | None] | None = None
+    cost: float = 0.0
+    calls: int = 0
+
+    def observe(self, elapsed: float):
+        self.calls += 1
+        self.cost += (elapsed - self.cost) * COST_SMOOTHING
+
+
+@dataclass
+class MessageRouter:
+    """Owns the single ChatEvent.MESSAGE subscription and fans each message out
+    only to the handlers that declared interest in its author or command.
+
+    Handlers are started eagerly, cheapest first, so those that reject a
+    message finish inline without ever being scheduled as a task.
+    """
+    by_author: dict[str, list[MessageRoute]] = field(default_factory=dict)
+    by_command: dict[str, list[MessageRoute]] = field(default_factory=dict)
+    everything: list[MessageRoute] = field(default_factory=list)
+    authorities: frozenset[str] = frozenset()
+    dispatched: int = 0
+    _routes: dict[MessageHandler, MessageRoute] = field(default_factory=dict)
+    _pending: set[asyncio.Task] = field(default_factory=set)
+    # the loop messages are dispatched on
+    _loop: asyncio.AbstractEventLoop | None = None
+
+    def __post_init__(self):
+        if not self.authorities:
+            self.refresh_authorities()
+            # follow config reloads; weakly, so a removed router is not kept alive
+            ref = weakref.ref(self)
+
+            def follow(old, new):
+                router = ref()
+                if router is not None:
+                    router.on_config_change()
+            Config.on_change(follow)
+
+    def refresh_authorities(self):
+        self.authorities = Config.get().authorities
+
+    def on_config_change(self):
+        """Refresh authorities and interests, on the dispatch loop (ConfigWatcher swaps from its own thread)."""
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or loop is running or loop.is_closed():
+            self.refresh()
+        else:
+            loop.call_soon_threadsafe(self.refresh)
+
+    def refresh(self):
+        self.refresh_authorities()
+        self.reindex()
+
+    def _index(self, route: MessageRoute):
+        interest = route.interest
+        if interest is None:
+            self.everything.append(route)
+        else:
+            for author in interest.authors:
+                self.by_author.setdefault(author, []).append(route)
+            for command in interest.commands:
+                self.by_command.setdefault(command, []).append(route)
+
+    def reindex(self):
+        """Recompute every refreshable route's interest and rebuild the buckets."""
+        self.by_author, self.by_command, self.everything = {}, {}, []
+        for route in self._routes.values():
+            if route.refresh is not None:
+                route.interest = route.refresh()
+            self._index(route)
+        self._resort()
+
+    def add(self, name: str, handler: MessageHandler) -> MessageRoute:
+        route = MessageRoute(name, handler, getattr(handler, "interest", None),
+                             getattr(handler, "refresh_interest", None))
+        self._routes[handler] = route
+        self._index(route)
+        return route
+
+    def remove(self, handler: MessageHandler) -> bool:
+        route = self._routes.pop(handler, None)
+        if route is None:
+            return False
+        for bucket in (self.everything, *self.by_author.values(), *self.by_command.values()):
+            if route in bucket:
+                bucket.remove(route)
+        return True
+
+    def route_for(self, handler: MessageHandler) -> MessageRoute | None:
+        """The route added for ``handler``; its ``handler`` may be swapped in place."""
+        return self._routes.get(handler)
+
+    @property
+    def routes(self) -> list[MessageRoute]:
+        return list(self._routes.values())
+
+    def candidates(self, facts: MessageFacts) -> tuple[MessageRoute, ...] | list[MessageRoute]:
+        by_author = self.by_author.get(facts.author, ())
+        by_command = self.by_command.get(facts.command, ()) if facts.command else ()
+        if not by_author and not by_command:
+            return tuple(self.everything)
+        found = [*self.everything, *by_author]
+        for route in by_command:
+            if route not in found:
+                found.append(route)
+        found.sort(key=lambda r: r.cost)
+        return found
+
+    def _resort(self):
+        self.everything.sort(key=lambda r: r.cost)
+        for bucket in (*self.by_author.values(), *self.by_command.values()):
+            bucket.sort(key=lambda r: r.cost)
+
+    def _on_done(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("message handler failed", exc_info=task.exception())
+
+    def dispatch(self, msg: ChatMessage, sender: ChannelSender):
+        facts = MessageFacts.of(msg, self.authorities)
+        loop = self._loop = asyncio.get_running_loop()
+        for route in self.candidates(facts):
+            start = time.perf_counter()
+            task = asyncio.Task(route.handler(msg, sender), loop=loop, eager_start=True)
+            route.observe(time.perf_counter() - start)
+            if task.done():
+                self._on_done(task)
+            else:
+                self._pending.add(task)
+                task.add_done_callback(self._on_done)
+
+        self.dispatched += 1
+        if self.dispatched % RESORT_EVERY == 0:
+            self._resort()
+
+    def subscription(self, sender: ChannelSender) -> Callable[[ChatMessage], Awaitable[None]]:
+        """The one callback registered with Chat for ChatEvent.MESSAGE."""
+        async def on_message(msg: ChatMessage):
+            self.dispatch(msg, sender)
+        return on_message
@@ -0,0 +1,102 @@
+"""cProfile sessions over feature handlers, started and stopped from chat.
+
+A session swaps each selected handler for a profiled wrapper and swaps the
+original back when it stops, so handlers run unwrapped whenever no session
+is active. A handler's coroutine is profiled one step at a time: the
+profiler is enabled only while the coroutine itself runs, never while it is
+suspended and other tasks use the loop.
+"""
+import cProfile
+import io
+import pstats
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from tctk.config import Config
+
+# Functions listed in the chat reply.
+TOP_FUNCTIONS = 5
+
+
+def profiles_dir() -> Path:
+    return Config.data_dir().joinpath("profiles")
+
+
+class Profiled:
+    """Awaits ``coro`` with ``profiler`` enabled only during its own steps."""
+
+    def __init__(self, coro, profiler: cProfile.Profile):
+        self.coro = coro
+        self.profiler = profiler
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            self.profiler.enable()
+            try:
+                yielded = self.coro.send(value) if error is None else self.coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profiler.disable()
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+def profiled[**P](handler: Callable[P, Awaitable[Any]], profiler: cProfile.Profile) -> Callable[P, Awaitable[Any]]:
+    @wraps(handler)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs):
+        return await Profiled(handler(*args, **kwargs), profiler)
+    return wrapper
+
+
+@dataclass
+class ProfileSession:
+    # feature names profiled; empty means every active feature
+    features: list[str]
+    profiler: cProfile.Profile = field(default_factory=cProfile.Profile)
+    started: float = field(default_factory=time.time)
+    # undo actions that swap original handlers back in
+    restores: list[Callable[[], None]] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        return "+".join(self.features) or "all"
+
+    def stop(self) -> pstats.Stats | None:
+        """Stop profiling; None when no profiled handler ran."""
+        for restore in reversed(self.restores):
+            restore()
+        self.restores.clear()
+        self.profiler.disable()
+        if not self.profiler.getstats():
+            # pstats.Stats raises TypeError on an empty profile
+            return None
+        return pstats.Stats(self.profiler)
+
+    def dump(self, stats: pstats.Stats, directory: Path | None = None) -> Path:
+        """Write ``<label>-<start>.pstats`` and a readable ``.txt`` next to it."""
+        directory = directory or profiles_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory.joinpath(f"{self.label}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))}.pstats")
+        stats.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(str(path), stream=out).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+        path.with_suffix(".txt").write_text(out.getvalue())
+        return path
+
+
+def top_functions(stats: pstats.Stats, n: int = TOP_FUNCTIONS) -> list[tuple[str, float]]:
+    """(function, cumulative seconds) for the n most expensive functions, excluding the wrappers."""
+    rows = []
+    for (filename, line, name), (_, _, _, cumtime, _) in stats.stats.items():
+        if filename == __file__ or filename.startswith("~"):
+            continue
+        rows.append((f"{name} ({Path(filename).name}:{line})", cumtime))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:n]
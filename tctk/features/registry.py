@@ -0,0 +1,70 @@
+"""Feature names and the classes they start.
+
+A feature's module is imported the first time the feature is looked up, so
+``tctk run auto_responder`` does not import polars, psycopg or pydash for
+features it does not run. Features from other packages register under the
+``tctk.features`` entry point group, e.g. in their pyproject.toml:
+
+    [project.entry-points."tctk.features"]
+    my_feature = "my_package.module:MyFeature"
+"""
+from collections.abc import Iterator, Mapping
+from importlib import import_module
+
+from tctk import BotFeature
+
+ENTRY_POINT_GROUP = "tctk.features"
+
+# name -> "module:Class"
+BUILTIN_FEATURES: dict[str, str] = {
+    "dueler": "tctk.features.se.duel.duel_bot:DuelBotFeature",
+    "auto_responder": "tctk.features.auto_resp_feature:AutoRespFeature",
+    "raffle_join": "tctk.features.se.raffle.raffle_features:RaffleJoinFeature",
+    "raffle_giveaway": "tctk.features.se.raffle.raffle_features:RaffleGiveawayFeature",
+    "raffle_report": "tctk.features.se.raffle.raffle_features:RaffleReportFeature",
+    "status_notification": "tctk.features.status_notification:StatusNotificationFeature",
+    "streamelements_tracker": "tctk.features.se.streamelements_tracker:StreamElementsTrackerFeature",
+}
+
+
+class FeatureRegistry(Mapping[str, type[BotFeature]]):
+    """name -> feature class, importing each class on its first lookup.
+
+    Entry points are only scanned when a name is not built in, or when the
+    registry is listed.
+    """
+
+    def __init__(self, paths: dict[str, str] | None = None, entry_point_group: str | None = ENTRY_POINT_GROUP):
+        self.paths = dict(BUILTIN_FEATURES if paths is None else paths)
+        self._group = entry_point_group
+        self._classes: dict[str, type[BotFeature]] = {}
+
+    def _discover(self):
+        if self._group is None:
+            return
+        from importlib.metadata import entry_points
+        for ep in entry_points(group=self._group):
+            self.paths.setdefault(ep.name, ep.value)
+        self._group = None
+
+    def __contains__(self, name) -> bool:
+        if name not in self.paths:
+            self._discover()
+        return name in self.paths
+
+    def __getitem__(self, name: str) -> type[BotFeature]:
+        cls = self._classes.get(name)
+        if cls is None:
+            if name not in self:
+                raise KeyError(name)
+            module, _, attr = self.paths[name].partition(":")
+            cls = self._classes[name] = getattr(import_module(module), attr)
+        return cls
+
+    def __iter__(self) -> Iterator[str]:
+        self._discover()
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        self._discover()
+        return len(self.paths)
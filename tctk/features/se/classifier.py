@@ -0,0 +1,122 @@
+"""One-pass parser for StreamElements authority messages.
+
+Each authority line is classified at most once: a handful of substring checks
+pick the only pattern that can apply, that single compiled pattern is matched,
+and the typed result is cached on the message so every duel/raffle feature and
+tracker reuses it.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+from twitchAPI.chat import ChatMessage
+
+
+class Regex:
+    uname_re = "[\\w]{3,30}"
+    duel_complete = f'\\@?(?P<winner>{uname_re}) won the Duel vs \\@?(?P<loser>{uname_re}) PogChamp \\@?(?P=winner) won (?P<amount>[0-9]+) eastcoins FeelsGoodMan'
+    duel_proposed = f'\\@?(?P<offeree>{uname_re}), \\@?(?P<offerer>{uname_re}) wants to duel you for (?P<amount>[0-9]+) eastcoins, you can !accept or !deny within 2 minutes'
+    duel_denied = f"\\@?(?P<offerer>{uname_re}), \\@?(?P<offeree>{uname_re}) denied your duel :\\("
+    coins_response = f'\\@?(?P<username>{uname_re}) has (?P<coins>[0-9]+) eastcoins'
+    coins_given = f'\\@?(?P<giver>{uname_re}) gave (?P<amount>[0-9]+) eastcoins to \\@?(?P<receiver>{uname_re})'
+    raffle_open = '(?=.*?a Multi-Raffle has begun for (?P<amount>[0-9]+) EastCoin)(?=.*?it will end in (?P<duration>[0-9]+) Seconds)'
+    raffle_close = 'The Multi-Raffle has ended and (?P<winners>.+?) won (?P<amount>[0-9]+) EastCoin each'
+    winner_sep = '\\s*,\\s*(?:and\\s+)?|\\s+and\\s+'
+
+
+@dataclass(frozen=True, slots=True)
+class DuelProposed:
+    offerer: str
+    offeree: str
+    amount: int
+
+
+@dataclass(frozen=True, slots=True)
+class DuelCompleted:
+    winner: str
+    loser: str
+    amount: int
+
+
+@dataclass(frozen=True, slots=True)
+class DuelDenied:
+    offerer: str
+    offeree: str
+
+
+@dataclass(frozen=True, slots=True)
+class CoinsBalance:
+    username: str
+    coins: int
+
+
+@dataclass(frozen=True, slots=True)
+class CoinsGiven:
+    giver: str
+    receiver: str
+    amount: int
+
+
+@dataclass(frozen=True, slots=True)
+class RaffleOpened:
+    amount: int
+    duration: int
+
+
+@dataclass(frozen=True, slots=True)
+class RaffleClosed:
+    winners: tuple[str, ...]
+    amount_each: int
+
+
+type AuthorityEvent = DuelProposed | DuelCompleted | DuelDenied | CoinsBalance | CoinsGiven | RaffleOpened | RaffleClosed
+
+_winner_sep_re = re.compile(Regex.winner_sep)
+
+
+def split_winners(winners: str) -> tuple[str, ...]:
+    return tuple(w for w in (x.strip().lstrip("@") for x in _winner_sep_re.split(winners)) if w)
+
+
+# (marker substring, compiled matcher, match -> event), in the order they are tried.
+# Markers are mutually exclusive in practice, so at most one pattern runs per line.
+_RULES: list[tuple[str, Callable[[str], re.Match | None], Callable[[re.Match], AuthorityEvent]]] = [
+    (" wants to duel you for ", re.compile(Regex.duel_proposed).match,
+     lambda m: DuelProposed(m['offerer'], m['offeree'], int(m['amount']))),
+    (" won the Duel vs ", re.compile(Regex.duel_complete).match,
+     lambda m: DuelCompleted(m['winner'], m['loser'], int(m['amount']))),
+    (" denied your duel", re.compile(Regex.duel_denied).match,
+     lambda m: DuelDenied(m['offerer'], m['offeree'])),
+    (" eastcoins to ", re.compile(Regex.coins_given).search,
+     lambda m: CoinsGiven(m['giver'], m['receiver'], int(m['amount']))),
+    (" eastcoins", re.compile(Regex.coins_response).search,
+     lambda m: CoinsBalance(m['username'], int(m['coins']))),
+    ("Multi-Raffle has begun", re.compile(Regex.raffle_open).match,
+     lambda m: RaffleOpened(int(m['amount']), int(m['duration']))),
+    ("Multi-Raffle has ended", re.compile(Regex.raffle_close).search,
+     lambda m: RaffleClosed(split_winners(m['winners']), int(m['amount']))),
+]
+
+_UNSET = object()
+
+
+def classify_text(text: str) -> AuthorityEvent | None:
+    for marker, matcher, build in _RULES:
+        if marker in text:
+            m = matcher(text)
+            if m is not None:
+                return build(m)
+    return None
+
+
+def classify(msg: ChatMessage) -> AuthorityEvent | None:
+    """Classify an authority message, caching the result on the message.
+
+    Callers are responsible for checking that the message came from the
+    authority user; the text alone is classified here.
+    """
+    event = getattr(msg, "_se_event", _UNSET)
+    if event is _UNSET:
+        event = classify_text(msg.text)
+        msg._se_event = event
+    return event
@@ -1,10 +1,11 @@
-import re
 from dataclasses import dataclass
 from typing import Callable, Optional, Self
 
 from twitchAPI.chat import ChatMessage
 
 from tctk.config import Config
+from tctk.identity import identity_of
+from tctk.features.se.classifier import DuelCompleted, DuelProposed, Regex, classify
 
 def assign(ns, name):
     return lambda val: setattr(ns, name, val)
@@ -49,13 +50,13 @@ class DuelOffer(DuelParties):
 
     @staticmethod
     def from_proposal(msg: ChatMessage)-> Maybe[Self]:
-        if msg.user.name.casefold() == Config.get().duel_authority_user.casefold():
-            m = re.match(Regex.duel_proposed, msg.text)
-            if m is not None:
-                d = m.groupdict()
-                d['amount'] = int(d['amount'])
-                d['proposal_time'] = msg.sent_timestamp
-                return Maybe(DuelOffer(**d))
+        if identity_of(msg).is_duel_authority:
+            event = classify(msg)
+            if isinstance(event, DuelProposed):
+                return Maybe(DuelOffer(
+                    offerer=event.offerer, offeree=event.offeree,
+                    amount=event.amount, proposal_time=msg.sent_timestamp,
+                ))
         return Maybe.empty()
 
 
@@ -71,13 +72,12 @@ class Duel(DuelOffer):
 
     @staticmethod
     def from_result(msg: ChatMessage, pending: Optional[DuelOffer] = None) -> Maybe[Self]:
-        if msg.user.name.casefold() == Config.get().duel_authority_user.casefold():
-            m = re.match(Regex.duel_complete, msg.text)
-            if m is not None:
-                d = m.groupdict()
-                winner = d['winner']
-                loser = d['loser']
-                amount = int(d['amount'])
+        if identity_of(msg).is_duel_authority:
+            event = classify(msg)
+            if isinstance(event, DuelCompleted):
+                winner = event.winner
+                loser = event.loser
+                amount = event.amount
                 if pending is not None:
                     offerer_win = winner.casefold() == pending.offerer.casefold()
                     return Maybe(Duel(
@@ -96,11 +96,3 @@ class Duel(DuelOffer):
 duel_complete = 'dookiebetts800 won the Duel vs aallldeeeez PogChamp dookiebetts800 won 348 eastcoins FeelsGoodMan'
 duel_proposed = '@aallldeeeez, @dookiebetts800 wants to duel you for 348 eastcoins, you can !accept or !deny within 2 minutes'
 duel_denied = '@cenozoicmegafauna, are_mod denied your duel :('
-
-class Regex:
-    uname_re = "[\\w]{3,30}"
-    duel_complete = f'\\@?(?P<winner>{uname_re}) won the Duel vs \\@?(?P<loser>{uname_re}) PogChamp \\@?(?P=winner) won (?P<amount>[0-9]+) eastcoins FeelsGoodMan'
-    duel_proposed = f'\\@?(?P<offeree>{uname_re}), \\@?(?P<offerer>{uname_re}) wants to duel you for (?P<amount>[0-9]+) eastcoins, you can !accept or !deny within 2 minutes'
-    duel_denied = f"\\@?(?P<offerer>{uname_re}), \\@(?P<offeree>{uname_re}) denied your duel :("
-    coins_response = f'\\@?(?P<username>{uname_re}) has (?P<coins>[0-9]+) eastcoins'
-    coins_given = f'\\@?(?P<giver>{uname_re}) gave (?P<amount>[0-9]+) eastcoins to \\@?(?P<receiver>{uname_re})'
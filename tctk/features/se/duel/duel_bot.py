@@ -1,148 +1,174 @@
+import asyncio
 import logging
-import re
 import time
 from typing import Callable, Self
 from tctk import ChannelSender, Subscription
-from tctk.bot import rand_emoji
-from tctk.features.se.duel.duel import Duel, DuelOffer, Regex
+from tctk.outbound import Priority
+from tctk.features.se.classifier import CoinsBalance, CoinsGiven, RaffleClosed, classify
+from tctk.features.se.duel.duel import Duel, DuelOffer
 from tctk.features.se.duel.duel_feature import DuelFeature
 from tctk.features.message_bot import MessageBotFeature
+from tctk.features.message_router import MessageInterest
+from tctk.features.se.ledger import CoinLedger, EntryKind
 from twitchAPI.chat import ChatMessage, EventData
 from twitchAPI.type import ChatEvent
-from tctk.config import Command, Config
+from tctk.config import Command, Config, MaxDuel
+from tctk.identity import identity_of, self_key
+from tctk.isolation import offload
 
 history = dict()
 logger = logging.getLogger(__name__)
 
+# StreamElements drops a duel offer that isn't answered within 2 minutes.
+DUEL_ANSWER_TTL = 120.0
+
 
 def resolve_max_duel_amt(max_duel_amt: int | str, current_coins: int | None, floor: int = 0) -> int | None:
-    if isinstance(max_duel_amt, str) and max_duel_amt.endswith('%'):
-        pct = float(max_duel_amt[:-1]) / 100
-        if current_coins is None:
-            return None
-        return max(int(current_coins * pct), floor)
-    return int(max_duel_amt)
+    return MaxDuel.parse(max_duel_amt, floor).resolve(current_coins)
 
 
 class DuelBotFeature(DuelFeature):
+    # an offer's reply may wait in the outbound queue for up to its TTL
+    handler_timeout = DUEL_ANSWER_TTL + 10
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.current_coins: int | None = None
-        self._coins_queried: bool = False
+        # channel -> the opening of the bot's coin ledger there; started on first use
+        self.ledgers: dict[str, asyncio.Task[CoinLedger]] = {}
+        # channels whose balance was read with !coins since the bot started
+        self._coins_queried: set[str] = set()
+
+    async def ledger(self, channel: str) -> CoinLedger:
+        opening = self.ledgers.get(channel)
+        if opening is None:
+            opening = self.ledgers[channel] = asyncio.create_task(self._open_ledger(channel))
+        return await opening
+
+    async def _open_ledger(self, channel: str) -> CoinLedger:
+        ledger = await CoinLedger.for_channel(channel)
+        logger.info(f"Restored coin balance in {channel}: {ledger.balance} ({ledger.entries} entries)")
+        return ledger
+
+    async def current_coins(self, channel: str) -> int | None:
+        return (await self.ledger(channel)).balance
 
     async def _on_joined(self, event: EventData, sender: ChannelSender):
-        if not self._coins_queried:
-            self._coins_queried = True
+        await self.ledger(sender.channel)
+        if sender.channel not in self._coins_queried:
+            # reconciles the restored balance with what StreamElements says
+            self._coins_queried.add(sender.channel)
             logger.info("Querying coin balance")
             await sender.send_message(str(Command.coins))
 
+    async def on_exit(self, sender: ChannelSender):
+        opening = self.ledgers.pop(sender.channel, None)
+        if opening is not None:
+            await (await opening).close()
+
+    def message_interest(self) -> MessageInterest:
+        cfg = Config.get()
+        return MessageInterest.of(authors=[
+            self.duel_authority_user, cfg.duel_authority_user, cfg.raffle_authority_user, cfg.bot_config_user,
+        ])
+
     def get_subscriptions(self) -> list[Subscription]:
         subs = super().get_subscriptions()
         subs.append((ChatEvent.JOINED, self._on_joined))
         return subs
 
     async def on_proposal(self, proposal: DuelOffer, sender: ChannelSender):
-        if proposal.offeree.casefold() != sender.chat.username.casefold():
+        if proposal.offeree.casefold() != self_key(sender.chat):
             return
 
-        cfg = Config.get()
-        duel_max = resolve_max_duel_amt(cfg.max_duel_amt, self.current_coins, cfg.min_max_duel_amt_if_percent)
+        duel_max = Config.get().max_duel.resolve(await self.current_coins(sender.channel))
         if duel_max is None:
             logger.warning("Cannot determine max duel amount (coins unknown), denying")
-            await sender.send_unique(Command.deny("Fricc I don't know how many coins I have yet."))
+            await sender.send_unique(Command.deny("Fricc I don't know how many coins I have yet."),
+                                     priority=Priority.HIGH, ttl=DUEL_ANSWER_TTL)
             return
 
         no = Command.deny(f"Fricc The maximum duel amount is {duel_max} coins.")
         yes = Command.accept()
         logger.debug(f"Duel proposal from {proposal.offerer} for {proposal.amount}, max={duel_max}")
-        await sender.send_result(lambda: no if proposal.amount > duel_max else yes)
+        await sender.send_result(lambda: no if proposal.amount > duel_max else yes,
+                                 priority=Priority.HIGH, ttl=DUEL_ANSWER_TTL)
 
     async def on_result(self, duel: Duel, sender: ChannelSender):
-        bot_name = sender.chat.username.casefold()
+        bot_name = self_key(sender.chat)
         if duel.offerer.casefold() != bot_name and duel.offeree.casefold() != bot_name:
             return
 
         bot_is_offerer = duel.offerer.casefold() == bot_name
         bot_won = (bot_is_offerer and duel.offerer_win) or (not bot_is_offerer and not duel.offerer_win)
 
-        if self.current_coins is not None:
-            if bot_won:
-                self.current_coins += duel.amount
-            else:
-                self.current_coins -= duel.amount
-            logger.info(f"Coins updated: {'won' if bot_won else 'lost'} {duel.amount}, balance={self.current_coins}")
+        opponent = duel.offeree if bot_is_offerer else duel.offerer
+        balance = (await self.ledger(sender.channel)).record(
+            EntryKind.DUEL_WON if bot_won else EntryKind.DUEL_LOST, duel.amount, opponent)
+        logger.info(f"Coins updated: {'won' if bot_won else 'lost'} {duel.amount}, balance={balance}")
 
     async def on_message(self, msg: ChatMessage, sender: ChannelSender):
         if await self._handle_set(msg, sender):
             return
 
-        if self._handle_coins_response(msg, sender):
+        if await self._handle_coins_response(msg, sender):
             return
 
-        if self._handle_give(msg, sender):
+        if await self._handle_give(msg, sender):
             return
 
-        if self._handle_raffle_win(msg, sender):
+        if await self._handle_raffle_win(msg, sender):
             return
 
         await super().on_message(msg, sender)
 
-    def _handle_coins_response(self, msg: ChatMessage, sender: ChannelSender) -> bool:
-        if msg.user.name.casefold() != Config.get().duel_authority_user.casefold():
+    async def _handle_coins_response(self, msg: ChatMessage, sender: ChannelSender) -> bool:
+        if not identity_of(msg).is_duel_authority:
             return False
-        m = re.search(Regex.coins_response, msg.text)
-        if m is None:
+        event = classify(msg)
+        if not isinstance(event, CoinsBalance):
             return False
-        username = m.group('username')
-        if username.casefold() != sender.chat.username.casefold():
+        if event.username.casefold() != self_key(sender.chat):
             return False
-        self.current_coins = int(m.group('coins'))
-        logger.info(f"Coin balance: {self.current_coins}")
+        (await self.ledger(sender.channel)).reading(event.coins)
+        logger.info(f"Coin balance: {event.coins}")
         return True
 
-    _raffle_close_re = re.compile(
-        r'The Multi-Raffle has ended and (.+) won (\d+) EastCoin each'
-    )
-
-    def _handle_raffle_win(self, msg: ChatMessage, sender: ChannelSender) -> bool:
-        if msg.user.name.casefold() != Config.get().raffle_authority_user.casefold():
+    async def _handle_raffle_win(self, msg: ChatMessage, sender: ChannelSender) -> bool:
+        if not identity_of(msg).is_raffle_authority:
             return False
-        m = self._raffle_close_re.search(msg.text)
-        if m is None:
+        event = classify(msg)
+        if not isinstance(event, RaffleClosed):
             return False
-        winners_str = m.group(1)
-        amount_each = int(m.group(2))
-        winners = [w.strip().casefold() for w in re.split(r',\s*|\s+and\s+', winners_str) if w.strip()]
-        bot_name = sender.chat.username.casefold()
-        if bot_name in winners and self.current_coins is not None:
-            self.current_coins += amount_each
-            logger.info(f"Won raffle for {amount_each}, balance={self.current_coins}")
+        amount_each = event.amount_each
+        winners = [w.casefold() for w in event.winners]
+        bot_name = self_key(sender.chat)
+        if bot_name in winners:
+            balance = (await self.ledger(sender.channel)).record(EntryKind.RAFFLE_WON, amount_each)
+            logger.info(f"Won raffle for {amount_each}, balance={balance}")
         return False
 
-    def _handle_give(self, msg: ChatMessage, sender: ChannelSender) -> bool:
-        if msg.user.name.casefold() != Config.get().duel_authority_user.casefold():
+    async def _handle_give(self, msg: ChatMessage, sender: ChannelSender) -> bool:
+        if not identity_of(msg).is_duel_authority:
             return False
-        m = re.search(Regex.coins_given, msg.text)
-        if m is None:
+        event = classify(msg)
+        if not isinstance(event, CoinsGiven):
             return False
-        bot_name = sender.chat.username.casefold()
-        giver = m.group('giver')
-        receiver = m.group('receiver')
-        amount = int(m.group('amount'))
+        bot_name = self_key(sender.chat)
+        giver = event.giver
+        receiver = event.receiver
+        amount = event.amount
         if giver.casefold() == bot_name:
-            if self.current_coins is not None:
-                self.current_coins -= amount
-                logger.info(f"Gave {amount} to {receiver}, balance={self.current_coins}")
+            balance = (await self.ledger(sender.channel)).record(EntryKind.GIVEN, amount, receiver)
+            logger.info(f"Gave {amount} to {receiver}, balance={balance}")
             return True
         if receiver.casefold() == bot_name:
-            if self.current_coins is not None:
-                self.current_coins += amount
-                logger.info(f"Received {amount} from {giver}, balance={self.current_coins}")
+            balance = (await self.ledger(sender.channel)).record(EntryKind.RECEIVED, amount, giver)
+            logger.info(f"Received {amount} from {giver}, balance={balance}")
             return True
         return False
 
     async def _handle_set(self, msg: ChatMessage, sender: ChannelSender) -> bool:
-        if msg.user.name.casefold() != Config.get().bot_config_user.casefold():
+        if not identity_of(msg).is_config_user:
             return False
         parts = msg.text.strip().split()
         if len(parts) != 3 or parts[0] != "!set" or parts[1] != "max_duel_amt":
@@ -160,7 +186,8 @@ class DuelBotFeature(DuelFeature):
             except ValueError:
                 return False
 
-        Config.persist_with(lambda c: setattr(c, 'max_duel_amt', new_max))
+        Config.replace(max_duel_amt=new_max)
+        await offload(Config.persist)
         logger.info(f"max_duel_amt set to {new_max} by {msg.user.name}")
         await sender.send(f"Max duel amount set to {new_max}.")
         return True
@@ -2,14 +2,23 @@ from tctk.bot import ChannelSender
 from tctk.config import Config
 from tctk.features.se.duel.duel import DuelOffer, Duel
 from tctk.features.message_bot import MessageBotFeature
+from tctk.features.message_router import MessageInterest
 from twitchAPI.chat import ChatMessage
 
 
 class DuelFeature(MessageBotFeature):
-    def __init__(self, duel_authority_user=Config.get().duel_authority_user):
-        self.duel_authority_user = duel_authority_user
+    def __init__(self, duel_authority_user: str | None = None):
+        # None follows the config
+        self._duel_authority_user = duel_authority_user
         self._pending_proposal: DuelOffer | None = None
 
+    @property
+    def duel_authority_user(self) -> str:
+        return self._duel_authority_user or Config.get().duel_authority_user
+
+    def message_interest(self) -> MessageInterest:
+        return MessageInterest.of(authors=[self.duel_authority_user])
+
     async def on_proposal(self, proposal: DuelOffer, sender: ChannelSender):
         pass
 
@@ -0,0 +1,239 @@
+"""The bot's coin balance, kept as an append-only ledger.
+
+Every change to the bot's coins in a channel (duels won and lost, gives sent
+and received, raffle winnings) and every authoritative ``!coins`` reading is
+appended as one JSON line to ``<data_dir>/ledger/<channel>.jsonl``. The
+balance is the last reading plus the changes after it.
+
+Every ``snapshot_every`` entries, and on close, the balance is snapshotted
+with the ledger offset it covers to ``<channel>.snapshot.json``. Opening a
+ledger reads the snapshot and replays only the entries after it, so the bot
+knows its balance as soon as it starts instead of after its first ``!coins``
+reply.
+
+A reading that disagrees with the computed balance is drift: a change the
+bot missed (e.g. while disconnected). It is logged, kept in ``drifts`` and
+recorded in the ledger; the reading becomes the balance.
+
+The balance changes as soon as an entry is recorded, but nothing touches the
+disk on the event loop: ``open`` restores the ledger on the blocking-handler
+pool, and a background task writes recorded entries there in batches,
+flushing them to the OS and snapshotting when one is due; only snapshots are
+fsynced. A torn final entry left by a crash is dropped on open, and a
+complete entry that can't be read is skipped.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import StrEnum, auto
+from pathlib import Path
+from typing import BinaryIO
+
+from tctk.config import Config
+from tctk.isolation import offload
+
+logger = logging.getLogger(__name__)
+
+# Entries between snapshots.
+SNAPSHOT_EVERY = 100
+# Drifts kept for inspection.
+DRIFTS_KEPT = 32
+
+
+def ledger_dir() -> Path:
+    return Config.data_dir().joinpath("ledger")
+
+
+class EntryKind(StrEnum):
+    DUEL_WON = auto()
+    DUEL_LOST = auto()
+    GIVEN = auto()
+    RECEIVED = auto()
+    RAFFLE_WON = auto()
+    # an authoritative !coins reply; its amount is the balance
+    READING = auto()
+
+
+# sign of each kind's amount in the balance
+_SIGN = {
+    EntryKind.DUEL_WON: 1,
+    EntryKind.DUEL_LOST: -1,
+    EntryKind.GIVEN: -1,
+    EntryKind.RECEIVED: 1,
+    EntryKind.RAFFLE_WON: 1,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Drift:
+    expected: int
+    actual: int
+    t: float
+
+    @property
+    def amount(self) -> int:
+        return self.actual - self.expected
+
+    def __str__(self):
+        return f"balance drifted by {self.amount:+d}: computed {self.expected}, !coins says {self.actual}"
+
+
+class CoinLedger:
+    def __init__(self, path: Path, snapshot_every: int = SNAPSHOT_EVERY):
+        self.path = Path(path)
+        self.snapshot_path = self.path.with_suffix(".snapshot.json")
+        self.snapshot_every = snapshot_every
+
+        # None until the first reading
+        self.balance: int | None = None
+        self.entries = 0
+        self.drifts: deque[Drift] = deque(maxlen=DRIFTS_KEPT)
+        self._snapshotted = 0
+        self._file: BinaryIO | None = None
+        # (line, balance after it, entries after it) of every entry not yet written
+        self._pending: list[tuple[bytes, int | None, int]] = []
+        self._dirty = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._writer: asyncio.Task | None = None
+        self._closing = False
+
+    @classmethod
+    async def open(cls, path: Path, snapshot_every: int = SNAPSHOT_EVERY) -> CoinLedger:
+        """Restore the ledger at ``path`` and start writing to it."""
+        ledger = cls(path, snapshot_every)
+        await offload(ledger._load)
+        ledger._writer = asyncio.create_task(ledger._write_loop())
+        return ledger
+
+    @classmethod
+    async def for_channel(cls, channel: str) -> CoinLedger:
+        return await cls.open(ledger_dir().joinpath(f"{channel}.jsonl"))
+
+    def _load(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._restore()
+        self._file = self.path.open("ab")
+
+    def _read_snapshot(self) -> dict:
+        try:
+            snapshot = json.loads(self.snapshot_path.read_text())
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Ignoring unreadable snapshot {self.snapshot_path}")
+            return {}
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if snapshot.get("offset", 0) > size:
+            logger.warning(f"Snapshot {self.snapshot_path} is ahead of its ledger; replaying from the start")
+            return {}
+        return snapshot
+
+    def _restore(self):
+        snapshot = self._read_snapshot()
+        self.balance = snapshot.get("balance")
+        self.entries = self._snapshotted = snapshot.get("entries", 0)
+        offset = snapshot.get("offset", 0)
+        if not self.path.exists():
+            return
+        with self.path.open("rb+") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    logger.warning(f"Truncating torn entry at {offset} in {self.path}")
+                    f.truncate(offset)
+                    break
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"Skipping unreadable entry at {offset} in {self.path}: {e!r}")
+                offset += len(line)
+
+    def _apply(self, entry: dict):
+        kind = EntryKind(entry["kind"])
+        if kind is EntryKind.READING:
+            self.balance = int(entry["amount"])
+        elif self.balance is not None:
+            self.balance += _SIGN[kind] * int(entry["amount"])
+        self.entries += 1
+
+    def record(self, kind: EntryKind, amount: int, ref: str = "", now: float | None = None) -> int | None:
+        """Append an entry and return the balance after it."""
+        entry = {"t": time.time() if now is None else now, "kind": kind, "amount": amount}
+        if ref:
+            entry["ref"] = ref
+        return self._append(entry)
+
+    def reading(self, coins: int, now: float | None = None) -> Drift | None:
+        """Record an authoritative balance; returns the drift if it disagrees with the ledger."""
+        now = time.time() if now is None else now
+        entry = {"t": now, "kind": EntryKind.READING, "amount": coins}
+        drift = None
+        if self.balance is not None and self.balance != coins:
+            drift = Drift(self.balance, coins, now)
+            entry["drift"] = drift.amount
+            self.drifts.append(drift)
+            logger.warning(f"{self.path.stem}: {drift}")
+        self._append(entry)
+        return drift
+
+    def _append(self, entry: dict) -> int | None:
+        self._apply(entry)
+        line = json.dumps(entry, separators=(",", ":")).encode() + b"\n"
+        self._pending.append((line, self.balance, self.entries))
+        self._dirty.set()
+        return self.balance
+
+    async def _write_loop(self):
+        while not self._closing:
+            await self._dirty.wait()
+            self._dirty.clear()
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f"Failed to write {self.path}: {e}")
+
+    async def flush(self):
+        """Write every entry recorded so far, snapshotting if one is due."""
+        async with self._write_lock:
+            batch, self._pending = self._pending, []
+            if batch:
+                await offload(self._write, batch)
+
+    def _write(self, batch: list[tuple[bytes, int | None, int]]):
+        self._file.writelines(line for line, _, _ in batch)
+        self._file.flush()
+        _, balance, entries = batch[-1]
+        if entries - self._snapshotted >= self.snapshot_every:
+            self._snapshot(balance, entries)
+
+    def _snapshot(self, balance: int | None, entries: int):
+        """Snapshot the balance as of everything written so far."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        with tmp.open("w") as f:
+            json.dump({"balance": balance, "entries": entries, "offset": self._file.tell()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        self._snapshotted = entries
+
+    def _finish(self):
+        if self.entries != self._snapshotted:
+            self._snapshot(self.balance, self.entries)
+        self._file.close()
+
+    async def close(self):
+        """Write what is pending, snapshot and close."""
+        if self._closing:
+            return
+        self._closing = True
+        if self._writer is not None:
+            self._dirty.set()
+            await self._writer
+        await self.flush()
+        await offload(self._finish)
@@ -0,0 +1,115 @@
+"""Coalesced delivery of raffle joins.
+
+When a Multi-Raffle opens, hundreds of viewers type !join within seconds.
+Rather than each join starting an ``on_join`` coroutine in every raffle
+feature, joins are appended to their channel's JoinBurst and handed to the
+subscribed features in micro-batches, one batch every ``interval`` seconds
+at most. Features that don't care about individual joins never subscribe,
+so during a storm a join costs a regex match and an index insert.
+
+JoinStats counts the joins of the current raffle, their rate over the last
+``RATE_WINDOW`` seconds and its peak.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+# Seconds joins are buffered before a batch is delivered.
+JOIN_BATCH_INTERVAL = 0.05
+# Seconds over which the join rate is measured.
+RATE_WINDOW = 1.0
+
+
+class JoinSubscriber(Protocol):
+    async def on_joins(self, batch: list[Any], sender: Any): ...
+
+
+@dataclass
+class JoinStats:
+    joins: int = 0
+    # !join lines from viewers already in every open raffle
+    repeats: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+    # joins per second over RATE_WINDOW
+    peak_rate: float = 0.0
+    # monotonic times of the joins within RATE_WINDOW
+    _recent: deque[float] = field(default_factory=deque, repr=False)
+
+    def record(self, joined: bool, now: float):
+        if not joined:
+            self.repeats += 1
+            return
+        self.joins += 1
+        recent = self._recent
+        recent.append(now)
+        while recent[0] <= now - RATE_WINDOW:
+            recent.popleft()
+        rate = len(recent) / RATE_WINDOW
+        if rate > self.peak_rate:
+            self.peak_rate = rate
+
+    def rate(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        return sum(1 for t in self._recent if t > now - RATE_WINDOW) / RATE_WINDOW
+
+    def __str__(self):
+        return (f"{self.joins} joins ({self.repeats} repeated), peak {self.peak_rate:.0f}/s, "
+                f"{self.batches} batches of up to {self.largest_batch}")
+
+
+class JoinBurst:
+    """One channel's buffered joins and the features they are delivered to."""
+
+    def __init__(self, interval: float = JOIN_BATCH_INTERVAL):
+        self.interval = interval
+        self.stats = JoinStats()
+        # weakly, so a removed feature stops receiving joins
+        self.subscribers: weakref.WeakSet[JoinSubscriber] = weakref.WeakSet()
+        self._buffer: list[Any] = []
+        self._sender: Any = None
+        self._flush_task: asyncio.Task | None = None
+
+    def subscribe(self, subscriber: JoinSubscriber):
+        self.subscribers.add(subscriber)
+
+    def reset(self) -> JoinStats:
+        """Start counting afresh; returns the counts so far."""
+        stats, self.stats = self.stats, JoinStats()
+        return stats
+
+    def add(self, joined: list[Any], sender: Any, now: float | None = None):
+        """Count a !join line and buffer the joins it made (none for a repeat)."""
+        self.stats.record(bool(joined), time.monotonic() if now is None else now)
+        if not joined or not self.subscribers:
+            return
+        self._buffer.extend(joined)
+        self._sender = sender
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.interval)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Deliver the buffered joins now."""
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        self.stats.batches += 1
+        self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
+        for subscriber in list(self.subscribers):
+            try:
+                await subscriber.on_joins(batch, self._sender)
+            except Exception:
+                logger.exception(f"{type(subscriber).__name__}.on_joins failed")
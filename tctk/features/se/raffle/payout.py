@@ -0,0 +1,234 @@
+"""Paced, confirmed bulk coin transfers.
+
+A PayoutPlan lists the ``!give`` transfers owed after a raffle. PayoutEngine
+queues every transfer at once, leaving pacing to the sender's scheduler so
+gives go out at the highest rate slow mode and the rate limit allow, and
+confirms each one by the authority's ``coins_given`` echo (see
+``classifier.CoinsGiven``). A give the sender dropped is re-sent up to
+``max_attempts`` times. A give that was sent but never echoed is not: it may
+have gone through with its echo missed, so it is reported as unconfirmed
+rather than risk paying twice.
+
+The plan is checkpointed to ``<data_dir>/payouts/<channel>/<id>.json`` on
+every state change, so a restart resumes with the transfers that were never
+sent. A transfer that was being sent when the process died is not sent again, since
+its echo can no longer be observed; it is reported as unconfirmed instead.
+Checkpoints are written on the blocking-handler pool, and the changes made
+while one is being written share the next (see ``Checkpoint``).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from enum import StrEnum, auto
+from pathlib import Path
+
+from tctk.bot import ChannelSender
+from tctk.config import Command, Config
+from tctk.features.se.classifier import CoinsGiven
+from tctk.isolation import offload
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the authority's echo of a sent give.
+CONFIRM_TIMEOUT = 30.0
+# Sends per transfer, including the first.
+MAX_ATTEMPTS = 2
+
+
+def payouts_dir() -> Path:
+    return Config.data_dir().joinpath("payouts")
+
+
+class TransferState(StrEnum):
+    PENDING = auto()
+    SENDING = auto()
+    CONFIRMED = auto()
+    FAILED = auto()
+    # sent but never echoed, or being sent when a previous run stopped; outcome unknown
+    UNCONFIRMED = auto()
+
+
+@dataclass
+class Transfer:
+    receiver: str
+    amount: int
+    state: TransferState = TransferState.PENDING
+    attempts: int = 0
+    # seconds from the send to the confirming echo
+    latency: float | None = None
+
+
+@dataclass
+class PayoutPlan:
+    id: str
+    transfers: list[Transfer] = field(default_factory=list)
+
+    @classmethod
+    def split_evenly(cls, id: str, total: int, receivers: list[str]) -> PayoutPlan:
+        """Give ``total`` in equal whole shares to ``receivers``; the remainder is kept."""
+        if not receivers or total < len(receivers):
+            return cls(id)
+        each = total // len(receivers)
+        return cls(id, [Transfer(r, each) for r in sorted(receivers)])
+
+    @property
+    def done(self) -> bool:
+        return all(t.state not in (TransferState.PENDING, TransferState.SENDING) for t in self.transfers)
+
+    def save(self, directory: Path):
+        self.write(directory, json.dumps(asdict(self)))
+
+    def write(self, directory: Path, data: str):
+        """Replace the checkpoint in ``directory`` with ``data``, a serialized plan. Blocks."""
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory.joinpath(f"{self.id}.json")
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> PayoutPlan:
+        d = json.loads(path.read_text())
+        return cls(d["id"], [Transfer(**{**t, "state": TransferState(t["state"])}) for t in d["transfers"]])
+
+
+class Checkpoint:
+    """Group-commits a plan's checkpoints off the event loop.
+
+    ``save`` returns once a checkpoint that includes every change made before
+    the call is on disk. The plan is serialized on the loop when a write
+    starts; calls made while it runs wait for, and share, the next write.
+    """
+
+    def __init__(self, plan: PayoutPlan, directory: Path):
+        self.plan = plan
+        self.directory = directory
+        self.writes = 0
+        # resolved by the write that will include changes not yet written
+        self._next: asyncio.Future | None = None
+        self._writer: asyncio.Task | None = None
+
+    async def save(self):
+        if self._next is None:
+            self._next = asyncio.get_running_loop().create_future()
+        fut = self._next
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+        await asyncio.shield(fut)
+
+    async def _write_loop(self):
+        try:
+            while self._next is not None:
+                fut, self._next = self._next, None
+                try:
+                    await offload(self.plan.write, self.directory, json.dumps(asdict(self.plan)))
+                except Exception as e:
+                    fut.set_exception(e)
+                else:
+                    fut.set_result(None)
+                self.writes += 1
+        finally:
+            self._writer = None
+
+
+@dataclass
+class PayoutReport:
+    id: str
+    confirmed: int
+    failed: int
+    unconfirmed: int
+    coins: int
+    elapsed: float
+
+    def __str__(self):
+        return (f"payout {self.id}: {self.confirmed} confirmed ({self.coins} coins), {self.failed} failed, "
+                f"{self.unconfirmed} unconfirmed in {self.elapsed:.1f}s")
+
+
+class PayoutEngine:
+    def __init__(self, directory: Path | None = None, confirm_timeout: float = CONFIRM_TIMEOUT,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.directory = directory or payouts_dir()
+        self.confirm_timeout = confirm_timeout
+        self.max_attempts = max_attempts
+        # (receiver casefolded, amount) -> waiters, oldest first
+        self._waiting: dict[tuple[str, int], list[asyncio.Future]] = {}
+
+    def confirm(self, event: CoinsGiven) -> bool:
+        """Resolve the oldest transfer waiting on this echo. Returns whether one was waiting."""
+        waiters = self._waiting.get((event.receiver.casefold(), event.amount))
+        while waiters:
+            fut = waiters.pop(0)
+            if not fut.done():
+                fut.set_result(time.monotonic())
+                return True
+        return False
+
+    def _expect(self, transfer: Transfer) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault((transfer.receiver.casefold(), transfer.amount), []).append(fut)
+        return fut
+
+    async def _pay(self, checkpoint: Checkpoint, transfer: Transfer, sender: ChannelSender):
+        echo = self._expect(transfer)
+        while transfer.attempts < self.max_attempts:
+            transfer.attempts += 1
+            transfer.state = TransferState.SENDING
+            # durable before the give goes out, so a restart never sends it twice
+            await checkpoint.save()
+            if not await sender.send_unique(Command.give(transfer.receiver, transfer.amount)):
+                # never sent, so safe to send again
+                continue
+            sent_at = time.monotonic()
+            try:
+                confirmed_at = await asyncio.wait_for(echo, self.confirm_timeout)
+            except TimeoutError:
+                transfer.state = TransferState.UNCONFIRMED
+                await checkpoint.save()
+                logger.warning(f"No confirmation for {transfer.amount} to {transfer.receiver}; not re-sending")
+                return
+            transfer.state = TransferState.CONFIRMED
+            transfer.latency = confirmed_at - sent_at
+            await checkpoint.save()
+            return
+        echo.cancel()
+        transfer.state = TransferState.FAILED
+        await checkpoint.save()
+        logger.error(f"Failed to give {transfer.amount} to {transfer.receiver}")
+
+    async def run(self, plan: PayoutPlan, sender: ChannelSender) -> PayoutReport:
+        start = time.monotonic()
+        pending = [t for t in plan.transfers if t.state == TransferState.PENDING]
+        checkpoint = Checkpoint(plan, self.directory)
+        await checkpoint.save()
+        logger.info(f"Paying out {sum(t.amount for t in pending)} coins in {len(pending)} transfers ({plan.id})")
+        await asyncio.gather(*(self._pay(checkpoint, t, sender) for t in pending))
+
+        confirmed = [t for t in plan.transfers if t.state == TransferState.CONFIRMED]
+        report = PayoutReport(
+            plan.id,
+            confirmed=len(confirmed),
+            failed=sum(t.state == TransferState.FAILED for t in plan.transfers),
+            unconfirmed=sum(t.state == TransferState.UNCONFIRMED for t in plan.transfers),
+            coins=sum(t.amount for t in confirmed),
+            elapsed=time.monotonic() - start,
+        )
+        logger.info(str(report))
+        return report
+
+    async def resume(self, sender: ChannelSender) -> list[PayoutReport]:
+        """Finish payouts left incomplete by a previous run."""
+        reports = []
+        for path in sorted(await offload(lambda: list(self.directory.glob("*.json")))):
+            plan = await offload(PayoutPlan.load, path)
+            if plan.done:
+                continue
+            for t in plan.transfers:
+                if t.state == TransferState.SENDING:
+                    t.state = TransferState.UNCONFIRMED
+                    logger.warning(f"Payout {plan.id}: give of {t.amount} to {t.receiver} may not have been sent")
+            reports.append(await self.run(plan, sender))
+        return reports
@@ -1,3 +1,6 @@
+import logging
+from array import array
+from collections.abc import Iterable, Iterator, Mapping, Set
 from dataclasses import dataclass
 from enum import StrEnum, auto
 from typing import Callable, Awaitable, Any
@@ -7,105 +10,227 @@ from tctk import BotFeature
 from twitchAPI.chat import ChatMessage, EventData
 from twitchAPI.type import ChatEvent
 from random import randint
-from datetime import datetime
 import re
 from tctk.config import Command, Config
 from tctk.features.message_bot import MessageBotFeature
-from tctk.features.se.store import Raffle as RaffleStore
-from tctk.features.se.store import UserRaffle
-import pydash as py
+from tctk.features.message_router import MessageInterest
+from tctk.features.se.classifier import RaffleClosed, RaffleOpened, classify, classify_text
+from tctk.features.se.raffle.join_burst import JoinBurst
+from tctk.identity import identity_of
+
+logger = logging.getLogger(__name__)
 
 def clone_without(obj, *paths):
+    import pydash as py
     cloned = py.clone_deep(obj)      # deep copy, original stays unchanged
     for path in paths:
         py.unset(cloned, path)       # deep path: "user.password", "items[0].debug"
     return cloned
 
+class Joiners(Mapping[str, int]):
+    """A raffle's joiners in join order: name -> join time (ms).
+
+    Lookups ignore case. Names are kept in a list and join times as offsets
+    from the raffle's start in an ``array``, so tens of thousands of joiners
+    cost a few bytes each beyond the casefolded index.
+    """
+    __slots__ = ("start", "_names", "_offsets", "_index")
+
+    def __init__(self, start: int):
+        self.start = start
+        self._names: list[str] = []
+        # ms after start; 'I' holds a bit over 49 days
+        self._offsets = array("I")
+        # casefolded name -> position in _names, in join order
+        self._index: dict[str, int] = {}
+
+    def add(self, name: str, join_time: int, key: str | None = None) -> bool:
+        """Record ``name`` (casefolded: ``key``) joining; False when it already had."""
+        if key is None:
+            key = name.casefold()
+        if key in self._index:
+            return False
+        self._index[key] = len(self._names)
+        self._names.append(name)
+        self._offsets.append(max(0, join_time - self.start))
+        return True
+
+    def __getitem__(self, name: str) -> int:
+        return self.start + self._offsets[self._index[name.casefold()]]
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and name.casefold() in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def items(self) -> Iterator[tuple[str, int]]:
+        start = self.start
+        return zip(self._names, (start + offset for offset in self._offsets))
+
+    def entries(self, winner_keys: Set[str]) -> list[tuple[str, bool, int]]:
+        """(name, did win, join time) for every joiner, given the casefolded winners."""
+        start = self.start
+        return [(name, key in winner_keys, start + offset)
+                for name, key, offset in zip(self._names, self._index, self._offsets)]
+
+    def excluding(self, keys: Set[str]) -> list[str]:
+        """Names of the joiners whose casefolded name isn't in ``keys``."""
+        return [name for name, key in zip(self._names, self._index) if key not in keys]
+
+
 class Raffle:
-    active_raffle = None
     def __init__(self, start_time, duration, amount):
         self.start_time = start_time
         self.duration = duration
         self.amount = amount
-        self.joiners: dict[str, int] = {}
+        self.ends_at = start_time + duration * 1000
+        self.joiners = Joiners(start_time)
         self.winners: set[str] = set()
+        self._winner_keys: frozenset[str] = frozenset()
+        self.closed = False
+
+    def join(self, name: str, join_time: int, key: str | None = None) -> bool:
+        return self.joiners.add(name, join_time, key)
+
+    def close(self, winners: Iterable[str]):
+        self.winners = set(winners)
+        self._winner_keys = frozenset(w.casefold() for w in self.winners)
+        self.closed = True
+
+    def entries(self) -> list[tuple[str, bool, int]]:
+        """(name, did win, join time) for every joiner, in join order."""
+        return self.joiners.entries(self._winner_keys)
+
+    def losers(self) -> list[str]:
+        return self.joiners.excluding(self._winner_keys)
 
     def persist(self):
-        RaffleStore(self.start_time, self.duration, self.amount).save()
-        for joiner, join_time in self.joiners.items():
-            UserRaffle(joiner, self.start_time, joiner in self.winners, join_time).save()
+        # polars is only loaded once a raffle is saved
+        from tctk.features.se.store import Raffle as RaffleStore, UserRaffle
+        RaffleStore(self.start_time, self.duration, self.amount).save(flush=True)
+        UserRaffle.save_all(
+            (UserRaffle(joiner, self.start_time, won, join_time) for joiner, won, join_time in self.entries()),
+            flush=True,
+        )
 
     def did_win(self, name: str):
-        return name.casefold() in {x.casefold() for x in self.winners}
+        return name.casefold() in self._winner_keys
 
     def did_join(self, name: str):
-        return name.casefold() in {x.casefold() for x in self.joiners}
-
-    @staticmethod
-    def close_raffle(winners: list[str]):
-        Raffle.active_raffle.winners = set(winners)
-
-    @staticmethod
-    def set_active_raffle(raff: Raffle):
-        Raffle.active_raffle = raff
-
-    @staticmethod
-    def is_active_raffle():
-        return Raffle.active_raffle is not None
-
-    @staticmethod
-    def join_raffle(username: str, join_time: int):
-        if username not in Raffle.active_raffle.joiners:
-            Raffle.active_raffle.joiners[username] = join_time
-
-class Regex:
-    extract_amount_re = re.compile("a Multi-Raffle has begun for ([0-9]+) EastCoin")
-    extract_duration_re = re.compile("it will end in ([0-9]+) Seconds")
-    raffle_open_re = extract_amount_re
-    uname_re = "[\\w]{3,24}"
-    raffle_close_template = "The Multi-Raffle has ended and {0} won [0-9]+ EastCoin each FeelsGoodMan"
-    raffle_close_re = re.compile(raffle_close_template.format(uname_re))
-
-    one_winner_re = re.compile(raffle_close_template.format(uname_re))
-    two_winner_re = re.compile(raffle_close_template.format(f"{uname_re} and {uname_re}"))
-    three_plus_winner_re = re.compile(raffle_close_template.format(f"({uname_re})(, ({uname_re}))*(,)? and ({uname_re})"))
-
-
-class PRegex:
-    extract_amount_re = re.compile("l! gunR ([0-9]+) r! gunR")
-    extract_duration_re = re.compile("l! gunR ([0-9]+) r! gunR")
-    raffle_open_re = extract_amount_re
-
-    raffle_close_template = "PogChamp Frogdance {0} Dance"
-    uname_re = "[\\w]{3,24}"
-    one_winner_re = re.compile(raffle_close_template.format(uname_re))
-    two_winner_re = re.compile(raffle_close_template.format(f"{uname_re} and {uname_re}"))
-    three_plus_winner_re = re.compile(raffle_close_template.format(f"({uname_re})(, ({uname_re}))*(,)? and ({uname_re})"))
-    raffle_close_re = re.compile("PogChamp Frogdance ")
-
-# NOTE if there is an oxford comma with 3+ players in the output.
-# If so, we can, starting with the below template, break it up into the
-# three mutually exclusive cases of 1 winner, 2 winners and 3+winners
+        return name in self.joiners
+
+
+# An open raffle whose close announcement hasn't been seen this long after it
+# should have ended (e.g. the bot was disconnected) is dropped.
+ABANDON_AFTER_MS = 5 * 60 * 1000
+
+
+class RaffleState:
+    """The raffles of one channel.
+
+    Several raffles may be open at once. A join enters every open raffle that
+    hasn't ended by the join's timestamp, and a close announcement closes the
+    open raffle due to end first.
+
+    Every raffle feature sees the same messages; ``ingest`` applies each one
+    to the state once and hands every feature the same outcome. Joins are
+    counted and delivered in batches by ``burst`` (see join_burst).
+    """
+    # channel -> its state
+    channels: dict[str, RaffleState] = {}
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        # oldest first
+        self.open: list[Raffle] = []
+        self.last_closed: Raffle | None = None
+        self.burst = JoinBurst()
+
+    @classmethod
+    def of(cls, channel: str) -> RaffleState:
+        state = cls.channels.get(channel)
+        if state is None:
+            state = cls.channels[channel] = cls(channel)
+        return state
+
+    @property
+    def active(self) -> bool:
+        return bool(self.open)
+
+    @property
+    def current(self) -> Raffle | None:
+        """The most recently opened raffle still open."""
+        return self.open[-1] if self.open else None
+
+    def _drop_abandoned(self, now: int):
+        self.open = [r for r in self.open if r.ends_at + ABANDON_AFTER_MS >= now]
+
+    def start(self, raffle: Raffle) -> Raffle:
+        self._drop_abandoned(raffle.start_time)
+        self.open.append(raffle)
+        return raffle
+
+    def join(self, username: str, join_time: int) -> list[Raffle]:
+        """Enter ``username`` in the raffles open at ``join_time``; returns those it newly joined."""
+        key = username.casefold()
+        joined = []
+        for raffle in self.open:
+            if raffle.start_time <= join_time <= raffle.ends_at:
+                if raffle.join(username, join_time, key):
+                    joined.append(raffle)
+            elif join_time > raffle.ends_at + ABANDON_AFTER_MS:
+                self._drop_abandoned(join_time)
+                return self.join(username, join_time)
+        return joined
+
+    def close(self, winners: Iterable[str]) -> Raffle | None:
+        if not self.open:
+            return None
+        raffle = min(self.open, key=lambda r: r.ends_at)
+        self.open.remove(raffle)
+        raffle.close(winners)
+        self.last_closed = raffle
+        return raffle
+
+    def ingest(self, msg: ChatMessage, sender: ChannelSender,
+               authority_key: str) -> tuple[RaffleEvent, Raffle | None] | None:
+        """Apply ``msg`` to this channel's raffles, once however many features call this."""
+        try:
+            return msg._tctk_raffle
+        except AttributeError:
+            pass
+        outcome = None
+        event = classify(msg) if identity_of(msg).key == authority_key else None
+        if isinstance(event, RaffleClosed) and self.open:
+            outcome = RaffleEvent.CLOSE, self.close(event.winners)
+            if not self.open:
+                logger.info(f"{self.channel} raffle joins: {self.burst.reset()}")
+        elif self.open and _is_join_re.search(msg.text) is not None:
+            joined = self.join(identity_of(msg).name, msg.sent_timestamp)
+            self.burst.add([RaffleEventData(msg, raffle) for raffle in joined], sender)
+            outcome = RaffleEvent.JOIN, None
+        elif isinstance(event, RaffleOpened):
+            if not self.open:
+                self.burst.reset()
+            outcome = RaffleEvent.OPEN, self.start(Raffle(msg.sent_timestamp, event.duration, event.amount))
+        msg._tctk_raffle = outcome
+        return outcome
+
+
 def extract_winners(txt: str):
-    # TODO TODO WHAT GOES IN HERE also check logic below
-    one_match = Regex.one_winner_re.search(txt)
-    two_match = Regex.two_winner_re.search(txt)
-    three_match = Regex.three_plus_winner_re.search(txt)
-    if one_match is not None:
-        return list(one_match.groups())
-    if two_match is not None:
-        return list(two_match.groups())
-    if three_match is not None:
-        stripped = [x.strip(",").strip(" ") for x in three_match.groups()]
-        return [*filter(lambda x: x != '', stripped)]
-    print(f"Could not extract winners from {txt} {datetime.now().timestamp()}")
+    event = classify_text(txt)
+    if isinstance(event, RaffleClosed):
+        return list(event.winners)
+    logger.warning(f"Could not extract winners from {txt}")
     return None
 
 def extract_dur_amt(txt: str):
-    groups = Regex.extract_amount_re.search(txt).groups()
-    amount = int(groups[0])
-    groups = Regex.extract_duration_re.search(txt).groups()
-    return int(groups[0]), amount
+    event = classify_text(txt)
+    return event.duration, event.amount
 
 randhex = lambda d: hex(randint(0,16**d - 1)).split("x")[1].rjust(d,"0")
 unique = lambda s: f"{s} {randhex(4)}"
@@ -120,20 +245,35 @@ class RaffleEventData:
     message: ChatMessage
     raffle: Raffle
 
-def join_predicate(msg: ChatMessage):
-    is_join_re = re.compile('( |^)'+str(Command.raffle_join) + '\\b')
-    return Raffle.is_active_raffle() and is_join_re.search(msg.text) is not None
+_is_join_re = re.compile('( |^)' + re.escape(str(Command.raffle_join)) + '\\b')
+
+def join_predicate(msg: ChatMessage, channel: str):
+    return RaffleState.of(channel).active and _is_join_re.search(msg.text) is not None
 
 def raffle_open_predicate(msg: ChatMessage, raffle_bot_username):
-    return (msg.user.name.casefold() == raffle_bot_username.casefold() and
-            Regex.raffle_open_re.search(msg.text) is not None)
+    return (identity_of(msg).key == raffle_bot_username.casefold() and
+            isinstance(classify(msg), RaffleOpened))
 
 def raffle_close_predicate(msg: ChatMessage, raffle_bot_username):
-    return msg.user.name.casefold() == raffle_bot_username.casefold() and Regex.raffle_close_re.search(msg.text) is not None
+    return identity_of(msg).key == raffle_bot_username.casefold() and isinstance(classify(msg), RaffleClosed)
 
 class RaffleFeature(MessageBotFeature):
-    def __init__(self, raffle_bot_username = Config.get().raffle_authority_user):
-        self.raffle_bot_username = raffle_bot_username
+    def __init__(self, raffle_bot_username: str | None = None):
+        # None follows the config
+        self._raffle_bot_username = raffle_bot_username
+        self._raffle_bot_override_key = raffle_bot_username.casefold() if raffle_bot_username else None
+
+    @property
+    def raffle_bot_username(self) -> str:
+        return self._raffle_bot_username or Config.get().raffle_authority_user
+
+    @property
+    def _raffle_bot_key(self) -> str:
+        return self._raffle_bot_override_key or Config.get().raffle_authority
+
+    def message_interest(self) -> MessageInterest:
+        # StreamElements only honours !join as the leading token.
+        return MessageInterest.of(authors=[self.raffle_bot_username], commands=[str(Command.raffle_join)])
 
     async def on_open(self, raffle_event_data: RaffleEventData, sender: ChannelSender):
         pass
@@ -141,17 +281,29 @@ class RaffleFeature(MessageBotFeature):
     async def on_join(self, raffle_event_data: RaffleEventData, sender: ChannelSender):
         pass
 
+    async def on_joins(self, batch: list[RaffleEventData], sender: ChannelSender):
+        """Joins made since the last batch; a feature overriding this or on_join receives them."""
+        for event_data in batch:
+            await self.on_join(event_data, sender)
+
+    def wants_joins(self) -> bool:
+        cls = type(self)
+        return cls.on_join is not RaffleFeature.on_join or cls.on_joins is not RaffleFeature.on_joins
+
     async def on_close(self, raffle_event_data: RaffleEventData, sender: ChannelSender):
         pass
 
     async def on_message(self, msg: ChatMessage, c: ChannelSender):
-        if raffle_close_predicate(msg, self.raffle_bot_username):
-            Raffle.close_raffle(extract_winners(msg.text))
-            await self.on_close(RaffleEventData(msg, Raffle.active_raffle), c)
-        elif join_predicate(msg):
-            Raffle.join_raffle(msg.user.name, msg.sent_timestamp)
-            await self.on_join(RaffleEventData(msg, Raffle.active_raffle), c)
-        elif raffle_open_predicate(msg, self.raffle_bot_username):
-            start_time = msg.sent_timestamp
-            Raffle.set_active_raffle(Raffle(start_time, *extract_dur_amt(msg.text)))
-            await self.on_open(RaffleEventData(msg, Raffle.active_raffle), c)
\ No newline at end of file
+        state = RaffleState.of(c.channel)
+        outcome = state.ingest(msg, c, self._raffle_bot_key)
+        if outcome is None:
+            return
+        kind, raffle = outcome
+        if kind is RaffleEvent.CLOSE:
+            # joins still buffered belong to this raffle
+            await state.burst.flush()
+            await self.on_close(RaffleEventData(msg, raffle), c)
+        elif kind is RaffleEvent.OPEN:
+            if self.wants_joins():
+                state.burst.subscribe(self)
+            await self.on_open(RaffleEventData(msg, raffle), c)
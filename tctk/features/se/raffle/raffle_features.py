@@ -1,7 +1,16 @@
-from twitchAPI.chat import ChatMessage
+import asyncio
 
+from twitchAPI.chat import ChatMessage, EventData
+from twitchAPI.type import ChatEvent
+
+from tctk import Subscription
 from tctk.bot import ChannelSender
 from tctk.config import Command, Config
+from tctk.identity import identity_of, self_key
+from tctk.outbound import Priority
+from tctk.features.message_router import MessageInterest
+from tctk.features.se.classifier import CoinsGiven, classify
+from tctk.features.se.raffle.payout import PayoutEngine, PayoutPlan, payouts_dir
 from tctk.features.se.raffle.raffle_feature import RaffleEventData, RaffleFeature
 
 logger = Config.logger(__name__)
@@ -10,25 +19,67 @@ class RaffleJoinFeature(RaffleFeature):
     def __init__(self, *args):
         super().__init__(*args)
     async def on_open(self, event_data, sender):
-        return await sender.send_unique(Command.raffle_join())
+        # a join after the raffle closes is pointless; queued without waiting so
+        # the handler finishes well within its timeout
+        await sender.submit_unique(Command.raffle_join(), priority=Priority.HIGH,
+                                   ttl=event_data.raffle.duration)
 
 class RaffleGiveawayFeature(RaffleFeature):
+    """When the bot wins a raffle, shares its winnings equally among the joiners who didn't win."""
     requires = ["raffle_join"]
 
     def __init__(self, *args):
         super().__init__(*args)
+        # created on first use: checkpoints are kept per channel
+        self.payouts: PayoutEngine | None = None
+        self._resumed = False
+        self._running: set[asyncio.Task] = set()
+
+    def _payouts(self, sender: ChannelSender) -> PayoutEngine:
+        if self.payouts is None:
+            self.payouts = PayoutEngine(payouts_dir().joinpath(sender.channel))
+        return self.payouts
+
+    def message_interest(self) -> MessageInterest:
+        interest = super().message_interest()
+        # gives are echoed by the duel authority
+        return MessageInterest(interest.authors | {Config.get().duel_authority}, interest.commands)
+
+    def get_subscriptions(self) -> list[Subscription]:
+        return super().get_subscriptions() + [(ChatEvent.JOINED, self._on_joined)]
+
+    async def _on_joined(self, event: EventData, sender: ChannelSender):
+        if not self._resumed:
+            self._resumed = True
+            # in the background: resumed gives wait for their echoes far longer than the handler timeout
+            self._start(self._payouts(sender).resume(sender))
+
+    def _start(self, coro):
+        task = asyncio.create_task(coro)
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def on_message(self, msg: ChatMessage, c: ChannelSender):
+        if identity_of(msg).is_duel_authority:
+            event = classify(msg)
+            if isinstance(event, CoinsGiven) and event.giver.casefold() == self_key(c.chat):
+                self._payouts(c).confirm(event)
+        await super().on_message(msg, c)
 
     async def on_close(self, event_data: RaffleEventData, sender: ChannelSender):
-        logger.debug("close")
-        logger.debug(event_data.raffle.winners)
         raffle = event_data.raffle
-        if sender.user.name in raffle.winners:
-            non_winning_joiners = set(raffle.joiners.keys()).difference(raffle.winners)
-            winner_rcvd_amt = raffle.amount // len(raffle.winners)
-            each = winner_rcvd_amt // len(non_winning_joiners)
-            await sender.send_unique("EastCoin HandsUp EastCoin")
-            for loser in non_winning_joiners:
-                await sender.send_unique(Command.give(loser, each))
+        logger.debug(f"close, winners={raffle.winners}")
+        bot_name = self_key(sender.chat)
+        if not raffle.did_win(bot_name):
+            return
+        losers = raffle.losers()
+        plan = PayoutPlan.split_evenly(str(raffle.start_time), raffle.amount // len(raffle.winners), losers)
+        if not plan.transfers:
+            logger.info("Nobody to pay out to")
+            return
+        await sender.submit_unique("EastCoin HandsUp EastCoin")
+        # Run in the background: on_close must not hold up the message that triggered it.
+        self._start(self._payouts(sender).run(plan, sender))
 
 
 class RaffleReportFeature(RaffleFeature):
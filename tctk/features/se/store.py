@@ -1,88 +1,249 @@
-from typing import Any, ClassVar, Self, Type
+"""Append-only, date-partitioned Parquet history of duels and raffles.
 
+Rows are buffered per table and written as a new part file per flush:
+
+    <data_dir>/store/<Table>/date=YYYY-MM-DD/part-<id>.parquet
+
+Nothing is ever rewritten in place. Once a partition collects enough small
+part files, a background thread merges them into one. Reads are lazy scans
+over every live part file, so predicates and projections are pushed down.
+
+A compaction writes ``compact-<id>.json`` listing the parts it replaces
+before its merged ``part-<id>.parquet`` appears. Once the merged file exists
+readers skip the replaced parts, so they see every row exactly once, and
+the replaced parts are only deleted ``COMPACT_GRACE`` seconds later, so a
+scan that listed them can still read them. A compaction interrupted before
+its merged file appeared is discarded. Flushes sweep every partition of
+their table for such cleanups at most once per ``COMPACT_GRACE``, since a
+past date's partition is never written, and so never compacted, again.
+"""
 import json
-import polars as pl
-from polars import DataFrame
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import dataclasses
-import pathlib
+from pathlib import Path
+from typing import ClassVar, Iterable, Self
+
+import polars as pl
+
+from tctk.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Flush a table's buffer once it holds this many rows.
+FLUSH_ROWS = 10_000
+# Compact a partition once it has this many part files.
+COMPACT_FILES = 16
+# Seconds replaced part files are kept after a compaction.
+COMPACT_GRACE = 300.0
+
+_compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-compact")
+
 
-def get_data_file_path(cls):
-    return pathlib.Path(f"{cls.__name__}.parquet")
+def store_root() -> Path:
+    return Config.data_dir().joinpath("store")
 
-def write(cls):
-    cls.store.write_parquet(get_data_file_path(cls))
 
-def read(cls):
-    cls.store.read_parquet(get_data_file_path(cls))
+def _manifests(part_dir: Path) -> list[tuple[Path, dict]]:
+    found = []
+    for path in sorted(part_dir.glob("compact-*.json")):
+        try:
+            found.append((path, json.loads(path.read_text())))
+        except FileNotFoundError:
+            continue
+        except ValueError:
+            # torn by a crash before the merged file could appear
+            path.unlink(missing_ok=True)
+    return found
+
+
+def live_parts(part_dir: Path) -> list[Path]:
+    """The partition's part files, without those replaced by a finished compaction."""
+    # list the parts before reading manifests: a merged file renamed in between
+    # is then absent here, and its sources are still read
+    parts = sorted(part_dir.glob("part-*.parquet"))
+    names = {p.name for p in parts}
+    replaced = set()
+    for _, manifest in _manifests(part_dir):
+        if manifest["merged"] in names:
+            replaced.update(manifest["replaces"])
+    return [p for p in parts if p.name not in replaced]
+
+
+def finish_compactions(part_dir: Path, grace: float = COMPACT_GRACE, now: float | None = None):
+    """Delete parts replaced at least ``grace`` seconds ago, and leftovers of interrupted compactions."""
+    now = time.time() if now is None else now
+    for path, manifest in _manifests(part_dir):
+        if not part_dir.joinpath(manifest["merged"]).exists():
+            path.unlink()
+            part_dir.joinpath(f".{path.stem}.tmp").unlink(missing_ok=True)
+            continue
+        age = now - manifest["t"]
+        if age >= grace:
+            for name in manifest["replaces"]:
+                part_dir.joinpath(name).unlink(missing_ok=True)
+        # kept a while longer for scans that listed the parts before they went
+        if age >= 2 * grace:
+            path.unlink()
+
+
+class StoredRow:
+    """Base for row dataclasses persisted in the Parquet store."""
+    schema: ClassVar[dict[str, pl.DataType]]
+    # Millisecond timestamp column that decides a row's date partition.
+    partition_by: ClassVar[str]
+    _buffer: ClassVar[list[dict]]
+    _lock: ClassVar[threading.Lock]
+    # time.monotonic() of the last sweep
+    _swept: ClassVar[float]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._buffer = []
+        cls._lock = threading.Lock()
+        cls._swept = float("-inf")
+
+    @classmethod
+    def table_dir(cls, root: Path | None = None) -> Path:
+        return (root or store_root()).joinpath(cls.__name__)
+
+    def save(self, flush: bool = False):
+        type(self).save_all([self], flush=flush)
+
+    @classmethod
+    def save_all(cls, rows: Iterable[Self], flush: bool = False):
+        with cls._lock:
+            cls._buffer.extend(dataclasses.asdict(r) for r in rows)
+            full = len(cls._buffer) >= FLUSH_ROWS
+        if flush or full:
+            cls.flush()
+
+    @classmethod
+    def flush(cls, root: Path | None = None) -> list[Path]:
+        """Write buffered rows as one new part file per date partition."""
+        with cls._lock:
+            rows, cls._buffer = cls._buffer, []
+        if not rows:
+            return []
+        return cls.write_frame(pl.DataFrame(rows, schema=cls.schema), root)
+
+    @classmethod
+    def write_frame(cls, df: pl.DataFrame, root: Path | None = None) -> list[Path]:
+        """Write a frame with this table's columns as new part files, one per date partition."""
+        df = df.select(pl.col(name).cast(dtype) for name, dtype in cls.schema.items())
+        df = df.with_columns(
+            pl.from_epoch(cls.partition_by, time_unit="ms")
+            .dt.strftime("%Y-%m-%d")
+            .fill_null("unknown")
+            .alias("date")
+        )
+        written = []
+        for (date,), part in df.partition_by("date", as_dict=True, include_key=False).items():
+            part_dir = cls.table_dir(root).joinpath(f"date={date}")
+            part_dir.mkdir(parents=True, exist_ok=True)
+            path = part_dir.joinpath(f"part-{uuid.uuid4().hex}.parquet")
+            part.write_parquet(path)
+            written.append(path)
+            if len(live_parts(part_dir)) >= COMPACT_FILES:
+                _compactor.submit(cls.compact_partition, part_dir)
+        now = time.monotonic()
+        if now - cls._swept >= COMPACT_GRACE:
+            cls._swept = now
+            _compactor.submit(cls.sweep, root)
+        return written
+
+    @classmethod
+    def compact_partition(cls, part_dir: Path, grace: float = COMPACT_GRACE) -> Path | None:
+        """Merge a partition's part files into one. Runs on the compaction thread."""
+        finish_compactions(part_dir, grace)
+        parts = live_parts(part_dir)
+        if len(parts) < 2:
+            return None
+        merged = pl.read_parquet(parts, schema=cls.schema)
+        compaction = uuid.uuid4().hex
+        tmp = part_dir.joinpath(f".compact-{compaction}.tmp")
+        merged.write_parquet(tmp)
+        manifest = part_dir.joinpath(f"compact-{compaction}.json")
+        manifest_tmp = manifest.with_suffix(".json.tmp")
+        manifest_tmp.write_text(json.dumps({
+            "merged": f"part-{compaction}.parquet", "replaces": [p.name for p in parts], "t": time.time(),
+        }))
+        os.replace(manifest_tmp, manifest)
+        target = part_dir.joinpath(f"part-{compaction}.parquet")
+        tmp.rename(target)
+        finish_compactions(part_dir, grace)
+        logger.debug(f"Compacted {len(parts)} files into {target}")
+        return target
+
+    @classmethod
+    def sweep(cls, root: Path | None = None, grace: float = COMPACT_GRACE):
+        """Finish the compactions of every partition. Runs on the compaction thread."""
+        for part_dir in cls.table_dir(root).glob("date=*"):
+            finish_compactions(part_dir, grace)
+
+    @classmethod
+    def compact(cls, root: Path | None = None, grace: float = COMPACT_GRACE):
+        for part_dir in cls.table_dir(root).glob("date=*"):
+            cls.compact_partition(part_dir, grace)
+
+    @classmethod
+    def scan(cls, root: Path | None = None) -> pl.LazyFrame:
+        """Lazily scan every flushed row, with the ``date`` partition column."""
+        table_dir = cls.table_dir(root)
+        parts = [str(p) for part_dir in sorted(table_dir.glob("date=*")) for p in live_parts(part_dir)]
+        if not parts:
+            return pl.LazyFrame(schema={**cls.schema, "date": pl.String})
+        return pl.scan_parquet(parts, hive_partitioning=True, hive_schema={"date": pl.String})
 
-def save[T](cls: Type[T], me: T):
-    row = dataclasses.asdict(me)
-    new = pl.DataFrame([row])
-    cls.store = pl.concat([cls.store, new])
-    write(cls)
 
 @dataclass
-class UserRaffle:
+class UserRaffle(StoredRow):
     username: str
     raffle_start_time: int
     did_win: bool
     join_time: int
 
-    @classmethod
-    def load(cls):
-        if get_data_file_path(cls).exists():
-            read(cls)
-        else:
-            cls.store: DataFrame = DataFrame(schema={
-                "username": pl.String,
-                "raffle_start_time": pl.UInt32,
-                "did_win": pl.Boolean,
-                "join_time": pl.UInt32
-            })
-
-    def save(self):
-        save(UserRaffle, self)
+    schema = {
+        "username": pl.String,
+        "raffle_start_time": pl.Int64,
+        "did_win": pl.Boolean,
+        "join_time": pl.Int64,
+    }
+    partition_by = "raffle_start_time"
+
 
 @dataclass
-class Raffle:
+class Raffle(StoredRow):
     start_time: int
     duration: int
     amount: int
 
-    @classmethod
-    def load(cls):
-        if get_data_file_path(cls).exists():
-            read(cls)
-        else:
-            cls.store: DataFrame = DataFrame(schema={
-                "start_time": pl.UInt32,
-                "duration": pl.UInt8,
-                "amount": pl.UInt16
-            })
-
-    def save(self):
-        save(Raffle, self)
+    schema = {
+        "start_time": pl.Int64,
+        "duration": pl.Int32,
+        "amount": pl.Int64,
+    }
+    partition_by = "start_time"
+
 
 @dataclass
-class Duel:
-    initiator: pl.String
-    opponent: pl.String
-    offer_time: pl.UInt32
-    accepted: pl.Boolean
-    accepted_time: pl.UInt32
-    won: pl.Boolean
+class Duel(StoredRow):
+    initiator: str
+    opponent: str
+    offer_time: int | None
+    amount: int
+    offerer_win: bool
 
-    @classmethod
-    def load(cls):
-        if get_data_file_path(cls).exists():
-            read(cls)
-        else:
-            cls.store: DataFrame = DataFrame(schema={
-                "start_time": pl.UInt32,
-                "duration": pl.UInt8,
-                "amount": pl.UInt16
-            })
-
-    def save(self):
-        save(Raffle, self)
+    schema = {
+        "initiator": pl.String,
+        "opponent": pl.String,
+        "offer_time": pl.Int64,
+        "amount": pl.Int64,
+        "offerer_win": pl.Boolean,
+    }
+    partition_by = "offer_time"
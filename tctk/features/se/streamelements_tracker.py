@@ -1,6 +1,10 @@
+import asyncio
+import json
 import logging
-
-import psycopg
+import time
+from pathlib import Path
+from typing import ClassVar
+from uuid import uuid4
 
 from tctk import BotFeature, Subscription
 from tctk.bot import ChatBot, ChannelSender
@@ -8,6 +12,7 @@ from tctk.config import Config
 from tctk.features.se.duel.duel import DuelOffer, Duel
 from tctk.features.se.duel.duel_feature import DuelFeature
 from tctk.features.se.raffle.raffle_feature import RaffleFeature, RaffleEventData
+from tctk.spool import Spool
 
 logger = logging.getLogger(__name__)
 
@@ -35,65 +40,258 @@ CREATE TABLE IF NOT EXISTS user_raffle (
     did_win BOOLEAN NOT NULL,
     join_time BIGINT NOT NULL
 );
+
+ALTER TABLE duel ADD COLUMN IF NOT EXISTS event_id TEXT;
+ALTER TABLE raffle ADD COLUMN IF NOT EXISTS event_id TEXT;
+ALTER TABLE user_raffle ADD COLUMN IF NOT EXISTS event_id TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS duel_event_id_key ON duel (event_id);
+CREATE UNIQUE INDEX IF NOT EXISTS raffle_event_id_key ON raffle (event_id);
+CREATE UNIQUE INDEX IF NOT EXISTS user_raffle_event_id_key ON user_raffle (event_id);
+
+ALTER TABLE duel ADD COLUMN IF NOT EXISTS channel TEXT;
+ALTER TABLE raffle ADD COLUMN IF NOT EXISTS channel TEXT;
+ALTER TABLE user_raffle ADD COLUMN IF NOT EXISTS channel TEXT;
 """
 
+INSERT_DUEL = """INSERT INTO duel (event_id, channel, initiator, opponent, offer_time, amount, offerer_win)
+VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT (event_id) DO NOTHING"""
+INSERT_RAFFLE = """INSERT INTO raffle (event_id, channel, start_time, duration, amount)
+VALUES (%s, %s, %s, %s, %s) ON CONFLICT (event_id) DO NOTHING"""
+# COPY cannot skip duplicates, so user_raffle rows are copied into a staging table first.
+CREATE_USER_RAFFLE_STAGE = """CREATE TEMP TABLE IF NOT EXISTS user_raffle_stage (
+    event_id TEXT, channel TEXT, username TEXT, raffle_start_time BIGINT, did_win BOOLEAN, join_time BIGINT
+) ON COMMIT DELETE ROWS"""
+COPY_USER_RAFFLE_STAGE = "COPY user_raffle_stage (event_id, channel, username, raffle_start_time, did_win, join_time) FROM STDIN"
+MERGE_USER_RAFFLE_STAGE = """INSERT INTO user_raffle (event_id, channel, username, raffle_start_time, did_win, join_time)
+SELECT event_id, channel, username, raffle_start_time, did_win, join_time FROM user_raffle_stage
+ON CONFLICT (event_id) DO NOTHING"""
+
+# Replay at most this many spooled records per transaction ...
+FLUSH_RECORDS = 500
+# ... and let records accumulate for up to this many seconds first.
+FLUSH_INTERVAL = 2.0
+# How long on_exit waits for the spool to drain into the database.
+DRAIN_DEADLINE = 10.0
+# Retry delay bounds (seconds) while the database is unreachable.
+RETRY_MIN = 1.0
+RETRY_MAX = 60.0
+# Replays of a batch failing with anything but a connection error before its
+# records are written one by one and those still failing are dead-lettered.
+MAX_ATTEMPTS = 5
+# Log the spool backlog at most this often (seconds) while it is non-empty.
+BACKLOG_REPORT_INTERVAL = 60.0
+
+
+def _is_transient(e: Exception) -> bool:
+    """Whether ``e`` means the database couldn't be reached, rather than that it rejected the records."""
+    from psycopg import OperationalError
+    return isinstance(e, (OperationalError, OSError))
+
+
+def spool_path() -> Path:
+    return Config.data_dir().joinpath("tracker.spool")
+
+
+class TrackerWriter:
+    """Records tracked duels and raffles in a local Spool and replays them
+    into Postgres from a background task, so chat handlers never wait on the
+    database and records survive database outages and restarts.
+
+    Every spooled record carries an event id that becomes a unique key in its
+    table, making replays idempotent. Each replay uses one pooled connection
+    and one transaction: executemany for duel/raffle rows and COPY (through a
+    staging table) for user_raffle rows. Statements are prepared on first use.
+    A batch the database keeps rejecting (not merely unreachable) is written
+    record by record after MAX_ATTEMPTS, and the records still rejected are
+    moved to ``<spool>.dead.jsonl`` so they don't hold up the rest.
+
+    One writer is shared by every channel in the process (see ``acquire``).
+    While ``offline`` is set (by tctk replay) records are spooled but never
+    replayed into Postgres.
+    """
+    _shared: ClassVar[TrackerWriter | None] = None
+    _users: ClassVar[int] = 0
+    offline: ClassVar[bool] = False
+
+    def __init__(self, conninfo: str, spool: Spool, flush_records: int = FLUSH_RECORDS,
+                 flush_interval: float = FLUSH_INTERVAL):
+        from psycopg_pool import AsyncConnectionPool
+        self.pool = AsyncConnectionPool(
+            conninfo, min_size=1, max_size=2, open=False,
+            kwargs={"prepare_threshold": 0},
+        )
+        self.spool = spool
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.dead_letter_path = spool.path.with_name(spool.path.stem + ".dead.jsonl")
+        self._schema_ready = False
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    async def acquire(cls) -> TrackerWriter:
+        """The process-wide writer, opened by its first user."""
+        if cls._shared is None:
+            cls._shared = cls(Config.get().rdbms_connection_string, Spool(spool_path()))
+            await cls._shared.open()
+        cls._users += 1
+        return cls._shared
+
+    @classmethod
+    async def release(cls):
+        """Drop a reference from ``acquire``; the last one closes the writer."""
+        cls._users -= 1
+        if cls._users == 0 and cls._shared is not None:
+            writer, cls._shared = cls._shared, None
+            await writer.close()
+
+    async def open(self):
+        self.spool.start()
+        if self.offline:
+            return
+        # Don't wait for a connection: records spool locally until Postgres is reachable.
+        await self.pool.open(wait=False)
+        self._task = asyncio.create_task(self._run())
+
+    def put_duel(self, channel: str, duel: Duel):
+        self.spool.append({
+            "kind": "duel",
+            "id": uuid4().hex,
+            "channel": channel,
+            "row": [duel.offerer, duel.offeree, duel.proposal_time, duel.amount, duel.offerer_win],
+        })
+
+    def put_raffle(self, channel: str, start_time: int, duration: int, amount: int,
+                   joiners: list[tuple[str, bool, int]]):
+        self.spool.append({
+            "kind": "raffle",
+            "id": uuid4().hex,
+            "channel": channel,
+            "row": [start_time, duration, amount],
+            "joiners": joiners,
+        })
+
+    async def _write(self, records: list[dict]):
+        # records spooled before channels were tracked have no "channel"
+        duels = [(r["id"], r.get("channel"), *r["row"]) for r in records if r["kind"] == "duel"]
+        raffles = [r for r in records if r["kind"] == "raffle"]
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                if not self._schema_ready:
+                    # several statements: psycopg can't prepare those
+                    await cur.execute(SCHEMA_SQL, prepare=False)
+                if duels:
+                    await cur.executemany(INSERT_DUEL, duels)
+                if raffles:
+                    await cur.executemany(INSERT_RAFFLE, [(r["id"], r.get("channel"), *r["row"]) for r in raffles])
+                    await cur.execute(CREATE_USER_RAFFLE_STAGE)
+                    async with cur.copy(COPY_USER_RAFFLE_STAGE) as copy:
+                        for r in raffles:
+                            start_time = r["row"][0]
+                            for username, did_win, join_time in r["joiners"]:
+                                await copy.write_row((f"{r['id']}:{username}", r.get("channel"), username,
+                                                      start_time, did_win, join_time))
+                    await cur.execute(MERGE_USER_RAFFLE_STAGE)
+        # only once committed: a rolled-back transaction also undoes the DDL
+        self._schema_ready = True
+        logger.debug(f"Replayed {len(records)} tracker records")
+
+    async def _set_aside(self, records: list[dict]):
+        """Write ``records`` one at a time and move those that still fail to the dead-letter file."""
+        for record in records:
+            try:
+                await self._write([record])
+            except Exception as e:
+                if _is_transient(e):
+                    raise
+                logger.error(f"Moving tracker record {record.get('id')} to {self.dead_letter_path}: {e}")
+                with self.dead_letter_path.open("a") as f:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    async def _run(self):
+        retry = RETRY_MIN
+        failures = 0
+        last_report = time.monotonic()
+        while True:
+            if not await self.spool.wait_durable(self.flush_interval):
+                continue
+            if not self._closing and self.spool.depth < self.flush_records and self.spool.lag < self.flush_interval:
+                await asyncio.sleep(self.flush_interval - self.spool.lag)
+
+            records = self.spool.read(self.flush_records)
+            if not records:
+                continue
+            try:
+                if failures < MAX_ATTEMPTS:
+                    await self._write([r for _, r in records])
+                else:
+                    await self._set_aside([r for _, r in records])
+            except Exception as e:
+                # an unreachable database is waited out; other failures count towards MAX_ATTEMPTS
+                if not _is_transient(e):
+                    failures += 1
+                logger.error(f"Failed to replay {len(records)} tracker records, retrying in {retry:.0f}s: {e}")
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, RETRY_MAX)
+                continue
+            retry = RETRY_MIN
+            failures = 0
+            self.spool.commit(records[-1][0])
+
+            if self.spool.depth and time.monotonic() - last_report > BACKLOG_REPORT_INTERVAL:
+                last_report = time.monotonic()
+                logger.warning(f"Tracker spool backlog: depth={self.spool.depth}, lag={self.spool.lag:.1f}s")
+
+    async def close(self, deadline: float = DRAIN_DEADLINE):
+        self._closing = True
+        if self.offline:
+            await self.spool.close()
+            return
+        await self.spool.sync()
+        end = time.monotonic() + deadline
+        while self.spool.depth and time.monotonic() < end:
+            await asyncio.sleep(0.1)
+        if self.spool.depth:
+            logger.warning(f"{self.spool.depth} tracker records left in {self.spool.path}; they will be replayed on next start")
+        if self._task is not None:
+            self._task.cancel()
+        await self.spool.close()
+        await self.pool.close()
+
 
 class DuelTrackerFeature(DuelFeature):
-    def __init__(self, conn: psycopg.Connection, **kwargs):
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.conn = conn
+        self.writer: TrackerWriter | None = None
 
     async def on_result(self, duel: Duel, sender: ChannelSender):
-        logger.info(f"Recording duel: {duel.offerer} vs {duel.offeree} for {duel.amount}")
-        self.conn.execute(
-            "INSERT INTO duel (initiator, opponent, offer_time, amount, offerer_win) VALUES (%s, %s, %s, %s, %s)",
-            (duel.offerer, duel.offeree, duel.proposal_time, duel.amount, duel.offerer_win),
-        )
-        self.conn.commit()
+        logger.info(f"Recording duel in {sender.channel}: {duel.offerer} vs {duel.offeree} for {duel.amount}")
+        self.writer.put_duel(sender.channel, duel)
 
 
 class RaffleTrackerFeature(RaffleFeature):
-    def __init__(self, conn: psycopg.Connection, **kwargs):
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.conn = conn
+        self.writer: TrackerWriter | None = None
 
     async def on_close(self, event_data: RaffleEventData, sender: ChannelSender):
         raffle = event_data.raffle
         logger.info(f"Recording raffle: amount={raffle.amount}, duration={raffle.duration}, joiners={len(raffle.joiners)}")
-        self.conn.execute(
-            "INSERT INTO raffle (start_time, duration, amount) VALUES (%s, %s, %s)",
-            (raffle.start_time, raffle.duration, raffle.amount),
-        )
-        for username, join_time in raffle.joiners.items():
-            did_win = raffle.did_win(username)
-            self.conn.execute(
-                "INSERT INTO user_raffle (username, raffle_start_time, did_win, join_time) VALUES (%s, %s, %s, %s)",
-                (username, raffle.start_time, did_win, join_time),
-            )
-        self.conn.commit()
+        self.writer.put_raffle(sender.channel, raffle.start_time, raffle.duration, raffle.amount,
+                               raffle.entries())
 
 
 class StreamElementsTrackerFeature(BotFeature):
-    def __init__(self, raffle_bot_username=Config.get().raffle_authority_user,
-                 duel_authority_user=Config.get().duel_authority_user):
-        conn_string = Config.get().rdbms_connection_string
-        self.conn = psycopg.connect(conn_string, autocommit=False)
-        self.duel_tracker = DuelTrackerFeature(self.conn, duel_authority_user=duel_authority_user)
-        self.raffle_tracker = RaffleTrackerFeature(self.conn, raffle_bot_username=raffle_bot_username)
-
-    def on_start(self):
-        existing = {row[0] for row in self.conn.execute(
-            "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename IN ('duel', 'raffle', 'user_raffle')"
-        ).fetchall()}
-        needed = {'duel', 'raffle', 'user_raffle'}
-        missing = needed - existing
-        if missing:
-            logger.info(f"Creating tracker tables: {', '.join(sorted(missing))}")
-            self.conn.execute(SCHEMA_SQL)
-            self.conn.commit()
+    def __init__(self, raffle_bot_username: str | None = None, duel_authority_user: str | None = None):
+        self.duel_tracker = DuelTrackerFeature(duel_authority_user=duel_authority_user)
+        self.raffle_tracker = RaffleTrackerFeature(raffle_bot_username=raffle_bot_username)
+
+    async def on_start(self):
+        writer = await TrackerWriter.acquire()
+        self.duel_tracker.writer = self.raffle_tracker.writer = writer
 
     def get_subscriptions(self) -> list[Subscription]:
         return self.duel_tracker.get_subscriptions() + self.raffle_tracker.get_subscriptions()
 
-    def on_exit(self, bot: ChatBot):
-        self.conn.close()
+    async def on_exit(self, bot: ChatBot):
+        await TrackerWriter.release()
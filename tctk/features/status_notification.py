@@ -50,7 +50,7 @@ class StatusNotificationFeature(BotFeature):
             await sender.send_unique(ready_message)
             logger.variable("self.updates_message")
             if self.updates_message is not None:
-                await sender.send_unique(f"POLICE {Vrnt.SansSerif.formatter(f"Bot updates: {self.updates_message}")} POLICE")
+                await sender.send_unique(f"POLICE {Vrnt.SansSerif.formatter()(f"Bot updates: {self.updates_message}")} POLICE")
 
         subs.append((ChatEvent.READY, on_ready))
         subs.append((ChatEvent.SUB, on_follow))
@@ -0,0 +1,118 @@
+"""Chatters interned by Twitch user id.
+
+``identity_of(msg)`` returns the one Identity of a message's author: the
+name it last chatted under, that name casefolded, and its roles (duel or
+raffle authority, config user, the bot itself). Handlers test the flags
+instead of casefolding and comparing names on every message. Identities are
+keyed by user id, so a renamed user keeps the same Identity and its roles
+follow the new name.
+
+Roles come from the config and the bot's own login, and are recomputed when
+either changes. At most ``MAX_IDENTITIES`` are kept; the least recently
+seen are forgotten first.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from twitchAPI.chat import Chat, ChatMessage
+
+from tctk.config import Config
+
+MAX_IDENTITIES = 10_000
+
+
+@dataclass(slots=True, eq=False)
+class Identity:
+    # Twitch user id; "name:<key>" for messages without a user-id tag (e.g. old recordings)
+    id: str
+    name: str
+    # name casefolded
+    key: str
+    is_duel_authority: bool = False
+    is_raffle_authority: bool = False
+    is_config_user: bool = False
+    is_self: bool = False
+    # Identities.generation the roles were computed in
+    generation: int = -1
+
+    @property
+    def is_authority(self) -> bool:
+        return self.is_duel_authority or self.is_raffle_authority
+
+
+class Identities:
+    """LRU of Identity by user id."""
+
+    def __init__(self, maxsize: int = MAX_IDENTITIES):
+        self.maxsize = maxsize
+        self.generation = 0
+        self._by_id: OrderedDict[str, Identity] = OrderedDict()
+        # Chat -> (its username, that name casefolded)
+        self._self_keys: dict[int, tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def invalidate(self, *args):
+        """Recompute every identity's roles on its next lookup. Called on config changes."""
+        self.generation += 1
+
+    def self_key(self, chat: Chat) -> str:
+        """The bot's own login on ``chat``, casefolded."""
+        username = chat.username
+        cached = self._self_keys.get(id(chat))
+        if cached is None or cached[0] is not username:
+            cached = self._self_keys[id(chat)] = (username, (username or "").casefold())
+        return cached[1]
+
+    def get(self, user_id: str | None, name: str, self_key: str = "") -> Identity:
+        if user_id is None:
+            user_id = f"name:{name.casefold()}"
+        ident = self._by_id.get(user_id)
+        if (ident is not None and ident.name == name and ident.generation == self.generation
+                and ident.is_self == (ident.key == self_key)):
+            try:
+                self._by_id.move_to_end(user_id)
+            except KeyError:
+                # evicted by another thread just now
+                pass
+            return ident
+        with self._lock:
+            ident = self._by_id.get(user_id)
+            if ident is None:
+                ident = self._by_id[user_id] = Identity(user_id, name, name.casefold())
+                if len(self._by_id) > self.maxsize:
+                    self._by_id.popitem(last=False)
+            elif ident.name != name:
+                ident.name, ident.key = name, name.casefold()
+            self._assign_roles(ident, self_key)
+        return ident
+
+    def _assign_roles(self, ident: Identity, self_key: str):
+        cfg = Config.get()
+        ident.is_duel_authority = ident.key == cfg.duel_authority
+        ident.is_raffle_authority = ident.key == cfg.raffle_authority
+        ident.is_config_user = ident.key == cfg.config_user
+        ident.is_self = bool(self_key) and ident.key == self_key
+        ident.generation = self.generation
+
+
+identities = Identities()
+Config.on_change(identities.invalidate)
+
+
+def identity_of(msg: ChatMessage) -> Identity:
+    """The author of ``msg``, computed once per message."""
+    ident = getattr(msg, "_tctk_user", None)
+    if ident is None:
+        user = msg.user
+        ident = identities.get(user.id, user.name, identities.self_key(msg.chat))
+        msg._tctk_user = ident
+    return ident
+
+
+def self_key(chat: Chat) -> str:
+    """The bot's own login on ``chat``, casefolded, without casefolding it again on every call."""
+    return identities.self_key(chat)
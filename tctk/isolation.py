@@ -0,0 +1,123 @@
+"""Guards around feature event handlers.
+
+``isolate`` wraps a handler so that it is cancelled after a timeout and its
+exceptions are logged with the feature they came from instead of escaping
+into Chat's or the router's task callbacks. Features that set
+``blocking = True`` have their handlers run on a bounded thread pool, each
+worker thread driving its own event loop, so synchronous work inside them
+never stalls chat; their ChannelSender is swapped for a ThreadSafeSender
+that runs sends on the main loop. ``offload`` runs a single blocking call on
+the same pool.
+"""
+import asyncio
+import concurrent.futures
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from typing import Any, Awaitable, Callable
+
+from tctk.config import Config
+
+logger = logging.getLogger(__name__)
+
+_pool: ThreadPoolExecutor | None = None
+_local = threading.local()
+
+
+def _init_worker():
+    _local.loop = asyncio.new_event_loop()
+
+
+def blocking_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=Config.get().blocking_workers,
+                                   thread_name_prefix="blocking-handler", initializer=_init_worker)
+    return _pool
+
+
+async def offload[T](fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking call on the blocking-handler pool."""
+    return await asyncio.get_running_loop().run_in_executor(blocking_pool(), partial(fn, *args, **kwargs))
+
+
+def _settle(bridged: concurrent.futures.Future, f: asyncio.Future):
+    """Give ``bridged`` the outcome of ``f``, including an exception."""
+    if f.cancelled():
+        bridged.cancel()
+    elif f.exception() is not None:
+        bridged.set_exception(f.exception())
+    else:
+        bridged.set_result(f.result())
+
+
+class ThreadSafeSender:
+    """A ChannelSender as seen from a worker thread's loop.
+
+    Coroutine methods run on the sender's own loop; futures they return
+    (e.g. from ``submit``) are bridged back to the worker's loop.
+    """
+
+    def __init__(self, sender, loop: asyncio.AbstractEventLoop):
+        self._sender = sender
+        self._loop = loop
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._sender, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def on_owner_loop(*args, **kwargs):
+            result = await attr(*args, **kwargs)
+            if isinstance(result, asyncio.Future):
+                bridged = concurrent.futures.Future()
+                result.add_done_callback(partial(_settle, bridged))
+                return bridged
+            return result
+
+        async def call(*args, **kwargs):
+            result = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(on_owner_loop(*args, **kwargs), self._loop))
+            if isinstance(result, concurrent.futures.Future):
+                return asyncio.wrap_future(result)
+            return result
+
+        return call
+
+
+def _run_on_worker(handler: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict):
+    return _local.loop.run_until_complete(handler(*args, **kwargs))
+
+
+def handler_timeout(feature: Any) -> float | None:
+    timeout = getattr(feature, "handler_timeout", None)
+    return Config.get().handler_timeout if timeout is None else timeout
+
+
+def isolate[**P](name: str, feature: Any, handler: Callable[P, Awaitable[Any]]) -> Callable[P, Awaitable[None]]:
+    """Wrap ``handler`` (whose last argument is the ChannelSender) with a timeout,
+    exception containment and, for blocking features, thread offload."""
+    timeout = handler_timeout(feature)
+    blocking = getattr(feature, "blocking", False)
+    label = f"{name}.{getattr(handler, '__name__', 'handler')}"
+
+    @wraps(handler)
+    async def guarded(*args: P.args, **kwargs: P.kwargs):
+        try:
+            async with asyncio.timeout(timeout):
+                if blocking:
+                    loop = asyncio.get_running_loop()
+                    args = (*args[:-1], ThreadSafeSender(args[-1], loop))
+                    await asyncio.wrap_future(blocking_pool().submit(_run_on_worker, handler, args, kwargs))
+                else:
+                    await handler(*args, **kwargs)
+        except TimeoutError:
+            if blocking:
+                logger.warning(f"{label} timed out after {timeout}s; its worker thread is still busy")
+            else:
+                logger.warning(f"{label} timed out after {timeout}s and was cancelled")
+        except Exception:
+            logger.exception(f"{label} failed")
+
+    return guarded
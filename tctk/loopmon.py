@@ -0,0 +1,192 @@
+"""Event-loop lag monitoring.
+
+A heartbeat task sleeps for ``interval`` and records how late it wakes up;
+that delay is the loop's lag. Percentiles of the recent lag are logged every
+``report_interval`` seconds.
+
+A watchdog thread watches the heartbeat. When the loop has not ticked for
+longer than ``threshold`` it samples the loop thread's stack until the loop
+comes back, then logs the stall with its most common stack and the feature
+the stalled code belongs to. Handlers are attributed through ``register``,
+which FeatureManagerFeature calls with the name it subscribes a feature
+under. Features often share handler code (every MessageBotFeature's MESSAGE
+callback, RaffleFeature.on_message), so a handler bound to an object is
+attributed by the ``self`` of its frame rather than by its code.
+"""
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats.
+HEARTBEAT_INTERVAL = 0.05
+# Stalls shorter than this are not sampled.
+STALL_THRESHOLD = 0.1
+# Seconds between lag percentile reports.
+REPORT_INTERVAL = 60.0
+# Lag samples kept for percentiles.
+WINDOW = 2048
+# Stalls kept for inspection.
+STALLS_KEPT = 64
+
+# code object of a registered handler -> name of its feature, or None when
+# the handler is bound to an object and the name is looked up in _instances
+_handlers: dict[CodeType, str | None] = {}
+# id() of the object a registered handler is bound to -> name of its feature
+_instances: dict[int, str] = {}
+
+
+def _bound_to(handler: Callable) -> object | None:
+    """The ``self`` that ``handler`` runs with: a bound method's instance or a closure's ``self``."""
+    if hasattr(handler, "__self__"):
+        return handler.__self__
+    code = getattr(handler, "__code__", None)
+    if code is None or "self" not in code.co_freevars:
+        return None
+    return handler.__closure__[code.co_freevars.index("self")].cell_contents
+
+
+def register(name: str, handler: Callable):
+    """Attribute stalls inside ``handler`` to the feature ``name``."""
+    while hasattr(handler, "__wrapped__"):
+        handler = handler.__wrapped__
+    code = getattr(getattr(handler, "__func__", handler), "__code__", None)
+    if code is None:
+        return
+    owner = _bound_to(handler)
+    if owner is None:
+        _handlers[code] = name
+    else:
+        _handlers.setdefault(code, None)
+        _instances[id(owner)] = name
+
+
+def owner_of(frame: FrameType | None) -> str | None:
+    """Feature owning the innermost registered handler on ``frame``'s stack."""
+    while frame is not None:
+        if frame.f_code in _handlers:
+            name = _handlers[frame.f_code] or _instances.get(id(frame.f_locals.get("self")))
+            if name is not None:
+                return name
+        frame = frame.f_back
+    return None
+
+
+@dataclass
+class Stall:
+    started: float
+    duration: float
+    feature: str | None
+    # most frequently sampled stack, innermost frame last
+    stack: list[str] = field(default_factory=list)
+    samples: int = 0
+
+    def __str__(self):
+        where = self.feature or "unattributed code"
+        return f"Event loop stalled {self.duration * 1000:.0f}ms in {where}:\n{''.join(self.stack)}"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = HEARTBEAT_INTERVAL, threshold: float = STALL_THRESHOLD,
+                 report_interval: float = REPORT_INTERVAL):
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.lags: deque[float] = deque(maxlen=WINDOW)
+        self.stalls: deque[Stall] = deque(maxlen=STALLS_KEPT)
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watchdog.join()
+
+    def percentiles(self) -> dict[str, float]:
+        """p50/p95/p99/max lag in seconds over the recent window."""
+        if len(self.lags) < 2:
+            lag = self.lags[0] if self.lags else 0.0
+            return {"p50": lag, "p95": lag, "p99": lag, "max": lag}
+        cuts = statistics.quantiles(self.lags, n=100, method="inclusive")
+        return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "max": max(self.lags)}
+
+    def report(self):
+        p = {k: v * 1000 for k, v in self.percentiles().items()}
+        logger.info(f"Loop lag p50={p['p50']:.1f}ms p95={p['p95']:.1f}ms p99={p['p99']:.1f}ms "
+                    f"max={p['max']:.1f}ms, {len(self.stalls)} stalls")
+
+    async def _heartbeat(self):
+        last_report = time.monotonic()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            self.lags.append(max(0.0, now - expected))
+            if now - last_report >= self.report_interval:
+                last_report = now
+                self.report()
+
+    def _sample(self) -> FrameType | None:
+        return sys._current_frames().get(self._loop_thread)
+
+    def _watch(self):
+        poll = self.threshold / 2
+        while not self._stopped.wait(poll):
+            beat = self._beat
+            if time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            stacks: Counter[tuple[str, ...]] = Counter()
+            owners: Counter[str | None] = Counter()
+            while self._beat == beat and not self._stopped.is_set():
+                frame = self._sample()
+                owners[owner_of(frame)] += 1
+                stacks[tuple(traceback.format_stack(frame))] += 1
+                del frame
+                self._stopped.wait(poll)
+            if not stacks:
+                continue
+            end = self._beat if self._beat != beat else time.monotonic()
+            stall = Stall(
+                started=beat + self.interval,
+                duration=end - beat - self.interval,
+                feature=self._attribute(owners),
+                stack=list(stacks.most_common(1)[0][0]),
+                samples=sum(stacks.values()),
+            )
+            self.stalls.append(stall)
+            logger.warning(str(stall))
+
+    @staticmethod
+    def _attribute(owners: Counter[str | None]) -> str | None:
+        named = [(name, n) for name, n in owners.most_common() if name is not None]
+        return named[0][0] if named else None
@@ -0,0 +1,293 @@
+"""Outbound chat message scheduling.
+
+Every message a ChannelSender sends goes through an OutboundScheduler, which
+releases one message at a time once both the room's slow-mode gap has passed
+and the account's TokenBucket has a token. The next message released is the
+highest-priority one still queued, so a duel ``!accept`` overtakes queued
+auto-responder jokes; messages whose deadline passes while queued are dropped
+instead of being sent late.
+
+The queue is bounded. ``submit`` returns as soon as a message is queued, with
+a future that resolves True once it is sent and False if it is dropped or the
+send fails; what happens when the queue is full is the scheduler's Overflow
+policy.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum, StrEnum, auto
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Twitch's chat limits: messages per RATE_PERIOD seconds, per account.
+RATE_PERIOD = 30.0
+USER_RATE = 20
+MOD_RATE = 100
+# Messages queued (or waiting out a delay) per channel.
+QUEUE_SIZE = 256
+
+
+class Priority(IntEnum):
+    """Lower values are sent first."""
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class Overflow(StrEnum):
+    """What ``submit`` does when the queue is full."""
+    # wait for room
+    BLOCK = auto()
+    # evict the oldest message of the lowest queued priority, if not above the new one
+    DROP_OLDEST = auto()
+    # reject the new message
+    DROP_NEWEST = auto()
+
+
+# Seconds a message may wait in the queue before it is dropped, per priority.
+DEFAULT_TTL: dict[Priority, float | None] = {
+    Priority.HIGH: None,
+    Priority.NORMAL: None,
+    Priority.LOW: 30.0,
+}
+
+
+class TokenBucket:
+    """Per-account send budget.
+
+    A spent token comes back ``period`` seconds after it was spent, so no
+    window of ``period`` seconds ever holds more than ``limit`` sends. The
+    limit is passed per call because it depends on the room (moderators get
+    a larger one), while the budget itself is shared by the whole account.
+    """
+
+    def __init__(self, period: float = RATE_PERIOD):
+        self.period = period
+        self._spent: deque[float] = deque()
+
+    def _expire(self, now: float):
+        while self._spent and self._spent[0] <= now - self.period:
+            self._spent.popleft()
+
+    def delay(self, limit: int, now: float | None = None) -> float:
+        """Seconds until a token is available under ``limit``."""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        if len(self._spent) < limit:
+            return 0.0
+        return self._spent[len(self._spent) - limit] + self.period - now
+
+    def take(self, now: float | None = None):
+        self._spent.append(time.monotonic() if now is None else now)
+
+    @property
+    def used(self) -> int:
+        self._expire(time.monotonic())
+        return len(self._spent)
+
+
+@dataclass(order=True)
+class Outbound:
+    priority: Priority
+    seq: int
+    # Produces the text at send time; returning None cancels the send.
+    render: Callable[[], str | None] = field(compare=False)
+    deadline: float | None = field(compare=False, default=None)
+    enqueued: float = field(compare=False, default=0.0)
+    future: asyncio.Future = field(compare=False, default=None)
+
+    def expired(self, now: float) -> bool:
+        return self.deadline is not None and now > self.deadline
+
+
+@dataclass
+class SchedulerStats:
+    sent: int = 0
+    expired: int = 0
+    # render() returned None, e.g. a send_guarded guard failed
+    skipped: int = 0
+    failed: int = 0
+    # dropped by the Overflow policy
+    overflowed: int = 0
+    last_wait: float = 0.0
+    max_wait: float = 0.0
+    # exponentially weighted mean of queue wait (seconds)
+    mean_wait: float = 0.0
+
+    def record_wait(self, wait: float):
+        self.last_wait = wait
+        self.max_wait = max(self.max_wait, wait)
+        self.mean_wait = wait if self.sent == 0 else self.mean_wait * 0.9 + wait * 0.1
+
+
+class OutboundScheduler:
+    def __init__(self, send: Callable[[str], Awaitable[None]], slow_delay: Callable[[], float],
+                 rate_limit: Callable[[], int], bucket: TokenBucket | None = None,
+                 maxsize: int = QUEUE_SIZE, overflow: Overflow = Overflow.BLOCK):
+        self._send = send
+        self._slow_delay = slow_delay
+        self._rate_limit = rate_limit
+        self.bucket = bucket or TokenBucket()
+        self.last_send_time: float = 0.0
+        self.stats = SchedulerStats()
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._heap: list[Outbound] = []
+        # messages submitted with a delay that haven't entered the heap yet
+        self._delayed = 0
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def depth_by_priority(self) -> dict[Priority, int]:
+        counts = dict.fromkeys(Priority, 0)
+        for item in self._heap:
+            counts[item.priority] += 1
+        return counts
+
+    @property
+    def oldest_wait(self) -> float:
+        """Seconds the longest-queued message has been waiting."""
+        if not self._heap:
+            return 0.0
+        return time.monotonic() - min(item.enqueued for item in self._heap)
+
+    @property
+    def full(self) -> bool:
+        return len(self._heap) + self._delayed >= self.maxsize
+
+    def _evict_for(self, priority: Priority) -> bool:
+        """Drop the oldest lowest-priority message to make room; False if none may go."""
+        live = [i for i in self._heap if not i.future.done()]
+        if not live:
+            return False
+        victim = min(live, key=lambda i: (-i.priority, i.enqueued))
+        if victim.priority < priority:
+            return False
+        self._heap.remove(victim)
+        heapq.heapify(self._heap)
+        self.stats.overflowed += 1
+        victim.future.set_result(False)
+        return True
+
+    async def submit(self, render: Callable[[], str | None], priority: Priority = Priority.NORMAL,
+                     ttl: float | None = None, delay: float | None = None) -> asyncio.Future:
+        """Queue a message and return a future resolving to whether it was sent.
+
+        Only waits when the queue is full and the policy is ``Overflow.BLOCK``.
+        ``ttl`` counts from when the message enters the queue, i.e. after ``delay``.
+        """
+        loop = asyncio.get_running_loop()
+        item = Outbound(priority, next(self._seq), render, future=loop.create_future())
+        while self.full:
+            if self.overflow == Overflow.BLOCK:
+                self._space.clear()
+                await self._space.wait()
+                continue
+            if self.overflow == Overflow.DROP_OLDEST and self._evict_for(priority):
+                continue
+            self.stats.overflowed += 1
+            logger.info(f"Outbound queue full ({self.maxsize}), dropping new message")
+            item.future.set_result(False)
+            return item.future
+
+        if ttl is None:
+            ttl = DEFAULT_TTL[priority]
+        if delay:
+            self._delayed += 1
+            loop.call_later(delay, self._push_delayed, item, ttl)
+        else:
+            self._push(item, ttl)
+        return item.future
+
+    def _push_delayed(self, item: Outbound, ttl: float | None):
+        self._delayed -= 1
+        self._push(item, ttl)
+
+    def _push(self, item: Outbound, ttl: float | None):
+        if item.future.done():
+            self._space.set()
+            return
+        item.enqueued = time.monotonic()
+        item.deadline = None if ttl is None else item.enqueued + ttl
+        heapq.heappush(self._heap, item)
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _ready_in(self, now: float) -> float:
+        slow_gap = self.last_send_time + self._slow_delay() - now
+        return max(slow_gap, self.bucket.delay(self._rate_limit(), now), 0.0)
+
+    def _drop_expired(self, now: float):
+        live = [i for i in self._heap if not i.expired(now) and not i.future.done()]
+        if len(live) == len(self._heap):
+            return
+        for item in self._heap:
+            if item.expired(now) and not item.future.done():
+                self.stats.expired += 1
+                logger.info(f"Dropping message queued {now - item.enqueued:.1f}s past its deadline")
+                item.future.set_result(False)
+        heapq.heapify(live)
+        self._heap = live
+        self._space.set()
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            self._drop_expired(now)
+            if not self._heap:
+                continue
+            wait = self._ready_in(now)
+            if wait > 0:
+                # re-evaluate afterwards: higher-priority messages may have arrived
+                await asyncio.sleep(wait)
+                continue
+
+            item = heapq.heappop(self._heap)
+            self._space.set()
+            try:
+                text = item.render()
+                if text is None:
+                    self.stats.skipped += 1
+                    item.future.set_result(False)
+                    continue
+                await self._send(text)
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f"Failed to send message: {e}")
+                # False, not the exception: fire-and-forget callers never retrieve it
+                if not item.future.done():
+                    item.future.set_result(False)
+                continue
+            now = time.monotonic()
+            self.last_send_time = now
+            self.bucket.take(now)
+            self.stats.record_wait(now - item.enqueued)
+            self.stats.sent += 1
+            logger.debug(f"Sent after {now - item.enqueued:.2f}s in queue, depth={self.depth}")
+            if not item.future.done():
+                item.future.set_result(True)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for item in self._heap:
+            item.future.cancel()
+        self._heap.clear()
+        self._space.set()
@@ -0,0 +1,283 @@
+"""Recording chat traffic and replaying it through features offline.
+
+ChatRecorder appends every MESSAGE, SUB and JOINED event of the channels it
+is attached to to a gzipped JSON-lines log: a header line, then one
+``[ms since start, event, room, payload]`` line per event, where the payload
+is the IRC message twitchAPI parsed the event from.
+
+``replay`` rebuilds those events on a ReplayChat, an in-process stand-in for
+the Chat connection, and emits them into a ChatBot wired up exactly as
+``tctk run`` wires it, at the recorded pace, N times faster, or as fast as
+the loop allows. Nothing reaches Twitch: each sender's scheduler sends to
+the ReplayChat without pacing, which keeps what would have been sent. Nothing
+persists either: for the duration of the replay Config.data_dir is a
+temporary directory (payout checkpoints, coin ledgers, the tracker spool) and
+the tracker writer keeps its records out of Postgres.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Iterator
+
+from twitchAPI.chat import ChatMessage, ChatSub, EventData, JoinedEvent
+from twitchAPI.type import ChatEvent
+
+from tctk.bot import ChannelSender, ChatBot
+from tctk.config import Config
+from tctk.features.feature_manager import FeatureManagerFeature
+from tctk.outbound import OutboundScheduler
+from tctk.rooms import room_of
+
+logger = logging.getLogger(__name__)
+
+LOG_VERSION = 1
+
+# events rebuilt from the IRC message they were parsed from
+PARSED_EVENTS: dict[ChatEvent, Callable[[Any, dict], Any]] = {
+    ChatEvent.MESSAGE: ChatMessage,
+    ChatEvent.SUB: ChatSub,
+}
+RECORDED = [*PARSED_EVENTS, ChatEvent.JOINED]
+
+
+@dataclass
+class Recorded:
+    # milliseconds since recording started
+    t: int
+    event: ChatEvent
+    room: str
+    payload: dict
+
+
+class ChatRecorder:
+    def __init__(self, path: Path, username: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._started = time.monotonic()
+        self.recorded = 0
+        self._write({"version": LOG_VERSION, "started": time.time(), "username": username})
+
+    def _write(self, row: Any):
+        self._file.write(json.dumps(row, separators=(",", ":"), default=str))
+        self._file.write("\n")
+
+    def record(self, event: ChatEvent, data: Any):
+        if event in PARSED_EVENTS:
+            payload = data._parsed
+        else:
+            payload = {"user": data.user_name}
+        t = int((time.monotonic() - self._started) * 1000)
+        self._write([t, event.value, room_of(data), payload])
+        self.recorded += 1
+
+    def attach(self, sender: ChannelSender):
+        """Record the recorded event types of ``sender``'s channel."""
+        for event in RECORDED:
+            async def handler(data, event=event):
+                self.record(event, data)
+            sender.register_event(event, handler)
+
+    def close(self):
+        self._file.close()
+        logger.info(f"Recorded {self.recorded} chat events to {self.path}")
+
+
+def read_log(path: Path) -> tuple[dict, Iterator[Recorded]]:
+    """The log's header and an iterator over its events."""
+    f = gzip.open(path, "rt", encoding="utf-8")
+    header = json.loads(f.readline())
+    if header.get("version") != LOG_VERSION:
+        f.close()
+        raise ValueError(f"{path}: unsupported chat log version {header.get('version')}")
+
+    def events():
+        with f:
+            for line in f:
+                t, event, room, payload = json.loads(line)
+                yield Recorded(t, ChatEvent(event), room, payload)
+
+    return header, events()
+
+
+@dataclass
+class Sent:
+    # seconds into the replay, in recorded time
+    t: float
+    channel: str
+    text: str
+
+
+class ReplayChat:
+    """Just enough of twitchAPI's Chat for ChatBot, ChannelSender and features."""
+
+    def __init__(self, username: str, channels: list[str]):
+        self.username = username
+        self.room_cache = {c: SimpleNamespace(name=c, slow=0) for c in channels}
+        self._event_handler: dict[ChatEvent, list] = {}
+        self._pending: set[asyncio.Task] = set()
+        self.sent: list[Sent] = []
+        # recorded time of the event being replayed, in seconds
+        self.clock = 0.0
+
+    def register_event(self, event, handler):
+        self._event_handler.setdefault(event, []).append(handler)
+
+    def unregister_event(self, event, handler):
+        handlers = self._event_handler.get(event, [])
+        if handler not in handlers:
+            return False
+        handlers.remove(handler)
+        return True
+
+    def is_mod(self, room) -> bool:
+        return True
+
+    async def send_message(self, room, text):
+        self.sent.append(Sent(self.clock, room, text))
+
+    def build(self, rec: Recorded) -> Any:
+        if rec.event in PARSED_EVENTS:
+            return PARSED_EVENTS[rec.event](self, rec.payload)
+        return JoinedEvent(self, rec.room, rec.payload["user"])
+
+    def emit(self, event: ChatEvent, data: Any):
+        # Chat schedules one task per registered handler
+        for handler in self._event_handler.get(event, []):
+            task = asyncio.ensure_future(handler(data))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+
+def unpaced(sender: ChannelSender):
+    """Swap the sender's scheduler for one that sends immediately."""
+    sender.scheduler = OutboundScheduler(sender._send_now, lambda: 0, lambda: sys.maxsize)
+
+
+@contextmanager
+def sandboxed() -> Iterator[Path]:
+    """Point Config.data_dir at a temporary directory and take the tracker writer offline."""
+    from tctk.features.se.streamelements_tracker import TrackerWriter
+    saved = Config.data_dir_override, TrackerWriter.offline
+    with tempfile.TemporaryDirectory(prefix="tctk-replay-") as d:
+        Config.data_dir_override, TrackerWriter.offline = Path(d), True
+        try:
+            yield Path(d)
+        finally:
+            Config.data_dir_override, TrackerWriter.offline = saved
+
+
+@dataclass
+class Latency:
+    samples: list[float] = field(default_factory=list)
+
+    def __str__(self):
+        s = sorted(self.samples)
+        p95 = s[min(len(s) - 1, int(len(s) * 0.95))]
+        return (f"{len(s)} calls, mean {statistics.fmean(s) * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms, "
+                f"max {s[-1] * 1000:.2f}ms")
+
+
+def timed[**P](handler: Callable[P, Awaitable[Any]], latency: Latency) -> Callable[P, Awaitable[Any]]:
+    @wraps(handler)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs):
+        start = time.perf_counter()
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            latency.samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+@dataclass
+class ReplayReport:
+    events: int
+    elapsed: float
+    # feature name -> handler latency
+    latency: dict[str, Latency]
+    sent: list[Sent]
+
+    @property
+    def rate(self) -> float:
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        lines = [f"{self.events} events in {self.elapsed:.2f}s ({self.rate:,.0f} events/s), {len(self.sent)} sent"]
+        for name, latency in sorted(self.latency.items()):
+            if latency.samples:
+                lines.append(f"  {name}: {latency}")
+        return "\n".join(lines)
+
+
+@dataclass
+class HandlerTimings:
+    """A FeatureManagerFeature ``instrument`` that times handlers per feature."""
+    latency: dict[str, Latency] = field(default_factory=dict)
+
+    def __call__(self, name: str, handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        return timed(handler, self.latency.setdefault(name, Latency()))
+
+
+async def replay(path: Path, setup: Callable[[ChatBot, HandlerTimings], Awaitable[list[FeatureManagerFeature]]],
+                 speed: float | None = None, drain: float = 5.0,
+                 teardown: Callable[[ChatBot], Awaitable[Any]] | None = None) -> ReplayReport:
+    """Replay the log at ``path`` into a ChatBot prepared by ``setup``, which
+    passes the HandlerTimings to the feature managers it creates and returns them.
+    ``teardown`` stops them again, while the replay is still sandboxed.
+
+    ``speed`` scales the recorded pace (1 is real time); None replays as fast
+    as possible. Handlers still running ``drain`` seconds after the last event
+    are left behind.
+    """
+    with sandboxed():
+        return await _replay(path, setup, speed, drain, teardown)
+
+
+async def _replay(path, setup, speed, drain, teardown) -> ReplayReport:
+    header, events = read_log(path)
+    records = list(events)
+    channels = list(dict.fromkeys(r.room for r in records if r.room))
+    chat = ReplayChat(header["username"], channels)
+    bot = ChatBot(channels, access_tokens_file=None)
+    bot.attach(chat)
+    for sender in bot.senders.values():
+        unpaced(sender)
+    timings = HandlerTimings()
+    managers = await setup(bot, timings)
+
+    chat.emit(ChatEvent.READY, EventData(chat))
+    start = time.perf_counter()
+    for rec in records:
+        chat.clock = rec.t / 1000
+        if speed is not None:
+            delay = start + chat.clock / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        chat.emit(rec.event, chat.build(rec))
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    deadline = time.perf_counter() + drain
+    while time.perf_counter() < deadline:
+        pending = chat._pending | bot.rooms._pending | {t for m in managers for t in m.router._pending}
+        if pending:
+            await asyncio.wait(pending, timeout=deadline - time.perf_counter())
+        elif any(s.scheduler.depth for s in bot.senders.values()):
+            await asyncio.sleep(0)
+        else:
+            break
+    for sender in bot.senders.values():
+        await sender.scheduler.close()
+    if teardown is not None:
+        await teardown(bot)
+    return ReplayReport(len(records), elapsed, timings.latency, chat.sent)
@@ -0,0 +1,83 @@
+"""Routing of chat events to the channel they belong to.
+
+A single Chat connection serves every channel. RoomDispatcher registers one
+Chat handler per event type and forwards each event only to the handlers
+registered for the event's room; events that carry no room (READY, WHISPER)
+go to every channel.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from twitchAPI.chat import Chat
+from twitchAPI.type import ChatEvent
+
+logger = logging.getLogger(__name__)
+
+type EventHandler = Callable[[Any], Awaitable[Any]]
+
+
+def room_of(event: Any) -> str | None:
+    """Name of the room an event happened in, if it has one."""
+    for attr in ("room_name", "_room_name"):
+        name = getattr(event, attr, None)
+        if isinstance(name, str):
+            return name
+    parsed = event if isinstance(event, dict) else getattr(event, "_parsed", None)
+    if isinstance(parsed, dict):
+        channel = (parsed.get("command") or {}).get("channel")
+        if isinstance(channel, str):
+            return channel.lstrip("#")
+    new_state = getattr(event, "new", None)
+    if isinstance(getattr(new_state, "name", None), str):
+        return new_state.name
+    name = getattr(event, "_name", None)
+    return name if isinstance(name, str) else None
+
+
+class RoomDispatcher:
+    def __init__(self, chat: Chat):
+        self.chat = chat
+        # event type -> casefolded room -> handlers
+        self._handlers: dict[ChatEvent, dict[str, list[EventHandler]]] = {}
+        self._pending: set[asyncio.Task] = set()
+
+    def register(self, room: str, event: ChatEvent, handler: EventHandler):
+        rooms = self._handlers.get(event)
+        if rooms is None:
+            rooms = self._handlers[event] = {}
+
+            async def dispatch(data):
+                self.dispatch(event, data)
+
+            self.chat.register_event(event, dispatch)
+        rooms.setdefault(room.casefold(), []).append(handler)
+
+    def unregister(self, room: str, event: ChatEvent, handler: EventHandler) -> bool:
+        handlers = self._handlers.get(event, {}).get(room.casefold(), [])
+        if handler not in handlers:
+            return False
+        handlers.remove(handler)
+        return True
+
+    def handlers_for(self, event: ChatEvent, data: Any) -> list[EventHandler]:
+        rooms = self._handlers.get(event, {})
+        room = room_of(data)
+        if room is None:
+            return [h for handlers in rooms.values() for h in handlers]
+        return rooms.get(room.casefold(), [])
+
+    def _on_done(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("event handler failed", exc_info=task.exception())
+
+    def dispatch(self, event: ChatEvent, data: Any):
+        loop = asyncio.get_running_loop()
+        for handler in list(self.handlers_for(event, data)):
+            task = asyncio.Task(handler(data), loop=loop, eager_start=True)
+            if task.done():
+                self._on_done(task)
+            else:
+                self._pending.add(task)
+                task.add_done_callback(self._on_done)
@@ -0,0 +1,167 @@
+"""Durable, append-only local spool of JSON records.
+
+Records are appended to ``<name>.spool`` without waiting on the disk; a
+background task flushes and fsyncs pending appends in batches. A consumer
+reads durable records in order and commits the offset it has fully handled to
+``<name>.spool.offset``, so unconsumed records survive restarts. Once
+everything is consumed the spool is truncated.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# fsync pending appends at most this often (seconds).
+SYNC_INTERVAL = 0.25
+
+
+class Spool:
+    def __init__(self, path: Path, sync_interval: float = SYNC_INTERVAL):
+        self.path = Path(path)
+        self.offset_path = self.path.with_name(self.path.name + ".offset")
+        self.sync_interval = sync_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.committed = self._read_offset()
+        self._recover()
+        self._file = self.path.open("ab")
+        self.written = self._file.tell()
+        self.synced = self.written
+        # (end offset, append time) of every record not yet committed
+        self._pending: deque[tuple[int, float]] = deque(self._scan_pending())
+        self._dirty = asyncio.Event()
+        self._durable = asyncio.Event()
+        self._sync_task: asyncio.Task | None = None
+
+    def _read_offset(self) -> int:
+        try:
+            return int(self.offset_path.read_text().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_offset(self, offset: int):
+        tmp = self.offset_path.with_suffix(".tmp")
+        tmp.write_text(str(offset))
+        os.replace(tmp, self.offset_path)
+
+    def _recover(self):
+        """Drop a torn final record left by a crash mid-append."""
+        if not self.path.exists():
+            return
+        size = self.path.stat().st_size
+        if self.committed > size:
+            self.committed = 0
+            self._write_offset(0)
+        if size == 0:
+            return
+        with self.path.open("rb+") as f:
+            f.seek(max(self.committed, size - 1))
+            if f.read(1) == b"\n":
+                return
+            f.seek(self.committed)
+            data = f.read()
+            end = self.committed + data.rfind(b"\n") + 1
+            logger.warning(f"Truncating torn record at {end} in {self.path}")
+            f.truncate(end)
+        if self.committed > end:
+            self.committed = end
+            self._write_offset(end)
+
+    def _scan_pending(self):
+        with self.path.open("rb") as f:
+            f.seek(self.committed)
+            for line in f:
+                yield f.tell(), json.loads(line).get("t", 0.0)
+
+    @property
+    def depth(self) -> int:
+        """Records appended but not yet committed by the consumer."""
+        return len(self._pending)
+
+    @property
+    def lag(self) -> float:
+        """Seconds since the oldest uncommitted record was appended."""
+        return time.time() - self._pending[0][1] if self._pending else 0.0
+
+    def start(self):
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    def append(self, record: dict[str, Any]):
+        now = time.time()
+        line = json.dumps({"t": now, **record}, separators=(",", ":")).encode() + b"\n"
+        self._file.write(line)
+        self.written += len(line)
+        self._pending.append((self.written, now))
+        self._dirty.set()
+
+    async def sync(self):
+        """Flush and fsync everything appended so far."""
+        target = self.written
+        if self.synced >= target:
+            return
+        self._file.flush()
+        await asyncio.to_thread(os.fsync, self._file.fileno())
+        self.synced = max(self.synced, target)
+        self._durable.set()
+
+    async def _sync_loop(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            try:
+                await self.sync()
+            except OSError as e:
+                logger.error(f"Failed to sync {self.path}: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def wait_durable(self, timeout: float | None = None) -> bool:
+        """Wait until there are durable records past the committed offset."""
+        if self.synced > self.committed:
+            return True
+        self._durable.clear()
+        try:
+            await asyncio.wait_for(self._durable.wait(), timeout)
+        except TimeoutError:
+            return False
+        return self.synced > self.committed
+
+    def read(self, limit: int) -> list[tuple[int, dict[str, Any]]]:
+        """Up to ``limit`` durable, uncommitted records with their end offsets."""
+        records = []
+        with self.path.open("rb") as f:
+            f.seek(self.committed)
+            while len(records) < limit and f.tell() < self.synced:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                records.append((f.tell(), json.loads(line)))
+        return records
+
+    def commit(self, offset: int):
+        """Mark every record ending at or before ``offset`` as consumed."""
+        while self._pending and self._pending[0][0] <= offset:
+            self._pending.popleft()
+        self.committed = offset
+        if not self._pending and self.committed == self.synced == self.written:
+            # Reset the offset before truncating: a crash in between replays
+            # records, which consumers must tolerate, rather than losing them.
+            self._write_offset(0)
+            self._file.truncate(0)
+            self._file.seek(0)
+            self.committed = self.written = self.synced = 0
+            return
+        self._write_offset(self.committed)
+
+    async def close(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        await self.sync()
+        self._file.close()
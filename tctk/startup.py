@@ -0,0 +1,86 @@
+"""Where ``tctk`` spends its startup time.
+
+``tctk --startup-profile [FEATURES ...]`` starts a fresh interpreter under
+``python -X importtime``, imports the CLI and FEATURES the way ``run`` does,
+loads the config and the logging configuration, and reports how long each
+phase took and which modules were slowest to import. Nothing connects.
+"""
+import json
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+# Run in the child interpreter; prints the phase timings as JSON on stdout.
+_PROFILE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from tctk.cli import feature_registry
+cli = time.perf_counter()
+for name in sys.argv[1:]:
+    feature_registry[name]
+features = time.perf_counter()
+from tctk.config import Config
+Config.get()
+Config.configure_logging()
+config = time.perf_counter()
+print(json.dumps({"import tctk.cli": cli - start, "import features": features - cli,
+                  "config and logging": config - features}))
+"""
+
+
+@dataclass
+class ImportTime:
+    module: str
+    # microseconds, as reported by -X importtime
+    self_us: int
+    cumulative_us: int
+    # 0 for modules imported directly, 1 for their imports, ...
+    depth: int
+
+
+@dataclass
+class StartupProfile:
+    features: list[str]
+    # seconds from starting the interpreter to the end of the script
+    total: float
+    # phase -> seconds
+    phases: dict[str, float]
+    imports: list[ImportTime]
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """The module lines of ``-X importtime`` output, in the order they finished importing."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        self_us, cumulative_us, name = fields
+        # one space after the bar, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def profile(features: list[str]) -> StartupProfile:
+    start = time.perf_counter()
+    child = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROFILE_SCRIPT, *features],
+                           capture_output=True, text=True)
+    total = time.perf_counter() - start
+    if child.returncode != 0:
+        raise RuntimeError(f"profiled startup failed:\n{child.stderr[-2000:]}")
+    phases = json.loads(child.stdout.strip().splitlines()[-1])
+    return StartupProfile(features, total, phases, parse_importtime(child.stderr))
+
+
+def format_profile(p: StartupProfile, top: int = 15) -> str:
+    lines = [f"startup with {', '.join(p.features) or 'no features'}: {p.total * 1000:.0f}ms "
+             f"(interpreter included)"]
+    lines += [f"  {phase:<20} {seconds * 1000:8.0f}ms" for phase, seconds in p.phases.items()]
+    lines.append("slowest imports (self / cumulative, ms):")
+    for it in sorted(p.imports, key=lambda it: it.self_us, reverse=True)[:top]:
+        lines.append(f"  {it.self_us / 1000:8.1f} {it.cumulative_us / 1000:8.1f}  {it.module}")
+    return "\n".join(lines)
@@ -0,0 +1,6 @@
+"""Local stand-ins for Twitch, for load tests that exercise the real Chat
+connection path without the network.
+
+``fake_twitch`` serves chat (IRC over a WebSocket) and the few helix/oauth
+endpoints twitchAPI needs to log in; ``load`` drives audience traffic into it.
+"""
@@ -0,0 +1,269 @@
+"""A local Twitch chat endpoint.
+
+FakeTwitch speaks enough of Twitch's IRC-over-WebSocket for twitchAPI's Chat
+to connect, log in (any token is accepted), join channels and send
+messages. It reports each joined channel's slow mode in ROOMSTATE and
+enforces slow mode and the account rate limit on the bot's PRIVMSGs the way
+Twitch does: a rejected message is dropped and answered with a NOTICE
+(``msg_slowmode`` / ``msg_ratelimit``). It also serves ``oauth2/validate`` and
+``helix/users`` so a Twitch instance pointed at it can authenticate.
+
+The server runs on its own thread and event loop, because Chat.start()
+blocks the calling thread until the connection is up. Audience messages are
+injected with ``say``, from any thread.
+
+    with FakeTwitch() as server:
+        twitch, chat = await server.connect("mybot")
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from aiohttp import WSMsgType, web
+from twitchAPI.chat import Chat
+from twitchAPI.twitch import Twitch
+from twitchAPI.type import AuthScope
+
+from tctk.outbound import MOD_RATE, RATE_PERIOD, USER_RATE
+
+CAPABILITIES = "twitch.tv/membership twitch.tv/tags twitch.tv/commands"
+SCOPES = [AuthScope.CHAT_READ, AuthScope.CHAT_EDIT]
+
+
+@dataclass
+class Received:
+    """A PRIVMSG from a connected client."""
+    at: float
+    nick: str
+    channel: str
+    text: str
+    accepted: bool
+
+
+@dataclass
+class Room:
+    name: str
+    slow: int = 0
+    # nicks of the accounts that are moderators here
+    mods: set[str] = field(default_factory=set)
+    # nick -> time of its last accepted message
+    last_sent: dict[str, float] = field(default_factory=dict)
+
+
+class Client:
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws = ws
+        self.nick: str | None = None
+        self.channels: set[str] = set()
+        # times of accepted messages within the rate window
+        self.sent: deque[float] = deque()
+
+
+class FakeTwitch:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.rooms: dict[str, Room] = {}
+        self.received: list[Received] = []
+        self._clients: list[Client] = []
+        self._ids = itertools.count(1)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._runner: web.AppRunner | None = None
+        self._thread: threading.Thread | None = None
+        self._started = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def chat_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/chat"
+
+    def room(self, channel: str) -> Room:
+        channel = channel.lstrip("#").lower()
+        if channel not in self.rooms:
+            self.rooms[channel] = Room(channel)
+        return self.rooms[channel]
+
+    # lifecycle
+
+    def start(self) -> FakeTwitch:
+        self._thread = threading.Thread(target=self._serve, name="fake-twitch", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def __enter__(self) -> FakeTwitch:
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get("/chat", self._chat)
+        app.router.add_get("/oauth2/validate", self._validate)
+        app.router.add_get("/helix/users", self._users)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    async def connect(self, username: str, scopes: list[AuthScope] = SCOPES) -> tuple[Twitch, Chat]:
+        """A logged-in Twitch and an awaited (not yet started) Chat for ``username``."""
+        twitch = await Twitch("fake-app", authenticate_app=False,
+                              base_url=f"{self.url}/helix/", auth_base_url=f"{self.url}/oauth2/")
+        twitch.auto_refresh_auth = False
+        # the token names the user; _users and _validate read it back
+        await twitch.set_user_authentication(username, scopes, validate=False)
+        chat = await Chat(twitch, connection_url=self.chat_url)
+        return twitch, chat
+
+    # audience
+
+    def say(self, channel: str, nick: str, text: str, tags: dict[str, str] | None = None):
+        """Deliver a message from ``nick`` to every client in ``channel``. Thread-safe."""
+        channel = channel.lstrip("#").lower()
+        self._loop.call_soon_threadsafe(self._broadcast, channel, self._privmsg_line(channel, nick, text, tags))
+
+    def set_slow(self, channel: str, seconds: int):
+        """Change a channel's slow mode and announce it. Thread-safe."""
+        room = self.room(channel)
+
+        def apply():
+            room.slow = seconds
+            self._broadcast(room.name, self._roomstate(room))
+        self._loop.call_soon_threadsafe(apply)
+
+    def accepted(self, nick: str | None = None) -> list[Received]:
+        return [r for r in self.received if r.accepted and (nick is None or r.nick == nick)]
+
+    def rejected(self, nick: str | None = None) -> list[Received]:
+        return [r for r in self.received if not r.accepted and (nick is None or r.nick == nick)]
+
+    def _broadcast(self, channel: str, line: str):
+        for client in self._clients:
+            if channel in client.channels:
+                asyncio.ensure_future(client.ws.send_str(line))
+
+    # HTTP
+
+    @staticmethod
+    def _token(request: web.Request) -> str:
+        return request.headers.get("Authorization", "").split()[-1]
+
+    async def _validate(self, request: web.Request) -> web.Response:
+        login = self._token(request)
+        return web.json_response({"client_id": "fake-app", "login": login, "user_id": login,
+                                  "scopes": [s.value for s in SCOPES], "expires_in": 3600})
+
+    async def _users(self, request: web.Request) -> web.Response:
+        login = self._token(request)
+        return web.json_response({"data": [{
+            "id": login, "login": login, "display_name": login, "type": "", "broadcaster_type": "",
+            "description": "", "profile_image_url": "", "offline_image_url": "", "view_count": 0,
+            "created_at": "2020-01-01T00:00:00Z",
+        }]})
+
+    # IRC
+
+    async def _chat(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        client = Client(ws)
+        self._clients.append(client)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+                for line in msg.data.split("\r\n"):
+                    if line:
+                        await self._handle(client, line)
+        finally:
+            self._clients.remove(client)
+        return ws
+
+    async def _handle(self, client: Client, line: str):
+        command, _, rest = line.partition(" ")
+        send = client.ws.send_str
+        if command == "CAP":
+            await send(f":tmi.twitch.tv CAP * ACK :{CAPABILITIES}")
+        elif command == "NICK":
+            client.nick = rest.strip().lower()
+            await send(f":tmi.twitch.tv 001 {client.nick} :Welcome, GLHF!")
+        elif command == "PING":
+            await send(f":tmi.twitch.tv PONG tmi.twitch.tv {rest}")
+        elif command == "JOIN":
+            for channel in rest.split(","):
+                room = self.room(channel)
+                client.channels.add(room.name)
+                nick = client.nick
+                mod = "1" if nick in room.mods else "0"
+                await send(f":{nick}!{nick}@{nick}.tmi.twitch.tv JOIN #{room.name}")
+                await send(f"@{_tags({'badge-info': '', 'badges': '', 'mod': mod, 'subscriber': '0'})} "
+                           f":tmi.twitch.tv USERSTATE #{room.name}")
+                await send(self._roomstate(room))
+        elif command == "PART":
+            for channel in rest.split(","):
+                client.channels.discard(channel.lstrip("#").lower())
+                await send(f":{client.nick}!{client.nick}@{client.nick}.tmi.twitch.tv PART {channel}")
+        elif command == "PRIVMSG":
+            target, _, text = rest.partition(" :")
+            await self._privmsg(client, self.room(target), text)
+
+    async def _privmsg(self, client: Client, room: Room, text: str):
+        now = time.monotonic()
+        nick = client.nick
+        mod = nick in room.mods
+        while client.sent and client.sent[0] <= now - RATE_PERIOD:
+            client.sent.popleft()
+        reason = None
+        if len(client.sent) >= (MOD_RATE if mod else USER_RATE):
+            reason = ("msg_ratelimit", "Your message was not sent because you are sending messages too quickly.")
+        elif not mod and room.slow and now - room.last_sent.get(nick, float("-inf")) < room.slow:
+            reason = ("msg_slowmode", f"This room is in slow mode and you are sending messages more quickly "
+                                      f"than {room.slow} seconds.")
+        self.received.append(Received(now, nick, room.name, text, reason is None))
+        if reason is not None:
+            await client.ws.send_str(f"@msg-id={reason[0]} :tmi.twitch.tv NOTICE #{room.name} :{reason[1]}")
+            return
+        client.sent.append(now)
+        room.last_sent[nick] = now
+        # Twitch does not echo a client's own messages back to it
+        line = self._privmsg_line(room.name, nick, text, {"mod": "1" if mod else "0"})
+        for other in self._clients:
+            if other is not client and room.name in other.channels:
+                await other.ws.send_str(line)
+
+    def _privmsg_line(self, channel: str, nick: str, text: str, tags: dict[str, str] | None = None) -> str:
+        tags = {"display-name": nick, "id": str(next(self._ids)),
+                "tmi-sent-ts": str(int(time.time() * 1000)), "mod": "0", "subscriber": "0",
+                **(tags or {})}
+        return f"@{_tags(tags)} :{nick}!{nick}@{nick}.tmi.twitch.tv PRIVMSG #{channel} :{text}"
+
+    @staticmethod
+    def _roomstate(room: Room) -> str:
+        tags = {"emote-only": "0", "followers-only": "-1", "r9k": "0", "room-id": str(abs(hash(room.name)) % 10**8),
+                "slow": str(room.slow), "subs-only": "0"}
+        return f"@{_tags(tags)} :tmi.twitch.tv ROOMSTATE #{room.name}"
+
+
+def _tags(tags: dict[str, str]) -> str:
+    return ";".join(f"{k}={v}" for k, v in tags.items())
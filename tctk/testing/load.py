@@ -0,0 +1,100 @@
+"""Synthetic audience traffic for a FakeTwitch channel.
+
+An Audience injects messages from a pool of viewers at a controlled rate:
+steady chatter, raid bursts, and raffle "!join" storms opened by the raffle
+authority. Messages the bot is expected to answer (raffle opens, duel
+offers) are kept as Stimulus records, so the bot's response latency can be
+read off the server's received messages.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from tctk.config import Config
+from tctk.features.se.duel.duel import DuelOffer
+from tctk.testing.fake_twitch import FakeTwitch, Received
+
+CHATTER = [
+    "hello chat", "LUL", "what did I miss", "PogChamp PogChamp", "gg", "KEKW that was close",
+    "anyone know the song?", "!points", "first time here", "monkaS", "Kappa", "lets go",
+]
+RAID_MESSAGE = "raidHype raidHype raidHype"
+
+
+@dataclass
+class Stimulus:
+    at: float
+    # prefix of the bot's expected reply, e.g. "!join"
+    reply: str
+
+
+@dataclass
+class Audience:
+    server: FakeTwitch
+    channel: str
+    users: int = 500
+    seed: int = 0
+    sent: int = 0
+    stimuli: list[Stimulus] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    def viewer(self) -> str:
+        return f"viewer{self.rng.randrange(self.users)}"
+
+    async def paced(self, messages: Iterable[tuple[str, str]], rate: float) -> int:
+        """Say each (nick, text) at ``rate`` messages per second. Returns how many were said."""
+        start = time.monotonic()
+        count = 0
+        for i, (nick, text) in enumerate(messages):
+            delay = start + i / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.server.say(self.channel, nick, text)
+            count += 1
+        self.sent += count
+        return count
+
+    async def chatter(self, rate: float, duration: float) -> int:
+        """Steady chat from random viewers."""
+        total = int(rate * duration)
+        return await self.paced(((self.viewer(), self.rng.choice(CHATTER)) for _ in range(total)), rate)
+
+    async def raid(self, raiders: int, over: float = 3.0) -> int:
+        """``raiders`` new viewers each post once within ``over`` seconds."""
+        return await self.paced(((f"raider{i}", RAID_MESSAGE) for i in range(raiders)), raiders / over)
+
+    async def join_storm(self, joiners: int = 1000, over: float = 10.0, amount: int = 500,
+                         duration: int = 60) -> int:
+        """Open a raffle as the raffle authority, then have ``joiners`` viewers type !join."""
+        self.stimuli.append(Stimulus(time.monotonic(), "!join"))
+        self.server.say(self.channel, Config.get().raffle_authority_user,
+                        f"PogChamp a Multi-Raffle has begun for {amount} EastCoin PogChamp "
+                        f"it will end in {duration} Seconds.")
+        self.sent += 1
+        return 1 + await self.paced(((f"joiner{i}", "!join") for i in range(joiners)), joiners / over)
+
+    def offer_duel(self, offeree: str, amount: int):
+        """Have a viewer challenge ``offeree``; the duel authority announces the offer."""
+        offer = DuelOffer(offeree=offeree, offerer=self.viewer(), amount=amount)
+        self.stimuli.append(Stimulus(time.monotonic(), "!"))
+        self.server.say(self.channel, Config.get().duel_authority_user, offer.proposal_message)
+        self.sent += 1
+
+
+def response_latencies(stimuli: list[Stimulus], replies: list[Received]) -> list[float | None]:
+    """Seconds from each stimulus to the first later reply starting with its prefix; None if unanswered."""
+    latencies = []
+    used: set[int] = set()
+    for stimulus in stimuli:
+        for i, reply in enumerate(replies):
+            if i not in used and reply.at >= stimulus.at and reply.text.startswith(stimulus.reply):
+                used.add(i)
+                latencies.append(reply.at - stimulus.at)
+                break
+        else:
+            latencies.append(None)
+    return latencies
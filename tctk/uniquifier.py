@@ -0,0 +1,77 @@
+"""Suffixes that keep chat messages from being rejected as duplicates.
+
+Twitch drops a message identical to one the account sent to the same channel
+in the last 30 seconds. A Uniquifier remembers what was sent to its channel
+and changes a message only when it would repeat one of those, appending the
+shortest emoji suffix that makes it new.
+
+Suffixes come from POOL: single code point emoji (no ZWJ sequences, skin
+tones or variation selectors) from Emoji 12 or earlier, so each renders in
+Twitch's chat font and counts as one character.
+"""
+import random
+import time
+from collections import deque
+from itertools import count, product
+
+# Seconds during which Twitch rejects a repeated message.
+DUPLICATE_WINDOW = 30.0
+# Sent messages remembered per channel; a moderator account can send at most 100 per 30s.
+RECENT = 100
+
+# A str is a compact array of code points; indexing it is as cheap as any array.
+POOL = ("😀😁😂😃😄😅😆😉😊😋😎😍😘🙂🤗🤔😐😑😶🙄😏😴😌😛😜😝🤤😒😓😔😕🙃🤑😲🙁😖😞😟😤😢😭😦😧😨😩🤯😬😰😱"
+        "🥳🥺🤠🤡🤥🤫🤭🧐🤓😈👻👽🤖🎃😺🙈🙉🙊💯💥💫💦💨🐵🐶🐱🦊🐻🐼🐸🐧🐢🐍🐙🦀🐝🦋🌵🌻🍀🍄🍉🍌🍍🍎🍒"
+        "🍓🍕🍔🍟🌮🍩🍪🎂🍿🚀🌈🌙🌟🔥🎉🎈🎁🏆🎮🎲🎯🎸🎺🔔💎🔑🧲🧸🐳🐬🦄🐲🌊🍇🍋🥑🥨🧀🍦🍭🥤🎨🎧🎤🎬📚💡🔮"
+        "🧩🪁⚡🛸🌍🗿🍺🍻🥂🧁")
+
+
+class Uniquifier:
+    """Recent messages of one channel, and the suffixes that avoid repeating them."""
+
+    def __init__(self, window: float = DUPLICATE_WINDOW, size: int = RECENT, rng: random.Random | None = None):
+        self.window = window
+        self.size = size
+        self.rng = rng or random.Random()
+        # (time sent, text), oldest first
+        self._ring: deque[tuple[float, str]] = deque()
+        # text -> when it was last sent
+        self._last: dict[str, float] = {}
+
+    def _expire(self, now: float):
+        ring = self._ring
+        while ring and (ring[0][0] <= now - self.window or len(ring) > self.size):
+            at, text = ring.popleft()
+            if self._last.get(text) == at:
+                del self._last[text]
+
+    def is_recent(self, text: str, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        return text.strip() in self._last
+
+    def sent(self, text: str, now: float | None = None):
+        """Remember that ``text`` was sent."""
+        now = time.monotonic() if now is None else now
+        text = text.strip()
+        self._ring.append((now, text))
+        self._last[text] = now
+        self._expire(now)
+
+    def __call__(self, text: str, now: float | None = None) -> str:
+        """``text``, or ``text`` plus the fewest emoji that make it differ from every recent message."""
+        if not self.is_recent(text, now):
+            return text
+        text = text.strip()
+        n = len(POOL)
+        start = self.rng.randrange(n)
+        for i in range(n):
+            candidate = f"{text} {POOL[(start + i) % n]}"
+            if candidate not in self._last:
+                return candidate
+        # only reachable when size >= len(POOL)
+        for length in count(2):
+            for emoji in product(POOL, repeat=length):
+                candidate = f"{text} {''.join(emoji)}"
+                if candidate not in self._last:
+                    return candidate
@@ -0,0 +1,104 @@
+"""Aho-Corasick matching of banned words over leetspeak-folded text.
+
+Both the word list and incoming text go through ``fold``: casefold, map common
+digit/symbol substitutions to letters and collapse runs of the same letter, so
+``d0dge``, ``DODGE`` and ``dooodge`` all scan as ``dodge``. One linear pass over
+the folded text finds every listed word, however long the list grows.
+"""
+import re
+from collections import deque
+from typing import Iterable
+
+# Character-fold table applied after casefolding.
+LEET_FOLD = str.maketrans({
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "5": "s",
+    "7": "t",
+    "8": "b",
+    "9": "g",
+    "@": "a",
+    "$": "s",
+    "!": "i",
+    "|": "l",
+})
+
+
+_REPEATS_RE = re.compile(r"(.)\1+")
+
+
+def fold(text: str) -> str:
+    return _REPEATS_RE.sub(r"\1", text.casefold().translate(LEET_FOLD))
+
+
+class WordMatcher:
+    """Aho-Corasick automaton built once from a word list."""
+
+    def __init__(self, words: Iterable[str]):
+        self.words: tuple[str, ...] = tuple(words)
+        # the object the matcher was last requested for; see matcher_for
+        self.source: object = None
+        # goto[state] maps a character to the next state
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # index of the (folded) word that ends at a state, following fail links
+        self._out: list[int] = [-1]
+        self._build([fold(w) for w in self.words])
+
+    def _build(self, patterns: list[str]):
+        goto, out = self._goto, self._out
+        for i, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for c in pattern:
+                nxt = goto[state].get(c)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][c] = nxt
+                    goto.append({})
+                    self._fail.append(0)
+                    out.append(-1)
+                state = nxt
+            if out[state] == -1:
+                out[state] = i
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and c not in goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = goto[f].get(c, 0)
+                if out[nxt] == -1:
+                    out[nxt] = out[self._fail[nxt]]
+
+    def search(self, text: str) -> str | None:
+        """Return the first listed word found in ``text``, or None."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for c in fold(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if out[state] != -1:
+                return self.words[out[state]]
+        return None
+
+
+_cached: WordMatcher | None = None
+
+
+def matcher_for(words: Iterable[str]) -> WordMatcher:
+    """The matcher for ``words``, rebuilt only when the list changes."""
+    global _cached
+    if _cached is None or _cached.source is not words:
+        key = tuple(words or ())
+        if _cached is None or _cached.words != key:
+            _cached = WordMatcher(key)
+        _cached.source = words
+    return _cached
@@ -1,14 +1,57 @@
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 import yaml
 import asyncio
+from twitchAPI.chat import ChatMessage
+
 from tctk.bot import ChatBot
-from tctk.duel import DuelOffer
+from tctk.config import App, Config
+from tctk.features.se.duel.duel import DuelOffer
+from tctk.features.se.raffle.raffle_feature import RaffleState
 
 duel_bot_user = "are_mod"
 
 
+@pytest.fixture
+def conf(monkeypatch):
+    """A minimal Config installed as the current one: StreamElements is both authorities, Owner the config user."""
+    conf = Config(app=App("id", "secret"), scopes=(), rdbms_connection_string="", auto_timeout_words=(),
+                  raffle_authority_user="StreamElements", duel_authority_user="StreamElements", channel="chan",
+                  max_duel_amt=100, min_max_duel_amt_if_percent=0, bot_access_tokens_file="",
+                  bot_config_user="Owner")
+    monkeypatch.setattr(Config, "conf", conf)
+    return conf
+
+
+def _chat_message(nick, text="hi", ts=0, user_id=None, me="mybot"):
+    tags = {"tmi-sent-ts": str(ts), "id": "0"}
+    if user_id is not None:
+        tags["user-id"] = user_id
+    return ChatMessage(SimpleNamespace(room_cache={}, username=me), {
+        "tags": tags, "parameters": text,
+        "command": {"command": "PRIVMSG", "channel": "#chan"},
+        "source": {"nick": nick},
+    })
+
+
+@pytest.fixture
+def chat_message():
+    """Builds a ChatMessage by ``nick`` in #chan, as seen by the bot ``me``."""
+    return _chat_message
+
+
+@pytest.fixture
+def raffle(monkeypatch):
+    """Fresh per-channel raffle state, and the announcements opening a raffle and closing it won by bob."""
+    monkeypatch.setattr(RaffleState, "channels", {})
+    return SimpleNamespace(
+        open="PogChamp a Multi-Raffle has begun for 500 EastCoin PogChamp it will end in 60 Seconds",
+        close="The Multi-Raffle has ended and bob won 500 EastCoin each FeelsGoodMan",
+    )
+
+
 @pytest.fixture
 async def bot():
     """Create a ChatBot from tests/test_config.yaml."""
@@ -1,6 +1,6 @@
 import pytest
 
-from tctk.config import ALPHA_FORMAT_CODEPOINTS, AlphaFormat, FontVariant
+from tctk.alpha_format import ALPHA_FORMAT_CODEPOINTS, AlphaFormat, AlphaFormatter, FontVariant
 
 
 def test_alpha_format_rejects_unsupported_styles():
@@ -28,3 +28,19 @@ def test_alpha_format_codepoint_maps_include_special_unicode_fallbacks():
     assert ALPHA_FORMAT_CODEPOINTS[AlphaFormat(FontVariant.Fraktur)]["C"] == 0x212D
     assert ALPHA_FORMAT_CODEPOINTS[AlphaFormat(FontVariant.DoubleStruck)]["C"] == 0x2102
     assert ALPHA_FORMAT_CODEPOINTS[AlphaFormat(FontVariant.SansSerif, bold=True, italic=True)]["z"] == 0x1D66F
+
+
+def test_formatter_translates_letters_and_digits():
+    fmt = FontVariant.SansSerif.formatter(bold=True)
+    assert fmt("Ab 09!") == "\U0001D5D4\U0001D5EF \U0001D7EC\U0001D7F5!"
+    assert FontVariant.DoubleStruck.formatter()("1") == "\U0001D7D9"
+    # no italic digits in Unicode: upright of the same weight
+    assert FontVariant.SansSerif.formatter(italic=True)("1") == FontVariant.SansSerif.formatter()("1")
+    # no plain script digits: unchanged
+    assert FontVariant.Script.formatter()("2024") == "2024"
+
+
+def test_formatters_are_interned_per_format():
+    assert FontVariant.Monospace.formatter() is FontVariant.Monospace.formatter()
+    assert AlphaFormatter(AlphaFormat(FontVariant.Monospace)) is FontVariant.Monospace.formatter()
+    assert FontVariant.SansSerif.formatter() is not FontVariant.SansSerif.formatter(bold=True)
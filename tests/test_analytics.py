@@ -0,0 +1,41 @@
+from datetime import date
+
+from tctk import analytics
+from tctk.features.se.store import Duel, UserRaffle
+
+DAY_MS = 86_400_000
+JAN1 = analytics._epoch_ms(date(2024, 1, 1))
+
+
+def test_raffle_user_stats_window(tmp_path):
+    UserRaffle.save_all([
+        UserRaffle("Alice", JAN1, True, JAN1 + 1),
+        UserRaffle("alice", JAN1 + DAY_MS, False, JAN1 + DAY_MS + 1),
+        UserRaffle("bob", JAN1 + DAY_MS, False, JAN1 + DAY_MS + 2),
+    ])
+    UserRaffle.flush(tmp_path)
+
+    stats = analytics.collect(analytics.raffle_user_stats(UserRaffle.scan(tmp_path)))
+    assert stats.rows() == [("alice", 2, 1, 0.5), ("bob", 1, 0, 0.0)]
+
+    window = analytics.TimeRange(since=date(2024, 1, 2))
+    stats = analytics.collect(analytics.raffle_user_stats(UserRaffle.scan(tmp_path), window, ["ALICE"]))
+    assert stats.rows() == [("alice", 1, 0, 0.0)]
+
+
+def test_duel_user_stats_and_activity(tmp_path):
+    Duel.save_all([
+        Duel("alice", "bob", JAN1, 100, True),
+        Duel("bob", "alice", JAN1 + 3600_000, 30, True),
+    ])
+    Duel.flush(tmp_path)
+
+    stats = analytics.collect(analytics.duel_user_stats(Duel.scan(tmp_path)))
+    assert stats.rows() == [("alice", 2, 1, 1, 70), ("bob", 2, 1, 1, -70)]
+
+    hourly = analytics.collect(analytics.duel_activity("1h", root=tmp_path))
+    assert hourly["events"].to_list() == [1, 1]
+
+
+def test_empty_store(tmp_path):
+    assert analytics.collect(analytics.raffle_activity(root=tmp_path)).height == 0
@@ -0,0 +1,39 @@
+import pytest
+
+from tctk.bench import suite
+from tctk.bench.suite import Result
+
+
+@pytest.fixture(scope="module")
+def benches():
+    with suite.bench_state():
+        yield {b.name: b for b in suite.benches()}
+
+
+@pytest.mark.parametrize("name", [b.name for b in suite.benches()])
+def test_benchmark_runs(benches, name):
+    with suite.bench_state():
+        benches[name].fn()
+
+
+def test_inputs_exercise_the_intended_paths(benches):
+    with suite.bench_state():
+        assert len(benches["extract_winners[500]"].fn()) == 500
+        assert benches["DuelOffer.from_proposal[proposal]"].fn()
+        assert not benches["DuelOffer.from_proposal[near_miss]"].fn()
+        assert benches["join_predicate[join]"].fn()
+        assert not benches["join_predicate[joinx]"].fn()
+
+
+def test_save_load_compare(tmp_path):
+    current = {"a": Result(120, 110, 10, 5), "b": Result(100, 90, 10, 5), "new": Result(5, 5, 10, 5)}
+    baseline = {"a": Result(100, 95, 10, 5), "b": Result(95, 90, 10, 5)}
+    path = suite.save(baseline, tmp_path / "base.json")
+    assert suite.load(path) == baseline
+    assert suite.compare(current, suite.load(path)) == [("a", 1.2)]
+
+
+def test_run_selects_by_pattern():
+    results = suite.run(["Uniquifier[fresh]"], min_time=0.001, repeat=1)
+    assert list(results) == ["Uniquifier[fresh]"]
+    assert results["Uniquifier[fresh]"].median_ns > 0
@@ -0,0 +1,87 @@
+import dataclasses
+
+import pytest
+import yaml
+
+from tctk import config as config_module
+from tctk.config import Config, ConfigWatcher, MaxDuel
+
+BASE = {
+    "app": {"id": "id", "secret": "secret"},
+    "scopes": ["chat:read", "chat:edit"],
+    "rdbms_connection_string": "postgres://localhost/db",
+    "auto_timeout_words": ["dodge"],
+    "raffle_authority_user": "StreamElements",
+    "duel_authority_user": "StreamElements",
+    "channel": "chan",
+    "max_duel_amt": "10%",
+    "min_max_duel_amt_if_percent": 50,
+    "bot_access_tokens_file": "tokens.json",
+    "bot_config_user": "Owner",
+}
+
+
+@pytest.fixture
+def conf_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump(BASE))
+    monkeypatch.setattr(config_module, "conf_path", lambda: path)
+    monkeypatch.setattr(Config, "conf", None)
+    monkeypatch.setattr(Config, "_file_stat", None)
+    monkeypatch.setattr(Config, "_listeners", [])
+    return path
+
+
+def test_snapshots_are_immutable(conf_file):
+    conf = Config.get()
+    assert Config.get() is conf
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        conf.channel = "other"
+    assert conf.scopes == tuple(conf.scopes)
+
+
+def test_derived_values_survive_unrelated_changes(conf_file):
+    before = Config.get()
+    matcher, max_duel = before.timeout_matcher, before.max_duel
+    assert before.duel_authority == "streamelements" and before.config_user == "owner"
+
+    after = Config.replace(channel="elsewhere")
+    assert after is not before and before.channel == "chan"
+    assert after.timeout_matcher is matcher and after.max_duel is max_duel
+
+    changed = Config.replace(auto_timeout_words=("spongebob",), max_duel_amt=200)
+    assert changed.timeout_matcher is not matcher
+    assert changed.timeout_matcher.search("SPONGEBOB") is not None
+    assert changed.max_duel.resolve(None) == 200
+
+
+def test_max_duel():
+    assert MaxDuel.parse("10%", floor=50).resolve(1000) == 100
+    assert MaxDuel.parse("10%", floor=50).resolve(100) == 50
+    assert MaxDuel.parse("10%").resolve(None) is None
+    assert MaxDuel.parse(300).resolve(None) == 300
+
+
+def test_persist_replaces_the_file_and_is_not_reloaded(conf_file):
+    Config.get()
+    Config.persist_with(max_duel_amt=750)
+    assert yaml.safe_load(conf_file.read_text())["max_duel_amt"] == 750
+    assert list(conf_file.parent.iterdir()) == [conf_file]
+    assert not ConfigWatcher(interval=1).check()
+
+
+def test_watcher_reloads_external_edits(conf_file):
+    seen = []
+    Config.on_change(lambda old, new: seen.append(new.channel))
+    Config.get()
+    watcher = ConfigWatcher(interval=1)
+    assert not watcher.check()
+
+    conf_file.write_text(yaml.dump({**BASE, "channel": "edited", "scopes": ["chat:read"]}))
+    assert watcher.check()
+    assert Config.get().channel == "edited"
+    assert seen == ["chan", "edited"]
+
+    conf_file.write_text("app: [")
+    assert not watcher.check()
+    assert Config.get().channel == "edited"
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from twitchAPI.type import ChatEvent
+
+from tctk.testing.fake_twitch import FakeTwitch
+from tctk.testing.load import Audience, Stimulus, response_latencies
+
+
+@pytest.fixture
+def server():
+    with FakeTwitch() as server:
+        yield server
+
+
+async def connected(server, channel="chan", slow=0):
+    server.room(channel).slow = slow
+    twitch, chat = await server.connect("bot")
+    received = []
+
+    async def on_message(msg):
+        received.append((msg.user.name, msg.text))
+    notices = []
+
+    async def on_notice(notice):
+        notices.append(notice.msg_id)
+    chat.register_event(ChatEvent.MESSAGE, on_message)
+    chat.register_event(ChatEvent.NOTICE, on_notice)
+    chat.start()
+    assert await chat.join_room([channel]) == []
+    return twitch, chat, received, notices
+
+
+async def wait_for(predicate, timeout=2.0):
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_chat_connects_joins_and_exchanges_messages(server):
+    twitch, chat, received, _ = await connected(server)
+    try:
+        assert chat.username == "bot"
+        assert chat.room_cache["chan"].slow == 0
+        server.say("chan", "viewer", "hello bot")
+        await chat.send_message("chan", "hello viewer")
+        await wait_for(lambda: received and server.received)
+        assert received == [("viewer", "hello bot")]
+        assert [(r.nick, r.channel, r.text, r.accepted) for r in server.received] == [
+            ("bot", "chan", "hello viewer", True)]
+    finally:
+        chat.stop()
+        await twitch.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_mode_rejects_with_notice(server):
+    twitch, chat, _, notices = await connected(server, slow=30)
+    try:
+        assert chat.room_cache["chan"].slow == 30
+        await chat.send_message("chan", "first")
+        await chat.send_message("chan", "second")
+        await wait_for(lambda: notices)
+        assert notices == ["msg_slowmode"]
+        assert [r.text for r in server.accepted("bot")] == ["first"]
+        assert [r.text for r in server.rejected("bot")] == ["second"]
+    finally:
+        chat.stop()
+        await twitch.close()
+
+
+@pytest.mark.asyncio
+async def test_join_storm_reaches_bot(server):
+    twitch, chat, received, _ = await connected(server)
+    try:
+        audience = Audience(server, "chan")
+        assert await audience.join_storm(joiners=200, over=0.2) == 201
+        await wait_for(lambda: len(received) == 201)
+        assert sum(text == "!join" for _, text in received) == 200
+        assert audience.stimuli[0].reply == "!join"
+    finally:
+        chat.stop()
+        await twitch.close()
+
+
+def test_response_latencies():
+    class R:
+        def __init__(self, at, text):
+            self.at, self.text = at, text
+    stimuli = [Stimulus(1.0, "!join"), Stimulus(2.0, "!join"), Stimulus(5.0, "!")]
+    replies = [R(0.5, "!join"), R(1.25, "!join"), R(2.5, "!join"), R(4.0, "hi")]
+    assert response_latencies(stimuli, replies) == [0.25, 0.5, None]
@@ -0,0 +1,44 @@
+import dataclasses
+
+from tctk.config import Config
+from tctk.identity import Identities, identity_of
+
+
+def test_roles_and_per_message_caching(conf, chat_message):
+    author = identity_of(chat_message("StreamElements", user_id="1"))
+    assert author.key == "streamelements" and author.is_duel_authority and author.is_authority
+    assert identity_of(chat_message("owner", user_id="2")).is_config_user
+    assert identity_of(chat_message("mybot", user_id="3", me="MyBot")).is_self
+
+    msg = chat_message("viewer", user_id="4")
+    assert identity_of(msg) is identity_of(msg)
+    assert identity_of(chat_message("viewer", user_id="4")) is identity_of(msg)
+
+
+def test_renamed_user_keeps_identity_and_gets_new_roles(conf):
+    identities = Identities()
+    before = identities.get("42", "OldName")
+    assert not before.is_config_user
+    after = identities.get("42", "Owner")
+    assert after is before
+    assert after.name == "Owner" and after.key == "owner" and after.is_config_user
+
+
+def test_roles_follow_config_changes(conf, monkeypatch):
+    identities = Identities()
+    viewer = identities.get("7", "viewer")
+    assert not viewer.is_config_user
+    monkeypatch.setattr(Config, "conf", dataclasses.replace(conf, bot_config_user="Viewer"))
+    identities.invalidate()
+    assert identities.get("7", "viewer").is_config_user
+
+
+def test_least_recently_seen_are_forgotten(conf):
+    identities = Identities(maxsize=2)
+    first = identities.get("1", "a")
+    second = identities.get("2", "b")
+    identities.get("1", "a")
+    identities.get("3", "c")
+    assert len(identities) == 2
+    assert identities.get("1", "a") is first
+    assert identities.get("2", "b") is not second
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from tctk import BotFeature
+from tctk.isolation import ThreadSafeSender, isolate, offload
+
+
+class SlowFeature(BotFeature):
+    handler_timeout = 0.05
+
+    def __init__(self):
+        super().__init__()
+        self.cancelled = False
+
+    async def on_message(self, msg, sender):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+class FailingFeature(BotFeature):
+    async def on_message(self, msg, sender):
+        raise ValueError("boom")
+
+
+class BlockingFeature(BotFeature):
+    blocking = True
+
+    def __init__(self):
+        super().__init__()
+        self.thread = None
+        self.sender = None
+        self.sent = None
+
+    async def on_message(self, msg, sender):
+        time.sleep(0.01)
+        self.thread = threading.current_thread()
+        self.sender = sender
+        self.sent = await sender.send_message(f"got {msg}")
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_handler(caplog):
+    feature = SlowFeature()
+    guarded = isolate("slow", feature, feature.on_message)
+    await guarded("hi", MagicMock())
+    assert feature.cancelled
+    assert "slow.on_message timed out" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_exception_is_contained_and_logged(caplog):
+    feature = FailingFeature()
+    await isolate("failing", feature, feature.on_message)("hi", MagicMock())
+    assert "failing.on_message failed" in caplog.text
+    assert "boom" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_blocking_feature_runs_on_worker_and_sends_on_main_loop():
+    main_loop = asyncio.get_running_loop()
+    send_loops = []
+
+    class Sender:
+        async def send_message(self, text):
+            send_loops.append(asyncio.get_running_loop())
+            return True
+
+    feature = BlockingFeature()
+    await isolate("blocking", feature, feature.on_message)("hi", Sender())
+    assert feature.thread is not threading.main_thread()
+    assert isinstance(feature.sender, ThreadSafeSender)
+    assert feature.sent is True
+    assert send_loops == [main_loop]
+
+
+@pytest.mark.asyncio
+async def test_offload_runs_off_the_loop_thread():
+    assert await offload(threading.current_thread) is not threading.current_thread()
+
+
+@pytest.mark.asyncio
+async def test_failed_owner_future_reaches_the_worker():
+    class Sender:
+        async def submit(self, text):
+            fut = asyncio.get_running_loop().create_future()
+            fut.set_exception(ConnectionError("gone"))
+            return fut
+
+    class Submitting(BotFeature):
+        blocking = True
+        handler_timeout = 5
+        error = None
+
+        async def on_message(self, msg, sender):
+            try:
+                await (await sender.submit(msg))
+            except ConnectionError as e:
+                self.error = e
+
+    feature = Submitting()
+    start = time.monotonic()
+    await isolate("submitting", feature, feature.on_message)("hi", Sender())
+    assert isinstance(feature.error, ConnectionError)
+    assert time.monotonic() - start < 1
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+from tctk.features.se.raffle.join_burst import JoinStats
+from tctk.features.se.raffle.raffle_feature import RaffleFeature, RaffleState
+
+
+class Batches(RaffleFeature):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.closed = []
+
+    async def on_joins(self, batch, sender):
+        self.batches.append([data.message.user.name for data in batch])
+
+    async def on_close(self, data, sender):
+        self.closed.append(list(data.raffle.joiners))
+
+
+async def test_joins_are_applied_once_and_delivered_in_batches(conf, raffle, chat_message):
+    sender = SimpleNamespace(channel="chan")
+    subscriber, bystander = Batches(), RaffleFeature()
+    assert subscriber.wants_joins() and not bystander.wants_joins()
+
+    async def say(nick, text, ts):
+        msg = chat_message(nick, text, ts)
+        for feature in (subscriber, bystander):
+            await feature.on_message(msg, sender)
+
+    await say("StreamElements", raffle.open, 1000)
+    for ts, nick in enumerate(["alice", "bob", "Alice", "carol"], start=2000):
+        await say(nick, "!join", ts)
+    assert subscriber.batches == []
+
+    await asyncio.sleep(0.1)
+    assert subscriber.batches == [["alice", "bob", "carol"]]
+    burst = RaffleState.of("chan").burst
+    assert (burst.stats.joins, burst.stats.repeats, burst.stats.batches) == (3, 1, 1)
+
+    await say("dave", "!join", 3000)
+    await say("StreamElements", raffle.close, 70_000)
+    # the close delivers joins still buffered before on_close
+    assert subscriber.batches[-1] == ["dave"]
+    assert subscriber.closed == [["alice", "bob", "carol", "dave"]]
+    assert burst.stats.joins == 0
+
+
+def test_join_rate_and_peak():
+    stats = JoinStats()
+    for i in range(10):
+        stats.record(True, 100 + i * 0.05)
+    stats.record(False, 100.5)
+    assert stats.joins == 10 and stats.repeats == 1
+    assert stats.peak_rate == 10
+    assert stats.rate(now=101.2) == 5
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from tctk.features.se.ledger import CoinLedger, EntryKind
+
+
+@pytest.mark.asyncio
+async def test_balance_follows_readings_and_changes(tmp_path):
+    ledger = await CoinLedger.open(tmp_path / "chan.jsonl")
+    assert ledger.balance is None
+    # changes before the first reading are recorded but can't be applied
+    assert ledger.record(EntryKind.DUEL_WON, 50, "viewer") is None
+
+    assert ledger.reading(1000) is None
+    assert ledger.record(EntryKind.DUEL_LOST, 100, "viewer") == 900
+    assert ledger.record(EntryKind.RAFFLE_WON, 250) == 1150
+    assert ledger.record(EntryKind.GIVEN, 50, "friend") == 1100
+    assert ledger.record(EntryKind.RECEIVED, 10, "friend") == 1110
+    assert ledger.entries == 6
+    await ledger.close()
+
+
+@pytest.mark.asyncio
+async def test_drift_is_flagged_and_recorded(tmp_path):
+    ledger = await CoinLedger.open(tmp_path / "chan.jsonl")
+    ledger.reading(1000)
+    ledger.record(EntryKind.DUEL_WON, 100)
+    drift = ledger.reading(1050)
+    assert drift.expected == 1100 and drift.actual == 1050 and drift.amount == -50
+    assert list(ledger.drifts) == [drift] and ledger.balance == 1050
+    assert ledger.reading(1050) is None
+    await ledger.flush()
+    last = json.loads((tmp_path / "chan.jsonl").read_text().splitlines()[-2])
+    assert last["drift"] == -50
+    await ledger.close()
+
+
+@pytest.mark.asyncio
+async def test_entries_are_written_in_the_background(tmp_path):
+    path = tmp_path / "chan.jsonl"
+    ledger = await CoinLedger.open(path)
+    ledger.reading(1000)
+    assert ledger.record(EntryKind.DUEL_WON, 10) == 1010
+    # recording only queues the entries; the writer task appends them
+    assert path.read_bytes() == b""
+    await ledger.flush()
+    assert len(path.read_text().splitlines()) == 2
+    await ledger.close()
+
+
+@pytest.mark.asyncio
+async def test_reopening_restores_from_the_snapshot_and_later_entries(tmp_path):
+    path = tmp_path / "chan.jsonl"
+    ledger = await CoinLedger.open(path, snapshot_every=3)
+    ledger.reading(1000)
+    for _ in range(2):
+        ledger.record(EntryKind.DUEL_WON, 10)
+    await ledger.flush()
+    for _ in range(2):
+        ledger.record(EntryKind.DUEL_WON, 10)
+    await ledger.flush()
+    snapshot = json.loads(path.with_suffix(".snapshot.json").read_text())
+    assert snapshot["balance"] == 1020 and snapshot["entries"] == 3
+
+    reopened = await CoinLedger.open(path)
+    assert reopened.balance == 1040 and reopened.entries == 5
+    await reopened.close()
+
+    await ledger.close()
+    assert json.loads(path.with_suffix(".snapshot.json").read_text())["entries"] == 5
+
+
+@pytest.mark.asyncio
+async def test_a_torn_final_entry_is_dropped(tmp_path):
+    path = tmp_path / "chan.jsonl"
+    ledger = await CoinLedger.open(path)
+    ledger.reading(1000)
+    ledger.record(EntryKind.GIVEN, 100)
+    await ledger.flush()
+    with path.open("ab") as f:
+        f.write(b'{"t":1,"kind":"duel_won","amo')
+
+    reopened = await CoinLedger.open(path)
+    assert reopened.balance == 900 and reopened.entries == 2
+    assert reopened.record(EntryKind.RECEIVED, 5) == 905
+    await reopened.close()
+    assert (await CoinLedger.open(path)).balance == 905
+
+
+@pytest.mark.asyncio
+async def test_an_unreadable_entry_is_skipped(tmp_path):
+    path = tmp_path / "chan.jsonl"
+    path.write_bytes(b'{"t":1,"kind":"reading","amount":1000}\n'
+                     b'{"t":2,"kind":"duel_w\x00n","amount":50}\n'
+                     b'not json\n'
+                     b'{"t":4,"kind":"given","amount":100}\n')
+
+    ledger = await CoinLedger.open(path)
+    assert ledger.balance == 900 and ledger.entries == 2
+    await ledger.close()
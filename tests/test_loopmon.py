@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from tctk import loopmon
+from tctk.features.feature_manager import FeatureManagerFeature
+from tctk.features.message_bot import MessageBotFeature
+from tctk.isolation import isolate
+from tctk.loopmon import LoopMonitor
+
+
+class Tracker:
+    async def on_close(self, event, sender):
+        await asyncio.sleep(0)
+        write_rows()
+
+
+def write_rows():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_feature(caplog):
+    tracker = Tracker()
+    loopmon.register("raffle_tracker", tracker.on_close)
+    monitor = LoopMonitor(interval=0.01, threshold=0.05, report_interval=3600)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    await isolate("raffle_tracker", None, tracker.on_close)(None, None)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert stall.feature == "raffle_tracker"
+    assert stall.duration >= 0.2
+    assert "write_rows" in "".join(stall.stack)
+    assert "stalled" in caplog.text and "raffle_tracker" in caplog.text
+
+
+class Quiet(MessageBotFeature):
+    async def on_message(self, msg, sender):
+        pass
+
+
+class Stalling(MessageBotFeature):
+    async def on_message(self, msg, sender):
+        write_rows()
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_the_feature_instance():
+    # both features' MESSAGE callbacks share MessageBotFeature's code
+    stalling, quiet = Stalling(), Quiet()
+    manager = FeatureManagerFeature(feature_registry={}, active={})
+    manager.subscribe("stalling", stalling, None)
+    manager.subscribe("quiet", quiet, None)
+    monitor = LoopMonitor(interval=0.01, threshold=0.05, report_interval=3600)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    for name in ("stalling", "quiet"):
+        _, [(_, handler)] = manager.active[name]
+        await handler(None, None)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert [s.feature for s in monitor.stalls] == ["stalling"]
+
+
+@pytest.mark.asyncio
+async def test_percentiles():
+    monitor = LoopMonitor()
+    assert monitor.percentiles()["p99"] == 0.0
+    monitor.lags.extend(i / 1000 for i in range(101))
+    p = monitor.percentiles()
+    assert p["p50"] == pytest.approx(0.05)
+    assert p["p99"] == pytest.approx(0.099)
+    assert p["max"] == pytest.approx(0.1)
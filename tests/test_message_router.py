@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from tctk.features.message_router import MessageFacts, MessageInterest, MessageRouter, routed
+
+
+def make_msg(author, text):
+    msg = MagicMock()
+    msg.user.name = author
+    msg.text = text
+    del msg._tctk_facts
+    del msg._tctk_user
+    return msg
+
+
+def make_router():
+    return MessageRouter(authorities=frozenset({"streamelements"}))
+
+
+def recorder(seen, label, interest):
+    async def handler(msg, sender):
+        seen.append(label)
+    return routed(handler, interest)
+
+
+def test_facts_computed_once_and_cached():
+    msg = make_msg("StreamElements", "!Join now")
+    facts = MessageFacts.of(msg, frozenset({"streamelements"}))
+    assert facts.author == "streamelements"
+    assert facts.is_authority
+    assert facts.command == "!join"
+    assert MessageFacts.of(msg) is facts
+
+
+@pytest.mark.asyncio
+async def test_dispatch_only_to_interested_handlers():
+    router = make_router()
+    seen = []
+    router.add("duel", recorder(seen, "duel", MessageInterest.of(authors=["StreamElements"])))
+    router.add("raffle", recorder(seen, "raffle", MessageInterest.of(commands=["!join"])))
+    router.add("auto", recorder(seen, "auto", None))
+
+    router.dispatch(make_msg("someone", "hello chat"), MagicMock())
+    assert seen == ["auto"]
+
+    seen.clear()
+    router.dispatch(make_msg("someone", "!join"), MagicMock())
+    assert sorted(seen) == ["auto", "raffle"]
+
+    seen.clear()
+    router.dispatch(make_msg("streamelements", "anything"), MagicMock())
+    assert sorted(seen) == ["auto", "duel"]
+
+
+@pytest.mark.asyncio
+async def test_removed_handler_no_longer_dispatched():
+    router = make_router()
+    seen = []
+    handler = recorder(seen, "duel", MessageInterest.of(authors=["streamelements"]))
+    router.add("duel", handler)
+    assert router.remove(handler)
+
+    router.dispatch(make_msg("streamelements", "anything"), MagicMock())
+    assert seen == []
+
+
+@pytest.mark.asyncio
+async def test_suspending_handler_keeps_running_as_task():
+    router = make_router()
+    seen = []
+
+    async def slow(msg, sender):
+        await asyncio.sleep(0.01)
+        seen.append("slow")
+
+    router.add("slow", routed(slow, None))
+    router.dispatch(make_msg("someone", "hi"), MagicMock())
+    assert seen == []
+    assert len(router._pending) == 1
+
+    await asyncio.sleep(0.05)
+    assert seen == ["slow"]
+    assert not router._pending
+
+
+@pytest.mark.asyncio
+async def test_reindex_follows_changed_interests():
+    router = make_router()
+    seen = []
+    authority = ["streamelements"]
+    handler = recorder(seen, "duel", MessageInterest.of(authors=authority))
+    handler.refresh_interest = lambda: MessageInterest.of(authors=authority)
+    router.add("duel", handler)
+
+    authority[0] = "NewBot"
+    router.reindex()
+    router.dispatch(make_msg("streamelements", "anything"), MagicMock())
+    assert seen == []
+    router.dispatch(make_msg("newbot", "anything"), MagicMock())
+    assert seen == ["duel"]
+    assert router.route_for(handler).interest.authors == {"newbot"}
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tctk.bot import ChannelSender
+from tctk.outbound import Overflow, Priority, TokenBucket
+
+
+def make_sender(slow=0, mod=False, bucket=None, **kwargs):
+    sent = []
+    room = MagicMock()
+    room.slow = slow
+    chat = MagicMock()
+    chat.room_cache = {"chan": room}
+    chat.is_mod.return_value = mod
+
+    async def record_send(channel, text):
+        sent.append(text)
+
+    chat.send_message = AsyncMock(side_effect=record_send)
+    sender = ChannelSender(chat, "chan", bucket, **kwargs)
+    return sender, sent
+
+
+def test_token_bucket_window():
+    bucket = TokenBucket(period=30)
+    for t in range(20):
+        assert bucket.delay(20, now=t) == 0
+        bucket.take(now=t)
+    assert bucket.delay(20, now=20) == pytest.approx(10)
+    assert bucket.delay(100, now=20) == 0
+    assert bucket.delay(20, now=30) == 0
+
+
+@pytest.mark.asyncio
+async def test_priority_overtakes_queued_messages():
+    sender, sent = make_sender(slow=0.05)
+    sender._last_send_time = time.monotonic()
+    low = [asyncio.create_task(sender.send(f"joke {i}", priority=Priority.LOW)) for i in range(3)]
+    await asyncio.sleep(0)
+    high = asyncio.create_task(sender.send("!accept", priority=Priority.HIGH))
+    assert await high
+    await asyncio.gather(*low)
+    assert sent[0] == "!accept"
+    assert sender.scheduler.stats.sent == 4
+
+
+@pytest.mark.asyncio
+async def test_expired_messages_are_dropped():
+    sender, sent = make_sender(slow=0.1)
+    sender._last_send_time = time.monotonic()
+    first = asyncio.create_task(sender.send("on time"))
+    stale = asyncio.create_task(sender.send("stale", ttl=0.05))
+    assert await first
+    assert not await stale
+    assert sent == ["on time"]
+    assert sender.scheduler.stats.expired == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_uses_mod_status():
+    bucket = TokenBucket(period=0.2)
+    for _ in range(20):
+        bucket.take()
+    sender, sent = make_sender(bucket=bucket)
+    start = time.monotonic()
+    assert await sender.send("hi")
+    assert time.monotonic() - start >= 0.15
+
+    mod_sender, _ = make_sender(mod=True, bucket=bucket)
+    for _ in range(20):
+        bucket.take()
+    start = time.monotonic()
+    assert await mod_sender.send("hi")
+    assert time.monotonic() - start < 0.1
+
+
+@pytest.mark.asyncio
+async def test_guard_and_result_evaluated_at_send_time():
+    sender, sent = make_sender(slow=0.05)
+    sender._last_send_time = time.monotonic()
+    state = {"ok": True, "amount": 1}
+    guarded = asyncio.create_task(sender.send_guarded("guarded", lambda: state["ok"]))
+    result = asyncio.create_task(sender.send_result(lambda: f"amount {state['amount']}"))
+    state.update(ok=False, amount=2)
+    assert not await guarded
+    assert await result
+    assert sent[0].startswith("amount 2")
+    assert sender.scheduler.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_before_delivery():
+    sender, sent = make_sender(slow=0.05)
+    sender._last_send_time = time.monotonic()
+    delivered = await sender.submit("hello")
+    assert not delivered.done() and sent == []
+    assert await delivered
+    assert sent == ["hello"]
+
+
+@pytest.mark.asyncio
+async def test_overflow_policies():
+    sender, sent = make_sender(slow=10, queue_size=2, overflow=Overflow.DROP_NEWEST)
+    sender._last_send_time = time.monotonic()
+    kept = [await sender.submit(f"m{i}") for i in range(2)]
+    rejected = await sender.submit("m2")
+    assert rejected.result() is False
+    assert not any(f.done() for f in kept)
+
+    sender, sent = make_sender(slow=10, queue_size=2, overflow=Overflow.DROP_OLDEST)
+    sender._last_send_time = time.monotonic()
+    joke = await sender.submit("joke", priority=Priority.LOW)
+    other = await sender.submit("other")
+    accept = await sender.submit("!accept", priority=Priority.HIGH)
+    assert joke.result() is False
+    assert not other.done() and not accept.done()
+    # nothing queued is less important than a LOW message, so it is rejected
+    assert (await sender.submit("joke 2", priority=Priority.LOW)).result() is False
+    assert sender.scheduler.stats.overflowed == 2
+    await sender.scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_room():
+    sender, sent = make_sender(slow=0.05, queue_size=1)
+    sender._last_send_time = time.monotonic()
+    first = await sender.submit("first")
+    second = asyncio.create_task(sender.submit("second"))
+    await asyncio.sleep(0.01)
+    assert not second.done()
+    assert await first
+    assert await (await second)
+    assert sent == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_send_unique_only_suffixes_repeats():
+    sender, sent = make_sender()
+    assert await sender.send("gg")
+    assert await sender.send_unique("gg")
+    assert await sender.send_unique("gl")
+    assert sent[0] == "gg" and sent[2] == "gl"
+    assert sent[1].startswith("gg ") and sent[1] != "gg"
+
+
+@pytest.mark.asyncio
+async def test_failed_send_resolves_false():
+    sender, _ = make_sender()
+    sender.chat.send_message = AsyncMock(side_effect=ConnectionError("closed"))
+    fut = await sender.submit("hello")
+    assert await fut is False
+    assert sender.scheduler.stats.failed == 1
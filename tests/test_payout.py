@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from tctk.features.se.classifier import CoinsGiven
+from tctk.features.se.raffle.payout import Checkpoint, PayoutEngine, PayoutPlan, Transfer, TransferState
+
+
+class FakeSender:
+    def __init__(self, engine, echo=True, drop_first=()):
+        self.engine = engine
+        self.echo = echo
+        self.drop_first = set(drop_first)
+        self.sent = []
+
+    async def send_unique(self, text):
+        self.sent.append(text)
+        _, receiver, amount = text.split()[:3]
+        if receiver in self.drop_first:
+            self.drop_first.discard(receiver)
+            return False
+        if self.echo:
+            asyncio.get_running_loop().call_soon(
+                self.engine.confirm, CoinsGiven("mybot", receiver.upper(), int(amount)))
+        return True
+
+
+def test_split_evenly():
+    plan = PayoutPlan.split_evenly("r", 100, ["b", "a", "c"])
+    assert [(t.receiver, t.amount) for t in plan.transfers] == [("a", 33), ("b", 33), ("c", 33)]
+    assert PayoutPlan.split_evenly("r", 100, []).transfers == []
+    assert PayoutPlan.split_evenly("r", 2, ["a", "b", "c"]).transfers == []
+
+
+@pytest.mark.asyncio
+async def test_confirms_and_resends_dropped_gives(tmp_path):
+    engine = PayoutEngine(tmp_path, confirm_timeout=0.05)
+    sender = FakeSender(engine, drop_first=["b"])
+    report = await engine.run(PayoutPlan.split_evenly("r1", 100, ["a", "b"]), sender)
+
+    assert report.confirmed == 2 and report.failed == 0 and report.coins == 100
+    assert sorted(sender.sent) == ["!give a 50", "!give b 50", "!give b 50"]
+    saved = PayoutPlan.load(tmp_path / "r1.json")
+    assert [t.state for t in saved.transfers] == [TransferState.CONFIRMED] * 2
+    assert saved.transfers[1].attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_unechoed_give_is_not_sent_again(tmp_path):
+    engine = PayoutEngine(tmp_path, confirm_timeout=0.01, max_attempts=3)
+    sender = FakeSender(engine, echo=False)
+    report = await engine.run(PayoutPlan.split_evenly("r2", 10, ["a"]), sender)
+    assert (report.unconfirmed, report.failed) == (1, 0)
+    assert len(sender.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_interrupted_sends(tmp_path):
+    PayoutPlan("r3", [
+        Transfer("a", 5, TransferState.CONFIRMED),
+        Transfer("b", 5, TransferState.SENDING, attempts=1),
+        Transfer("c", 5),
+    ]).save(tmp_path)
+    engine = PayoutEngine(tmp_path, confirm_timeout=0.05)
+    sender = FakeSender(engine)
+    [report] = await engine.resume(sender)
+
+    assert sender.sent == ["!give c 5"]
+    assert (report.confirmed, report.unconfirmed) == (2, 1)
+    assert await engine.resume(sender) == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_checkpoints_share_a_write(tmp_path):
+    plan = PayoutPlan.split_evenly("r4", 100, list("abcdefghij"))
+    checkpoint = Checkpoint(plan, tmp_path)
+
+    async def confirm(transfer):
+        transfer.state = TransferState.CONFIRMED
+        await checkpoint.save()
+
+    await asyncio.gather(*(confirm(t) for t in plan.transfers))
+    assert checkpoint.writes == 1
+    assert PayoutPlan.load(tmp_path / "r4.json").done
@@ -0,0 +1,92 @@
+import asyncio
+import cProfile
+import pstats
+from unittest.mock import MagicMock
+
+import pytest
+from twitchAPI.type import ChatEvent
+
+from tctk import BotFeature
+from tctk.features import profiling
+from tctk.features.feature_manager import FeatureManagerFeature
+from tctk.features.message_router import MessageRouter
+from tctk.features.profiling import Profiled
+
+
+def busy_work():
+    return sum(i * i for i in range(20_000))
+
+
+class BusyFeature(BotFeature):
+    async def on_message(self, msg, sender):
+        busy_work()
+        await asyncio.sleep(0)
+        busy_work()
+
+    async def on_joined(self, event, sender):
+        pass
+
+    def get_subscriptions(self):
+        return [(ChatEvent.MESSAGE, self.on_message), (ChatEvent.JOINED, self.on_joined)]
+
+
+def other_task_work():
+    return sum(range(50_000))
+
+
+@pytest.mark.asyncio
+async def test_profiles_only_the_wrapped_coroutine():
+    profiler = cProfile.Profile()
+
+    async def handler():
+        busy_work()
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def other():
+        other_task_work()
+
+    task = asyncio.create_task(other())
+    assert await Profiled(handler(), profiler) == "done"
+    await task
+    names = {name for _, _, name in pstats.Stats(profiler).stats}
+    assert "busy_work" in names
+    assert "other_task_work" not in names
+
+
+@pytest.mark.asyncio
+async def test_profile_start_stop(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "profiles_dir", lambda: tmp_path)
+    feature = BusyFeature()
+    manager = FeatureManagerFeature(feature_registry={"busy": BusyFeature}, active={})
+    manager.router = MessageRouter(authorities=frozenset())
+    sender = MagicMock()
+    manager.subscribe("busy", feature, sender)
+    route = manager.router.routes[0]
+    original = route.handler
+    handlers = list(manager.active["busy"][1])
+
+    assert manager._profile_start("nope", sender) == "nope not active"
+    assert manager._profile_start("busy", sender) == "profiling busy"
+    assert route.handler is not original
+    await route.handler(MagicMock(), sender)
+
+    reply = manager._profile_stop()
+    assert reply.startswith("busy top cumulative:") and "busy_work" in reply
+    assert route.handler is original
+    assert manager.active["busy"][1] == handlers
+    sender.register_event.assert_called_with(ChatEvent.JOINED, handlers[1][1])
+    assert list(tmp_path.glob("busy-*.pstats")) and list(tmp_path.glob("busy-*.txt"))
+    assert manager._profile_stop() == "not profiling"
+
+
+def test_profile_stop_without_calls(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "profiles_dir", lambda: tmp_path)
+    manager = FeatureManagerFeature(feature_registry={"busy": BusyFeature}, active={})
+    manager.router = MessageRouter(authorities=frozenset())
+    sender = MagicMock()
+    manager.subscribe("busy", BusyFeature(), sender)
+
+    assert manager._profile_start("busy", sender) == "profiling busy"
+    assert manager._profile_stop() == "busy: no handler calls recorded"
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+from tctk.features.se.raffle.raffle_feature import ABANDON_AFTER_MS, Raffle, RaffleFeature, RaffleState
+
+
+def test_joiners_are_indexed_case_insensitively():
+    raffle = Raffle(1000, 60, 500)
+    assert raffle.join("Alice", 1500)
+    assert not raffle.join("ALICE", 1600)
+    raffle.join("bob", 2000)
+
+    assert raffle.did_join("alice") and "Bob" in raffle.joiners
+    assert raffle.joiners["alice"] == 1500
+    assert list(raffle.joiners.items()) == [("Alice", 1500), ("bob", 2000)]
+
+    raffle.close(["BOB"])
+    assert raffle.did_win("bob") and not raffle.did_win("alice")
+    assert raffle.losers() == ["Alice"]
+    assert raffle.entries() == [("Alice", False, 1500), ("bob", True, 2000)]
+
+
+def test_overlapping_raffles_close_in_the_order_they_end():
+    state = RaffleState("chan")
+    long = state.start(Raffle(0, 120, 100))
+    short = state.start(Raffle(10_000, 30, 200))
+    assert state.current is short
+
+    assert state.join("early", 5_000) == [long]
+    assert state.join("both", 20_000) == [long, short]
+    assert state.join("both", 21_000) == []
+    assert state.join("late", 60_000) == [long]
+
+    assert state.close(["both"]) is short
+    assert list(short.joiners) == ["both"]
+    assert state.close(["late"]) is long and long.did_win("late")
+    assert not state.active and state.last_closed is long
+    assert state.close(["nobody"]) is None
+
+
+def test_raffles_whose_close_was_missed_are_dropped():
+    state = RaffleState("chan")
+    state.start(Raffle(0, 60, 100))
+    assert state.join("viewer", 60_000 + ABANDON_AFTER_MS + 1) == []
+    assert not state.active
+
+
+class Recorder(RaffleFeature):
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    async def on_open(self, data, sender):
+        self.seen.append(("open", data.raffle.amount))
+
+    async def on_join(self, data, sender):
+        self.seen.append(("join", data.message.user.name))
+
+    async def on_close(self, data, sender):
+        self.seen.append(("close", sorted(data.raffle.winners)))
+
+
+async def test_every_feature_sees_each_message_applied_once(conf, raffle, chat_message):
+    sender = SimpleNamespace(channel="chan")
+    features = [Recorder(), Recorder()]
+    for nick, text, ts in (("StreamElements", raffle.open, 1000), ("alice", "!join", 2000), ("bob", "!join", 3000),
+                           ("alice", "!join", 4000), ("StreamElements", raffle.close, 70_000)):
+        msg = chat_message(nick, text, ts)
+        for feature in features:
+            await feature.on_message(msg, sender)
+
+    expected = [("open", 500), ("join", "alice"), ("join", "bob"), ("close", ["bob"])]
+    assert [f.seen for f in features] == [expected, expected]
+    state = RaffleState.of("chan")
+    assert not state.active and list(state.last_closed.joiners) == ["alice", "bob"]
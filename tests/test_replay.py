@@ -0,0 +1,90 @@
+import pytest
+from twitchAPI.chat import ChatMessage, JoinedEvent
+from twitchAPI.type import ChatEvent
+
+from tctk.features.feature_manager import FeatureManagerFeature
+from tctk.features.message_bot import MessageBotFeature
+from tctk.replay import ChatRecorder, ReplayChat, read_log, replay
+
+
+class Echo(MessageBotFeature):
+    async def on_message(self, msg, sender):
+        if msg.text.startswith("!echo "):
+            await sender.send_message(msg.text.removeprefix("!echo "))
+
+
+def message(chat, channel, nick, text, ts):
+    return ChatMessage(chat, {
+        "tags": {"tmi-sent-ts": str(ts), "id": str(ts)},
+        "parameters": text,
+        "command": {"command": "PRIVMSG", "channel": f"#{channel}"},
+        "source": {"nick": nick},
+    })
+
+
+def write_log(path):
+    chat = ReplayChat("replaybot", ["chan_a", "chan_b"])
+    recorder = ChatRecorder(path, "replaybot")
+    recorder.record(ChatEvent.JOINED, JoinedEvent(chat, "chan_a", "replaybot"))
+    recorder.record(ChatEvent.MESSAGE, message(chat, "chan_a", "viewer1", "!echo hi a", 1))
+    recorder.record(ChatEvent.MESSAGE, message(chat, "chan_b", "viewer2", "hello", 2))
+    recorder.record(ChatEvent.MESSAGE, message(chat, "chan_b", "viewer3", "!echo hi b", 3))
+    recorder.close()
+
+
+def test_log_round_trip(tmp_path):
+    path = tmp_path / "chat.jsonl.gz"
+    write_log(path)
+    header, events = read_log(path)
+    events = list(events)
+    assert header["username"] == "replaybot"
+    assert [(e.event, e.room) for e in events] == [
+        (ChatEvent.JOINED, "chan_a"), (ChatEvent.MESSAGE, "chan_a"),
+        (ChatEvent.MESSAGE, "chan_b"), (ChatEvent.MESSAGE, "chan_b"),
+    ]
+    msg = ReplayChat("replaybot", ["chan_b"]).build(events[3])
+    assert msg.text == "!echo hi b" and msg.user.name == "viewer3"
+
+
+@pytest.mark.asyncio
+async def test_replay_reports_sent_and_latency(tmp_path):
+    path = tmp_path / "chat.jsonl.gz"
+    write_log(path)
+
+    async def setup(bot, timings):
+        managers = []
+        for channel, sender in bot.senders.items():
+            manager = FeatureManagerFeature(feature_registry={"echo": Echo}, active={"echo": Echo()},
+                                            instrument=timings)
+            manager.attach(sender)
+            manager.subscribe("echo", manager.active["echo"][0], sender)
+            managers.append(manager)
+        return managers
+
+    report = await replay(path, setup)
+    assert report.events == 4
+    assert sorted((s.channel, s.text) for s in report.sent) == [("chan_a", "hi a"), ("chan_b", "hi b")]
+    assert len(report.latency["echo"].samples) == 3
+    assert "4 events" in str(report) and "echo: 3 calls" in str(report)
+
+
+@pytest.mark.asyncio
+async def test_replay_is_sandboxed(tmp_path):
+    from tctk.config import Config
+    from tctk.features.se.streamelements_tracker import TrackerWriter
+    path = tmp_path / "chat.jsonl.gz"
+    write_log(path)
+    seen = {}
+
+    async def setup(bot, timings):
+        seen["setup"] = Config.data_dir(), TrackerWriter.offline
+        return []
+
+    async def teardown(bot):
+        seen["teardown"] = Config.data_dir(), TrackerWriter.offline
+
+    await replay(path, setup, teardown=teardown)
+    data_dir, offline = seen["setup"]
+    assert offline and seen["teardown"] == (data_dir, True)
+    assert data_dir.name.startswith("tctk-replay-") and not data_dir.exists()
+    assert Config.data_dir_override is None and not TrackerWriter.offline
@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from twitchAPI.type import ChatEvent
+
+from tctk.bot import ChatBot
+from tctk.rooms import room_of
+
+
+def test_room_of():
+    assert room_of(SimpleNamespace(room_name="a")) == "a"
+    assert room_of(SimpleNamespace(_parsed={"command": {"channel": "#b"}})) == "b"
+    assert room_of(SimpleNamespace(new=SimpleNamespace(name="c"))) == "c"
+    assert room_of(SimpleNamespace()) is None
+
+
+@pytest.mark.asyncio
+async def test_events_reach_only_their_channel():
+    chat = MagicMock()
+    registered = {}
+    chat.register_event.side_effect = lambda event, handler: registered.setdefault(event, []).append(handler)
+    bot = ChatBot(["a", "b"], access_tokens_file=None)
+    bot.attach(chat)
+    assert bot.sender is bot.senders["a"]
+    assert bot.senders["a"].scheduler.bucket is bot.senders["b"].scheduler.bucket
+
+    seen = []
+
+    async def on_joined(event, sender):
+        seen.append(sender.channel)
+
+    bot.subscribe(ChatEvent.JOINED, on_joined)
+    # one Chat-level handler however many channels subscribe
+    assert len(registered[ChatEvent.JOINED]) == 1
+
+    await registered[ChatEvent.JOINED][0](SimpleNamespace(room_name="B"))
+    await registered[ChatEvent.JOINED][0](SimpleNamespace())
+    await asyncio.sleep(0)
+    assert seen == ["b", "a", "b"]
@@ -0,0 +1,42 @@
+from unittest.mock import MagicMock
+
+from tctk.features.se.classifier import (
+    CoinsBalance, CoinsGiven, DuelCompleted, DuelDenied, DuelProposed,
+    RaffleClosed, RaffleOpened, classify, classify_text,
+)
+from tctk.features.se.duel.duel import duel_complete, duel_denied, duel_proposed
+from tctk.features.se.raffle.raffle_feature import extract_winners
+
+
+def test_duel_lines():
+    assert classify_text(duel_proposed) == DuelProposed("dookiebetts800", "aallldeeeez", 348)
+    assert classify_text(duel_complete) == DuelCompleted("dookiebetts800", "aallldeeeez", 348)
+    assert classify_text(duel_denied) == DuelDenied("cenozoicmegafauna", "are_mod")
+
+
+def test_coin_lines():
+    assert classify_text("@are_mod has 1200 eastcoins [Rank 3/40]") == CoinsBalance("are_mod", 1200)
+    assert classify_text("are_mod gave 100 eastcoins to bob_b") == CoinsGiven("are_mod", "bob_b", 100)
+
+
+def test_raffle_lines():
+    opened = "PogChamp a Multi-Raffle has begun for 5000 EastCoin PogChamp it will end in 60 Seconds"
+    assert classify_text(opened) == RaffleOpened(5000, 60)
+
+    closed = "The Multi-Raffle has ended and ann, bob, cat, and dan won 1250 EastCoin each FeelsGoodMan"
+    assert classify_text(closed) == RaffleClosed(("ann", "bob", "cat", "dan"), 1250)
+    assert extract_winners("The Multi-Raffle has ended and ann won 10 EastCoin each FeelsGoodMan") == ["ann"]
+    assert extract_winners("The Multi-Raffle has ended and ann and bob won 5 EastCoin each FeelsGoodMan") == ["ann", "bob"]
+
+
+def test_unrelated_line():
+    assert classify_text("hello chat") is None
+
+
+def test_result_cached_on_message():
+    msg = MagicMock()
+    del msg._se_event
+    msg.text = duel_proposed
+    event = classify(msg)
+    msg.text = "changed"
+    assert classify(msg) is event
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+import pytest
+
+from tctk.features.registry import FeatureRegistry
+from tctk.startup import parse_importtime
+
+
+def test_registry_imports_a_feature_on_first_lookup(monkeypatch):
+    module = "tctk.features.auto_resp_feature"
+    monkeypatch.delitem(sys.modules, module, raising=False)
+    registry = FeatureRegistry({"auto": f"{module}:AutoRespFeature"}, entry_point_group=None)
+
+    assert "auto" in registry
+    assert module not in sys.modules
+
+    cls = registry["auto"]
+    assert cls.__name__ == "AutoRespFeature"
+    assert registry["auto"] is cls
+
+
+def test_registry_rejects_unknown_names():
+    registry = FeatureRegistry({}, entry_point_group=None)
+    assert "nope" not in registry
+    with pytest.raises(KeyError):
+        registry["nope"]
+    assert list(registry) == []
+
+
+def test_importing_the_cli_has_no_side_effects():
+    code = ("import sys, tctk.cli\n"
+            "from tctk.config import Config\n"
+            "assert Config.conf is None and not Config.log_conf_loaded\n"
+            "print(sorted(m for m in ('polars', 'psycopg', 'pydash', 'emoji') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_parse_importtime():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     _io",
+        "import time:       300 |        420 |   io",
+        "import time:      1000 |       1420 | tctk.cli",
+        "some other warning",
+    ])
+    imports = parse_importtime(stderr)
+    assert [(i.module, i.self_us, i.cumulative_us, i.depth) for i in imports] == [
+        ("_io", 120, 120, 2), ("io", 300, 420, 1), ("tctk.cli", 1000, 1420, 0),
+    ]
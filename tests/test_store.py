@@ -0,0 +1,98 @@
+import json
+import time
+
+import polars as pl
+
+from tctk.features.se.store import (
+    COMPACT_GRACE, Duel, Raffle, UserRaffle, _compactor, finish_compactions, live_parts,
+)
+
+DAY_MS = 86_400_000
+T0 = 1_700_000_000_000
+
+
+def test_flush_writes_one_part_per_date_partition(tmp_path):
+    UserRaffle.save_all([UserRaffle("a", T0, True, T0), UserRaffle("b", T0 + DAY_MS, False, T0 + DAY_MS)])
+    written = UserRaffle.flush(root=tmp_path)
+
+    assert len(written) == 2
+    assert {p.parent.name for p in written} == {"date=2023-11-14", "date=2023-11-15"}
+    assert UserRaffle.flush(root=tmp_path) == []
+
+
+def test_tables_keep_their_own_schema(tmp_path):
+    Raffle.save_all([Raffle(T0, 60, 500)])
+    Duel.save_all([Duel("a", "b", T0, 10, True)])
+    Raffle.flush(root=tmp_path)
+    Duel.flush(root=tmp_path)
+
+    assert Raffle.scan(tmp_path).collect().columns == ["start_time", "duration", "amount", "date"]
+    assert Duel.scan(tmp_path).select("initiator", "offerer_win").collect().row(0) == ("a", True)
+
+
+def test_compaction_merges_parts_without_losing_rows(tmp_path):
+    for i in range(5):
+        UserRaffle.save_all([UserRaffle(f"u{i}", T0, False, T0 + i)])
+        UserRaffle.flush(root=tmp_path)
+    part_dir = UserRaffle.table_dir(tmp_path) / "date=2023-11-14"
+    assert len(list(part_dir.glob("part-*.parquet"))) == 5
+
+    UserRaffle.compact(root=tmp_path, grace=0)
+
+    assert len(list(part_dir.glob("part-*.parquet"))) == 1
+    assert UserRaffle.scan(tmp_path).select(pl.len()).collect().item() == 5
+
+
+def test_replaced_parts_stay_readable_but_are_not_scanned_twice(tmp_path):
+    for i in range(3):
+        UserRaffle.save_all([UserRaffle(f"u{i}", T0, False, T0 + i)])
+        UserRaffle.flush(root=tmp_path)
+    part_dir = UserRaffle.table_dir(tmp_path) / "date=2023-11-14"
+    before = UserRaffle.scan(tmp_path)
+
+    merged = UserRaffle.compact_partition(part_dir)
+    assert len(list(part_dir.glob("part-*.parquet"))) == 4
+    assert live_parts(part_dir) == [merged]
+    assert UserRaffle.scan(tmp_path).select(pl.len()).collect().item() == 3
+    # a scan listed before the compaction still reads the old parts
+    assert before.select(pl.len()).collect().item() == 3
+
+    finish_compactions(part_dir, now=time.time() + COMPACT_GRACE)
+    assert list(part_dir.glob("part-*.parquet")) == [merged]
+    assert list(part_dir.glob("compact-*.json"))
+    finish_compactions(part_dir, now=time.time() + 2 * COMPACT_GRACE)
+    assert not list(part_dir.glob("compact-*.json"))
+
+
+def test_flushes_finish_compactions_in_partitions_no_longer_written(tmp_path):
+    for i in range(2):
+        UserRaffle.save_all([UserRaffle(f"u{i}", T0, False, T0 + i)])
+        UserRaffle.flush(root=tmp_path)
+    past = UserRaffle.table_dir(tmp_path) / "date=2023-11-14"
+    merged = UserRaffle.compact_partition(past)
+    [manifest] = past.glob("compact-*.json")
+    manifest.write_text(json.dumps({**json.loads(manifest.read_text()), "t": time.time() - 2 * COMPACT_GRACE}))
+
+    UserRaffle._swept = float("-inf")
+    UserRaffle.save_all([UserRaffle("later", T0 + DAY_MS, False, T0 + DAY_MS)])
+    UserRaffle.flush(root=tmp_path)
+    _compactor.submit(lambda: None).result()
+
+    assert sorted(past.iterdir()) == [merged]
+
+
+def test_interrupted_compaction_is_discarded(tmp_path):
+    UserRaffle.save_all([UserRaffle("a", T0, False, T0)])
+    [part] = UserRaffle.flush(root=tmp_path)
+    part_dir = part.parent
+    (part_dir / "compact-x.json").write_text(json.dumps(
+        {"merged": "part-x.parquet", "replaces": [part.name], "t": 0}))
+    (part_dir / ".compact-x.tmp").write_bytes(b"partial")
+
+    assert live_parts(part_dir) == [part]
+    finish_compactions(part_dir)
+    assert sorted(p.name for p in part_dir.iterdir()) == [part.name]
+
+
+def test_scan_empty_table(tmp_path):
+    assert UserRaffle.scan(tmp_path).collect().height == 0
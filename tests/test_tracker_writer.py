@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+
+from tctk.features.se.streamelements_tracker import TrackerWriter
+from tctk.spool import Spool
+
+
+def make_writer(path, fail=False, **kwargs):
+    writer = TrackerWriter("postgresql://localhost/unused", Spool(path, sync_interval=0.01), **kwargs)
+    batches = []
+
+    async def _write(records):
+        if fail:
+            raise ConnectionError("database down")
+        batches.append(records)
+
+    writer._write = _write
+    return writer, batches
+
+
+async def drain(writer, timeout=2):
+    writer.spool.start()
+    task = asyncio.create_task(writer._run())
+    end = asyncio.get_running_loop().time() + timeout
+    while writer.spool.depth and asyncio.get_running_loop().time() < end:
+        await asyncio.sleep(0.01)
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_replays_spooled_records(tmp_path):
+    writer, batches = make_writer(tmp_path / "t.spool", flush_records=2, flush_interval=0.01)
+    writer.put_raffle("chan", 1000, 60, 500, [("a", True, 1001), ("b", False, 1002)])
+    writer.spool.append({"kind": "duel", "id": "d1", "row": ["a", "b", 1, 10, True]})
+    await drain(writer)
+
+    assert [r["kind"] for batch in batches for r in batch] == ["raffle", "duel"]
+    assert writer.spool.depth == 0
+    assert (tmp_path / "t.spool").stat().st_size == 0
+
+
+@pytest.mark.asyncio
+async def test_records_survive_restart_while_database_down(tmp_path):
+    path = tmp_path / "t.spool"
+    writer, _ = make_writer(path, fail=True, flush_interval=0.01)
+    writer.put_raffle("chan", 1000, 60, 500, [("a", True, 1001)])
+    await writer.spool.close()
+
+    writer, batches = make_writer(path, flush_interval=0.01)
+    assert writer.spool.depth == 1
+    assert writer.spool.lag > 0
+    await drain(writer)
+
+    assert batches[0][0]["joiners"] == [["a", True, 1001]]
+
+
+def test_torn_record_dropped(tmp_path):
+    path = tmp_path / "t.spool"
+    path.write_bytes(b'{"t":1,"kind":"duel"}\n{"t":2,"ki')
+    spool = Spool(path)
+    assert spool.depth == 1
+    assert path.read_bytes() == b'{"t":1,"kind":"duel"}\n'
+
+
+@pytest.mark.asyncio
+async def test_records_that_keep_failing_are_dead_lettered(tmp_path, monkeypatch):
+    monkeypatch.setattr("tctk.features.se.streamelements_tracker.RETRY_MIN", 0.001)
+    writer, batches = make_writer(tmp_path / "t.spool", flush_records=2, flush_interval=0.01)
+
+    async def _write(records):
+        if any(r["id"] == "bad" for r in records):
+            raise ValueError("rejected")
+        batches.append(records)
+
+    writer._write = _write
+    writer.spool.append({"kind": "duel", "id": "bad", "row": []})
+    writer.spool.append({"kind": "duel", "id": "good", "row": ["a", "b", 1, 10, True]})
+    await drain(writer)
+
+    assert [r["id"] for batch in batches for r in batch] == ["good"]
+    assert writer.spool.depth == 0
+    dead = (tmp_path / "t.dead.jsonl").read_text().splitlines()
+    assert len(dead) == 1 and '"id":"bad"' in dead[0]
+
+
+@pytest.mark.asyncio
+async def test_offline_writer_only_spools(tmp_path, monkeypatch):
+    monkeypatch.setattr(TrackerWriter, "offline", True)
+    writer, batches = make_writer(tmp_path / "t.spool", flush_interval=0.01)
+    await writer.open()
+    writer.put_raffle("chan", 1000, 60, 500, [("a", True, 1001)])
+    await writer.close()
+
+    assert writer._task is None and not batches
+    assert Spool(tmp_path / "t.spool").depth == 1
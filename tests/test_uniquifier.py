@@ -0,0 +1,37 @@
+import random
+
+from tctk.uniquifier import POOL, Uniquifier
+
+
+def test_pool_is_single_distinct_code_points():
+    assert len(set(POOL)) == len(POOL) > 100
+    assert all(ord(c) > 0x2000 for c in POOL)
+
+
+def test_unchanged_unless_recently_sent():
+    u = Uniquifier(window=30)
+    assert u("hello", now=0) == "hello"
+    u.sent("hello", now=0)
+    assert u("hello", now=29) != "hello"
+    assert u("hello", now=30) == "hello"
+
+
+def test_shortest_suffix_avoids_every_recent_message():
+    u = Uniquifier(rng=random.Random(0))
+    u.sent("gg", now=0)
+    seen = {"gg"}
+    for t in range(1, 30):
+        text = u("gg", now=t)
+        # one emoji after a space
+        assert len(text) == len("gg") + 2
+        assert text not in seen
+        seen.add(text)
+        u.sent(text, now=t)
+
+
+def test_ring_forgets_the_oldest_beyond_its_size():
+    u = Uniquifier(size=2)
+    for i, text in enumerate(["a", "b", "c"]):
+        u.sent(text, now=i)
+    assert not u.is_recent("a", now=3)
+    assert u.is_recent("b", now=3) and u.is_recent("c", now=3)
@@ -0,0 +1,39 @@
+from itertools import permutations
+
+from tctk.word_matcher import WordMatcher, fold, matcher_for
+
+
+def test_fold_normalizes_leetspeak_and_repeats():
+    assert fold("D0DGE") == "dodge"
+    assert fold("dooodge") == "dodge"
+    assert fold("sp0ngeb0b") == "spongebob"
+
+
+def test_variants_match_single_entry():
+    m = WordMatcher(["dodge", "spongebob"])
+    assert m.search("lol d0dg3 that") == "dodge"
+    assert m.search("SPONGEB0BBB con") == "spongebob"
+    assert m.search("consider this") is None
+
+
+def test_overlapping_words():
+    m = WordMatcher(["she", "he", "hers", "his"])
+    assert m.search("ahishers") == "his"
+    assert m.search("ushe") == "she"
+    assert m.search("xhe") == "he"
+
+
+def test_many_words():
+    words = ["".join(p) for p in permutations("bcdfhjkmnpqrvwxz", 3)]
+    assert len(words) > 3000
+    m = WordMatcher(words)
+    assert m.search("it's a ZQX") == "zqx"
+    assert m.search("nothing here") is None
+
+
+def test_rebuilt_only_when_list_changes():
+    words = ["dodge"]
+    first = matcher_for(words)
+    assert matcher_for(words) is first
+    assert matcher_for(list(words)) is first
+    assert matcher_for(["other"]) is not first